@@ -1,9 +1,13 @@
 import logging
-from flask import Flask, send_from_directory, render_template
+import os
+
+# The backend runs in this process, so the UI calls it directly and shares its models
+os.environ.setdefault("MIDAS_UI_IN_PROCESS", "1")
+
+from flask import send_from_directory
 from threading import Thread
 from frontend.interface import create_interface
-from backend.chat_routes import chat_bp
-import os
+from backend.server import app
 
 # Configure logging
 logging.basicConfig(
@@ -11,31 +15,29 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-# Create Flask app
-app = Flask(__name__, 
-           template_folder='frontend/templates',
-           static_folder='assets')
-
-app.register_blueprint(chat_bp, url_prefix='/api')
+# The backend API app, plus the static pages served next to it
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+API_PORT = 7860
+UI_PORT = 7861
 
 # Serve favicon.ico
 @app.route('/favicon.ico')
 def favicon():
-    return send_from_directory(os.path.join(app.root_path, 'assets/gfx'),
+    return send_from_directory(os.path.join(ROOT_DIR, 'assets/gfx'),
                              'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
 # Serve other static files from assets
 @app.route('/assets/<path:filename>')
 def serve_assets(filename):
-    return send_from_directory(app.static_folder, filename)
+    return send_from_directory(os.path.join(ROOT_DIR, 'assets'), filename)
 
 # Serve main page
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return send_from_directory(os.path.join(ROOT_DIR, 'frontend/templates'), 'index.html')
 
 def run_flask():
-    app.run(host="127.0.0.1", port=7860)
+    app.run(host="127.0.0.1", port=API_PORT, threaded=True)
 
 if __name__ == "__main__":
     logger = logging.getLogger(__name__)
@@ -50,7 +52,7 @@ if __name__ == "__main__":
     interface = create_interface()
     interface.launch(
         server_name="127.0.0.1",
-        server_port=7860,
+        server_port=UI_PORT,
         share=False,
         favicon_path=os.path.join(os.path.dirname(__file__), "assets", "gfx", "favicon.ico"),
         show_api=False,
@@ -0,0 +1,326 @@
+"""Benchmarks for the persistence layer.
+
+Usage:
+    python -m backend.benchmark --chats 1000 --messages 100 --output bench.json
+    python -m backend.benchmark --chats 10000 --messages 1000 --baseline bench_baseline.json
+
+A synthetic corpus of chats and bots is generated in a temporary directory
+and then every storage configuration is timed on the same operations:
+create, append, get (full chat and one page), list, rename and delete,
+plus append throughput with concurrent writers. The chat suites cover
+ChatManager on each storage backend, with and without the write-behind
+buffer; the bot suite covers BotManager.
+
+Results are written as JSON. With --baseline, every latency p50 and every
+throughput is compared against a stored result file; a change worse than
+--tolerance is reported as a regression and the exit status is 1.
+--save-baseline writes the current results as the new baseline.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.chat_ids import new_chat_id
+from backend.chat_manager import ChatManager, STORAGE_BACKENDS, create_chat_storage
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY_SIZE = 2000
+
+class Corpus:
+    """Deterministic synthetic chat text"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        self.words = [
+            "".join(self.rng.choice(letters) for _ in range(self.rng.randint(2, 10)))
+            for _ in range(VOCABULARY_SIZE)
+        ]
+
+    def text(self, min_words: int = 10, max_words: int = 120) -> str:
+        return " ".join(self.rng.choices(self.words, k=self.rng.randint(min_words, max_words)))
+
+    def chat_records(self, chats: int, messages: int, chat_ids: List[str]) -> Iterator[Dict]:
+        """Yield export records for a corpus, collecting the generated ids"""
+        start = datetime(2024, 1, 1)
+        for i in range(chats):
+            chat_id = new_chat_id()
+            chat_ids.append(chat_id)
+            created_at = start + timedelta(minutes=i)
+            yield {"type": "chat", "id": chat_id, "title": self.text(2, 6), "created_at": created_at.isoformat()}
+            for j in range(messages):
+                yield {
+                    "type": "message",
+                    "role": "user" if j % 2 == 0 else "assistant",
+                    "content": self.text(),
+                    "timestamp": (created_at + timedelta(seconds=j)).isoformat()
+                }
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Summarize latencies in seconds as milliseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000
+
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": total / len(samples) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+        "ops_per_s": len(samples) / total if total else 0.0
+    }
+
+def measure(fn: Callable, args: List) -> Dict[str, float]:
+    """Time fn once per argument"""
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+def concurrent_throughput(threads: int, per_thread: int, fn: Callable[[int, int], None]) -> Dict[str, float]:
+    """Run fn(thread, i) per_thread times in each of threads threads and report ops per second"""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(thread: int):
+        barrier.wait()
+        for i in range(per_thread):
+            fn(thread, i)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    seconds = time.perf_counter() - start
+    ops = threads * per_thread
+    return {"threads": threads, "ops": ops, "seconds": seconds, "throughput_ops_per_s": ops / seconds}
+
+def bench_chat_manager(workdir: str, backend: str, write_behind: bool, args, corpus: Corpus) -> Dict:
+    history_dir = os.path.join(workdir, f"chats-{backend}{'-wb' if write_behind else ''}")
+    manager = ChatManager(history_dir, storage=create_chat_storage(backend, history_dir, write_behind=write_behind))
+    rng = random.Random(args.seed)
+    results = {}
+    try:
+        chat_ids: List[str] = []
+        start = time.perf_counter()
+        manager.import_chats(corpus.chat_records(args.chats, args.messages, chat_ids))
+        seconds = time.perf_counter() - start
+        results["populate"] = {
+            "chats": args.chats,
+            "messages": args.chats * args.messages,
+            "seconds": seconds,
+            "throughput_ops_per_s": args.chats * args.messages / seconds if seconds else 0.0
+        }
+
+        sample = [rng.choice(chat_ids) for _ in range(args.ops)]
+        created: List[str] = []
+        results["create"] = measure(lambda _: created.append(manager.create_chat(corpus.text(2, 6))), range(args.ops))
+        results["append"] = measure(lambda chat_id: manager.append_message(chat_id, "user", corpus.text()), sample)
+        results["get"] = measure(manager.get_chat, sample)
+        results["get_page"] = measure(lambda chat_id: manager.get_messages(chat_id, limit=50), sample)
+        results["list"] = measure(lambda _: manager.list_chats(limit=50), range(args.ops))
+        results["list_by_updated"] = measure(
+            lambda _: manager.list_chats(limit=50, sort="updated_at"), range(args.ops)
+        )
+        results["rename"] = measure(lambda chat_id: manager.update_chat_title(chat_id, corpus.text(2, 6)), sample)
+        results["delete"] = measure(manager.delete_chat, created)
+
+        own_chats = [manager.create_chat("bench") for _ in range(args.threads)]
+        shared_chat = manager.create_chat("bench shared")
+        results["concurrent_append"] = concurrent_throughput(
+            args.threads, args.ops,
+            lambda thread, i: manager.append_message(own_chats[thread], "user", "concurrent message")
+        )
+        results["concurrent_append_same_chat"] = concurrent_throughput(
+            args.threads, args.ops,
+            lambda thread, i: manager.append_message(shared_chat, "user", "concurrent message")
+        )
+    finally:
+        manager.close()
+    return results
+
+def bench_bot_manager(workdir: str, args, corpus: Corpus) -> Dict:
+    from backend.bot_manager import BotManager
+    from backend.model_pool import ModelPool
+
+    class PersistenceOnlyPool(ModelPool):
+        """Never loads a model, so only bot persistence is timed"""
+
+        def acquire(self, model_path, user):
+            return None
+
+    bots_dir = os.path.join(workdir, "bots")
+    models_dir = os.path.join(workdir, "models")
+    os.makedirs(models_dir, exist_ok=True)
+    open(os.path.join(models_dir, "bench-model.gguf"), 'wb').close()
+    manager = BotManager(bots_dir, models_dir, model_pool=PersistenceOnlyPool())
+    rng = random.Random(args.seed)
+
+    def create(bot_id: str):
+        manager.create_bot(bot_id, corpus.text(1, 3), corpus.text(), "bench-model", {"temperature": 0.7})
+
+    bot_ids = [f"bench-{i}" for i in range(args.bots)]
+    start = time.perf_counter()
+    for bot_id in bot_ids:
+        create(bot_id)
+    seconds = time.perf_counter() - start
+    results = {"populate": {
+        "bots": args.bots,
+        "seconds": seconds,
+        "throughput_ops_per_s": args.bots / seconds if seconds else 0.0
+    }}
+
+    sample = [rng.choice(bot_ids) for _ in range(args.ops)]
+    created = [f"bench-new-{i}" for i in range(args.ops)]
+    results["create"] = measure(create, created)
+    results["get"] = measure(lambda bot_id: manager.get_bot(bot_id, load_model=False), sample)
+    results["list"] = measure(lambda _: manager.list_bots(limit=50, fields=["name"]), range(args.ops))
+    results["list_full"] = measure(lambda _: manager.list_bots(limit=50), range(args.ops))
+    results["rename"] = measure(lambda bot_id: manager.update_bot(bot_id, name=corpus.text(1, 3)), sample)
+    results["delete"] = measure(manager.delete_bot, created)
+    results["cold_start"] = measure(
+        lambda _: BotManager(bots_dir, models_dir, model_pool=PersistenceOnlyPool()), range(3)
+    )
+    return results
+
+def run_benchmarks(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="midas-bench-", dir=args.workdir)
+    corpus = Corpus(args.seed)
+    suites = {}
+    try:
+        for backend in args.backends:
+            for write_behind in (False, True):
+                name = f"chat_manager.{backend}{'+write_behind' if write_behind else ''}"
+                logger.info(f"Running {name}")
+                suites[name] = bench_chat_manager(workdir, backend, write_behind, args, corpus)
+        logger.info("Running bot_manager")
+        try:
+            suites["bot_manager"] = bench_bot_manager(workdir, args, corpus)
+        except ImportError as e:
+            logger.warning(f"Skipping bot_manager: {e}")
+            suites["bot_manager"] = {"skipped": str(e)}
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "chats": args.chats,
+            "messages": args.messages,
+            "bots": args.bots,
+            "ops": args.ops,
+            "threads": args.threads,
+            "seed": args.seed
+        },
+        "suites": suites
+    }
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """List operations whose p50 latency or throughput got worse than tolerance allows"""
+    regressions = []
+    for suite, operations in results["suites"].items():
+        for operation, current in operations.items():
+            previous = baseline.get("suites", {}).get(suite, {}).get(operation)
+            if not isinstance(current, dict) or not isinstance(previous, dict):
+                continue
+            for metric, higher_is_worse in (("p50_ms", True), ("throughput_ops_per_s", False)):
+                if metric not in current or not previous.get(metric):
+                    continue
+                ratio = current[metric] / previous[metric]
+                if (ratio > 1 + tolerance) if higher_is_worse else (ratio < 1 / (1 + tolerance)):
+                    regressions.append({
+                        "suite": suite,
+                        "operation": operation,
+                        "metric": metric,
+                        "baseline": previous[metric],
+                        "current": current[metric],
+                        "ratio": ratio
+                    })
+    return regressions
+
+def print_summary(results: Dict) -> None:
+    for suite, operations in results["suites"].items():
+        print(suite)
+        for operation, stats in operations.items():
+            if not isinstance(stats, dict):
+                print(f"  {operation}: {stats}")
+            elif "p50_ms" in stats:
+                print(f"  {operation:<28} p50 {stats['p50_ms']:9.3f} ms   p99 {stats['p99_ms']:9.3f} ms")
+            elif "throughput_ops_per_s" in stats:
+                print(f"  {operation:<28} {stats['throughput_ops_per_s']:12.1f} ops/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat and bot persistence")
+    parser.add_argument("--chats", type=int, default=1000, help="Chats in the synthetic corpus")
+    parser.add_argument("--messages", type=int, default=100, help="Messages per chat")
+    parser.add_argument("--bots", type=int, default=500, help="Bots in the synthetic corpus")
+    parser.add_argument("--ops", type=int, default=200, help="Timed operations per measurement")
+    parser.add_argument("--threads", type=int, default=8, help="Writer threads for the concurrency runs")
+    parser.add_argument("--backends", default=",".join(sorted(STORAGE_BACKENDS)),
+                        help="Comma-separated chat storage backends")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary corpus")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpus")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare against this results file")
+    parser.add_argument("--save-baseline", default=None, help="Also write the results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging, 0.25 = 25%%")
+    args = parser.parse_args()
+    args.backends = [backend for backend in args.backends.split(",") if backend]
+    unknown = set(args.backends) - set(STORAGE_BACKENDS)
+    if unknown:
+        parser.error(f"Unknown backends: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    results = run_benchmarks(args)
+    print_summary(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        results["regressions"] = regressions
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        for regression in regressions:
+            print(f"REGRESSION {regression['suite']}.{regression['operation']} {regression['metric']}: "
+                  f"{regression['baseline']:.3f} -> {regression['current']:.3f} ({regression['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+from .file_utils import file_lock, temp_path
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".index.json"
+LOCK_FILENAME = ".lock"
+INDEX_VERSION = 1
+REQUIRED_FIELDS = ('name', 'system_prompt', 'base_model', 'parameters')
+
+@dataclass
+class BotIndexEntry:
+    id: str
+    name: str
+    base_model: str
+    updated_at: str
+    file: str
+    mtime_ns: int = 0
+    size: int = 0
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "base_model": self.base_model,
+            "updated_at": self.updated_at
+        }
+
+INDEX_FIELDS = frozenset(("id", "name", "base_model", "updated_at"))
+
+class BotCatalog:
+    """Compact index of the bot definitions in a directory.
+
+    The index keeps id, name, base model and updated_at for every bot and is
+    persisted next to the bot files, so startup only stats the directory and
+    parses the files that changed. Full definitions are parsed on first access
+    and kept in an LRU cache.
+
+    Writes hold an flock on ``.lock`` in the directory, and changing one bot
+    rewrites only that bot's index entry, so processes sharing the directory
+    do not drop each other's changes.
+    """
+
+    def __init__(self, bots_dir: str, factory: Callable[[str, Dict], object], cache_size: int = 256):
+        self.bots_dir = bots_dir
+        self.index_path = os.path.join(bots_dir, INDEX_FILENAME)
+        self.lock_path = os.path.join(bots_dir, LOCK_FILENAME)
+        self.cache_size = cache_size
+        self._factory = factory
+        self._entries: Dict[str, BotIndexEntry] = {}
+        self._cache: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _bot_path(self, filename: str) -> str:
+        return os.path.join(self.bots_dir, filename)
+
+    def _read_index(self) -> Dict[str, BotIndexEntry]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return {}
+            return {bot_id: BotIndexEntry(id=bot_id, **entry) for bot_id, entry in data['bots'].items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Rebuilding invalid bot index: {e}")
+            return {}
+
+    def _write_index(self, bot_id: Optional[str] = None) -> None:
+        """Persist the index; with ``bot_id``, only that entry is taken from memory and the rest from disk.
+
+        Caller holds the file lock.
+        """
+        entries = self._entries
+        if bot_id is not None:
+            entries = self._read_index() or dict(self._entries)
+            if bot_id in self._entries:
+                entries[bot_id] = self._entries[bot_id]
+            else:
+                entries.pop(bot_id, None)
+        data = {
+            "version": INDEX_VERSION,
+            "bots": {
+                bot_id: {k: v for k, v in asdict(entry).items() if k != 'id'}
+                for bot_id, entry in entries.items()
+            }
+        }
+        try:
+            tmp_path = temp_path(self.index_path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Error writing bot index: {e}")
+
+    def _read_bot_file(self, filename: str) -> Optional[Dict]:
+        """Parse a bot file, returning None if it is missing or invalid"""
+        try:
+            with open(self._bot_path(filename), 'r', encoding='utf-8') as f:
+                bot_data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            logger.error(f"Error loading bot {filename}: {str(e)}")
+            return None
+        if not isinstance(bot_data, dict) or not all(key in bot_data for key in REQUIRED_FIELDS):
+            logger.warning(f"Skipping invalid bot file: {filename}")
+            return None
+        return bot_data
+
+    def _index_file(self, bot_id: str, filename: str, stat: os.stat_result) -> Optional[Dict]:
+        """Parse a bot file and record it in the index"""
+        bot_data = self._read_bot_file(filename)
+        if bot_data is None:
+            self._entries.pop(bot_id, None)
+            return None
+        self._entries[bot_id] = BotIndexEntry(
+            id=bot_id,
+            name=bot_data['name'],
+            base_model=bot_data['base_model'],
+            updated_at=bot_data.get('updated_at', ''),
+            file=filename,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size
+        )
+        return bot_data
+
+    def load(self) -> None:
+        """Load the index and reconcile it with the bot files on disk"""
+        with self._lock:
+            self._entries = self._read_index()
+            changed = False
+            seen = set()
+            with os.scandir(self.bots_dir) as entries:
+                for dir_entry in entries:
+                    filename = dir_entry.name
+                    if not filename.endswith('.json') or filename.startswith('.'):
+                        continue
+                    bot_id = filename[:-5]  # Remove .json extension
+                    seen.add(bot_id)
+                    stat = dir_entry.stat()
+                    entry = self._entries.get(bot_id)
+                    if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                        continue
+                    self._cache.pop(bot_id, None)
+                    self._index_file(bot_id, filename, stat)
+                    changed = True
+            for bot_id in set(self._entries) - seen:
+                del self._entries[bot_id]
+                self._cache.pop(bot_id, None)
+                changed = True
+            if changed or not os.path.exists(self.index_path):
+                try:
+                    with file_lock(self.lock_path):
+                        self._write_index()
+                except OSError as e:
+                    logger.error(f"Error writing bot index: {e}")
+            logger.info(f"Indexed {len(self._entries)} bots")
+
+    def reload(self, bot_id: str) -> bool:
+        """Re-index a single bot file; returns True if the bot was added, changed or removed"""
+        with self._lock:
+            filename = f"{bot_id}.json"
+            try:
+                stat = os.stat(self._bot_path(filename))
+            except FileNotFoundError:
+                if self._entries.pop(bot_id, None) is None:
+                    return False
+                self._cache.pop(bot_id, None)
+                with file_lock(self.lock_path):
+                    self._write_index(bot_id)
+                return True
+
+            entry = self._entries.get(bot_id)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return False
+            self._cache.pop(bot_id, None)
+            self._index_file(bot_id, filename, stat)
+            with file_lock(self.lock_path):
+                self._write_index(bot_id)
+            return True
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Get the indexed (mtime_ns, size) of every bot file"""
+        with self._lock:
+            return {bot_id: (entry.mtime_ns, entry.size) for bot_id, entry in self._entries.items()}
+
+    def _cache_put(self, bot_id: str, bot: object) -> None:
+        self._cache[bot_id] = bot
+        self._cache.move_to_end(bot_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, bot_id: str):
+        """Get a full bot definition, parsing its file on first access"""
+        with self._lock:
+            bot = self._cache.get(bot_id)
+            if bot is not None:
+                self._cache.move_to_end(bot_id)
+                return bot
+            entry = self._entries.get(bot_id)
+            if entry is None:
+                return None
+            bot_data = self._read_bot_file(entry.file)
+            if bot_data is None:
+                return None
+            bot = self._factory(bot_id, bot_data)
+            self._cache_put(bot_id, bot)
+            return bot
+
+    def put(self, bot_id: str, bot: object, bot_data: Dict) -> None:
+        """Write a bot definition to disk and update the index"""
+        with self._lock, file_lock(self.lock_path):
+            filename = f"{bot_id}.json"
+            bot_path = self._bot_path(filename)
+            tmp_path = temp_path(bot_path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(bot_data, f, indent=4)
+            os.replace(tmp_path, bot_path)
+            stat = os.stat(bot_path)
+            self._entries[bot_id] = BotIndexEntry(
+                id=bot_id,
+                name=bot_data['name'],
+                base_model=bot_data['base_model'],
+                updated_at=bot_data.get('updated_at', ''),
+                file=filename,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size
+            )
+            self._cache_put(bot_id, bot)
+            self._write_index(bot_id)
+
+    def remove(self, bot_id: str) -> bool:
+        """Delete a bot file and drop it from the index"""
+        with self._lock, file_lock(self.lock_path):
+            entry = self._entries.pop(bot_id, None)
+            self._cache.pop(bot_id, None)
+            if entry is None:
+                return False
+            bot_path = self._bot_path(entry.file)
+            if os.path.exists(bot_path):
+                os.remove(bot_path)
+            self._write_index(bot_id)
+            return True
+
+    def cached(self, bot_id: str):
+        """Get a bot only if its full definition is already cached"""
+        with self._lock:
+            return self._cache.get(bot_id)
+
+    def entries(self, offset: int = 0, limit: Optional[int] = None) -> List[BotIndexEntry]:
+        """Get a page of index entries ordered by bot id"""
+        with self._lock:
+            bot_ids = sorted(self._entries)
+            end = None if limit is None else offset + limit
+            return [self._entries[bot_id] for bot_id in bot_ids[offset:end]]
+
+    def __contains__(self, bot_id: str) -> bool:
+        return bot_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,9 +1,11 @@
 import os
-import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
 import logging
-from .model_inference import ModelInference, ModelConfig
+from .model_inference import ModelInference
+from .model_index import get_model_index
+from .model_pool import ModelPool
+from .bot_catalog import BotCatalog, INDEX_FIELDS
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,8 @@ class Bot:
         self.parameters = parameters
         self.created_at = datetime.now().isoformat()
         self.updated_at = self.created_at
-        self._model_inference = ModelInference()
+        self._model_inference: Optional[ModelInference] = None
+        self._model_path: Optional[str] = None
         self._model_loaded = False
 
     def to_dict(self) -> Dict:
@@ -30,26 +33,32 @@ class Bot:
             "updated_at": self.updated_at
         }
 
-    def load_model(self, model_path: str) -> bool:
-        """Load the model for inference"""
-        try:
-            config = ModelConfig(
-                model_path=model_path,
-                n_ctx=2048,
-                n_threads=None,  # Use all available threads
-                n_batch=512
-            )
-            self._model_loaded = self._model_inference.load_model(model_path, config)
-            return self._model_loaded
-        except Exception as e:
-            logger.error(f"Error loading model: {str(e)}")
-            return False
+    @classmethod
+    def from_dict(cls, bot_id: str, data: Dict) -> 'Bot':
+        bot = cls(
+            id=bot_id,
+            name=data['name'],
+            system_prompt=data['system_prompt'],
+            base_model=data['base_model'],
+            parameters=data['parameters']
+        )
+        bot.created_at = data.get('created_at', bot.created_at)
+        bot.updated_at = data.get('updated_at', bot.updated_at)
+        return bot
 
-    def unload_model(self) -> None:
-        """Unload the model"""
-        if self._model_loaded:
-            self._model_inference.unload_model()
-            self._model_loaded = False
+    def attach_model(self, model_path: str, model_inference: ModelInference) -> None:
+        """Use a loaded model for inference"""
+        self._model_inference = model_inference
+        self._model_path = model_path
+        self._model_loaded = True
+
+    def detach_model(self) -> Optional[str]:
+        """Stop using the current model and return its path"""
+        model_path = self._model_path
+        self._model_inference = None
+        self._model_path = None
+        self._model_loaded = False
+        return model_path
 
     def generate_response(self, messages: List[Dict], parameters: Dict = None):
         """Generate a response using the bot's configuration and given parameters"""
@@ -67,12 +76,14 @@ class Bot:
             conversation.extend(messages)
             
             # Check if model is loaded
-            if not self._model_loaded:
+            model_inference = self._model_inference
+            if not self._model_loaded or model_inference is None:
                 yield {
                     'token': (
                         f"Error: Model {self.base_model} is not loaded. "
                         "Please ensure the model is downloaded and loaded before generating responses."
-                    )
+                    ),
+                    'error': True
                 }
                 return
             
@@ -90,7 +101,7 @@ class Bot:
             
             # Generate streaming response using the model
             try:
-                for token in self._model_inference.generate_response(
+                for token in model_inference.generate_response(
                     messages=conversation,
                     **params
                 ):
@@ -100,20 +111,23 @@ class Bot:
                         
             except Exception as e:
                 print(f"[ERROR] Error in streaming response: {e}")
-                yield {'token': f"Error generating response: {str(e)}"}
+                yield {'token': f"Error generating response: {str(e)}", 'error': True}
                 
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            yield {'token': f"Error generating response: {str(e)}"}
+            yield {'token': f"Error generating response: {str(e)}", 'error': True}
 
 class BotManager:
-    def __init__(self, bots_dir: str = "bots", models_dir: str = "models"):
+    def __init__(self, bots_dir: str = "bots", models_dir: str = "models", model_pool: Optional[ModelPool] = None,
+                 cache_size: int = 256):
         self.bots_dir = bots_dir
         self.models_dir = models_dir
-        self.bots: Dict[str, Bot] = {}
+        self.catalog = BotCatalog(bots_dir, Bot.from_dict, cache_size=cache_size)
+        self.model_index = get_model_index(models_dir)
+        self.model_pool = model_pool or ModelPool()
         self._ensure_bots_directory()
-        self._ensure_default_bot()
         self._load_bots()
+        self._ensure_default_bot()
 
     def _ensure_bots_directory(self):
         """Ensure the bots directory exists"""
@@ -122,40 +136,17 @@ class BotManager:
             logger.info(f"Created bots directory: {self.bots_dir}")
 
     def _load_bots(self):
-        """Load all bots from the bots directory"""
+        """Load the bot index, parsing only bot files that changed since it was written"""
         try:
-            for filename in os.listdir(self.bots_dir):
-                if filename.endswith('.json'):
-                    bot_id = filename[:-5]  # Remove .json extension
-                    if bot_id not in self.bots:  # Only load if not already in memory
-                        try:
-                            bot_path = os.path.join(self.bots_dir, filename)
-                            with open(bot_path, 'r') as f:
-                                bot_data = json.load(f)
-                                # Skip invalid bot files
-                                if not all(key in bot_data for key in ['name', 'system_prompt', 'base_model', 'parameters']):
-                                    logger.warning(f"Skipping invalid bot file: {filename}")
-                                    continue
-                                bot = Bot(
-                                    id=bot_id,
-                                    name=bot_data['name'],
-                                    system_prompt=bot_data['system_prompt'],
-                                    base_model=bot_data['base_model'],
-                                    parameters=bot_data['parameters']
-                                )
-                                self.bots[bot_id] = bot
-                                logger.info(f"Loaded bot: {bot_id}")
-                        except (json.JSONDecodeError, KeyError) as e:
-                            logger.error(f"Error loading bot {filename}: {str(e)}")
-                            # Remove corrupted bot file
-                            os.remove(os.path.join(self.bots_dir, filename))
-                            logger.info(f"Removed corrupted bot file: {filename}")
+            self.catalog.load()
         except Exception as e:
             logger.error(f"Error loading bots: {str(e)}")
 
     def _ensure_default_bot(self):
         """Create default MIDAS40 bot if it doesn't exist"""
         try:
+            if self.catalog.get('MIDAS40') is not None:
+                return
             default_bot = Bot(
                 id='MIDAS40',
                 name='MIDAS40',
@@ -174,7 +165,6 @@ class BotManager:
                     'repetition_penalty': 1.2
                 }
             )
-            self.bots['MIDAS40'] = default_bot
             self._save_bot(default_bot)
             logger.info("Created default MIDAS40 bot")
         except Exception as e:
@@ -183,47 +173,72 @@ class BotManager:
     def _save_bot(self, bot: Bot):
         """Save a bot to file"""
         try:
-            bot_path = os.path.join(self.bots_dir, f"{bot.id}.json")
-            with open(bot_path, 'w') as f:
-                json.dump(bot.to_dict(), f, indent=4)
+            self.catalog.put(bot.id, bot, bot.to_dict())
             logger.info(f"Saved bot: {bot.id}")
         except Exception as e:
             logger.error(f"Error saving bot {bot.id}: {str(e)}")
 
-    def get_bot(self, bot_id: str) -> Optional[Bot]:
-        """Get a bot by ID and ensure its model is loaded"""
-        bot = self.bots.get(bot_id)
+    def _load_bot_model(self, bot: Bot) -> bool:
+        """Load the model backing a bot, resolved through the model index"""
+        model_path = self.model_index.resolve(bot.base_model)
+        if model_path is None:
+            logger.error(f"Model file not found for {bot.base_model}")
+            return False
+
+        logger.info(f"Loading model for bot {bot.id} from: {model_path}")
+        model_inference = self.model_pool.acquire(model_path, bot.id)
+        if model_inference is None:
+            logger.error(f"Failed to load model for bot {bot.id}")
+            return False
+        bot.attach_model(model_path, model_inference)
+        return True
+
+    def _unload_bot_model(self, bot: Bot) -> None:
+        """Release the model backing a bot.
+
+        Released by bot id, since the Bot that acquired the model may have
+        been evicted from the catalog cache and replaced by a fresh one.
+        """
+        bot.detach_model()
+        self.model_pool.release_user(bot.id)
+
+    def reload_bot(self, bot_id: str) -> bool:
+        """Pick up an on-disk change to a single bot file.
+
+        The changed bot gets a fresh Bot object, so per-bot state is rebuilt
+        while in-flight generations finish on the old one. The loaded model is
+        carried over unless base_model changed. Other models are released by
+        bot id, which also covers a Bot evicted from the cache before the change.
+        """
+        old_bot = self.catalog.cached(bot_id)
+        if not self.catalog.reload(bot_id):
+            return False
+        logger.info(f"Reloaded bot: {bot_id}")
+
+        new_bot = self.catalog.get(bot_id)
+        model_path = self.model_index.resolve(new_bot.base_model) if new_bot is not None else None
+        self.model_pool.release_user(bot_id, keep=model_path)
+        if old_bot is not None and old_bot._model_loaded and old_bot._model_path == model_path:
+            new_bot.attach_model(model_path, old_bot._model_inference)
+        return True
+
+    def get_bot(self, bot_id: str, load_model: bool = True) -> Optional[Bot]:
+        """Get a bot by ID and, unless load_model is False, ensure its model is loaded"""
+        bot = self.catalog.get(bot_id)
         if bot is None:
             return None
             
         # Check if model needs to be loaded
-        if not bot._model_loaded:
-            # Use uppercase model name to match actual file
-            model_filename = f"{bot.base_model.upper()}.gguf"
-            model_path = os.path.join(os.path.abspath(self.models_dir), model_filename)
-            logger.info(f"Attempting to load model from: {model_path}")
-            
-            if os.path.exists(model_path):
-                logger.info(f"Found model file at: {model_path}")
-                success = bot.load_model(model_path)
-                if not success:
-                    logger.error(f"Failed to load model for bot {bot_id}")
-            else:
-                logger.error(f"Model file not found: {model_path}")
-                # Try alternate casing
-                alt_model_path = os.path.join(os.path.abspath(self.models_dir), f"{bot.base_model}.gguf")
-                if os.path.exists(alt_model_path):
-                    logger.info(f"Found model file with alternate casing at: {alt_model_path}")
-                    success = bot.load_model(alt_model_path)
-                    if not success:
-                        logger.error(f"Failed to load model for bot {bot_id}")
-                else:
-                    logger.error(f"Model file not found with alternate casing: {alt_model_path}")
+        if load_model and not bot._model_loaded:
+            self._load_bot_model(bot)
                 
         return bot
 
     def create_bot(self, bot_id: str, name: str, system_prompt: str, base_model: str, parameters: Dict) -> Optional[Bot]:
         """Create a new bot or update existing one"""
+        if not self.model_index.contains(base_model):
+            raise ValueError(f"Model {base_model} is not downloaded")
+
         try:
             # Create or update bot
             bot = Bot(
@@ -233,30 +248,9 @@ class BotManager:
                 base_model=base_model,
                 parameters=parameters
             )
-            
-            # Try to load the model with proper casing
-            model_filename = f"{base_model.upper()}.gguf"
-            model_path = os.path.join(os.path.abspath(self.models_dir), model_filename)
-            logger.info(f"Attempting to load model from: {model_path}")
-            
-            if os.path.exists(model_path):
-                logger.info(f"Found model file at: {model_path}")
-                success = bot.load_model(model_path)
-                if not success:
-                    logger.error(f"Failed to load model for new bot {bot_id}")
-            else:
-                # Try alternate casing
-                alt_model_path = os.path.join(os.path.abspath(self.models_dir), f"{base_model}.gguf")
-                if os.path.exists(alt_model_path):
-                    logger.info(f"Found model file with alternate casing at: {alt_model_path}")
-                    success = bot.load_model(alt_model_path)
-                    if not success:
-                        logger.error(f"Failed to load model for new bot {bot_id}")
-                else:
-                    logger.error(f"Model file not found: {model_path} or {alt_model_path}")
+            self._load_bot_model(bot)
             
             # Save and store the bot
-            self.bots[bot_id] = bot
             self._save_bot(bot)
             return bot
             
@@ -266,9 +260,15 @@ class BotManager:
 
     def update_bot(self, bot_id: str, **kwargs) -> Optional[Bot]:
         """Update an existing bot"""
-        bot = self.bots.get(bot_id)
+        bot = self.catalog.get(bot_id)
         if bot is None:
             return None
+
+        # Only a new base model must be downloaded; a bot whose model was
+        # removed can still have its other settings edited
+        model_changed = kwargs.get('base_model', bot.base_model) != bot.base_model
+        if model_changed and not self.model_index.contains(kwargs['base_model']):
+            raise ValueError(f"Model {kwargs['base_model']} is not downloaded")
             
         try:
             # Update bot attributes
@@ -277,27 +277,9 @@ class BotManager:
                     setattr(bot, key, value)
             
             # If base_model changed, try to load new model
-            if 'base_model' in kwargs:
-                bot.unload_model()  # Unload old model
-                model_filename = f"{kwargs['base_model'].upper()}.gguf"
-                model_path = os.path.join(os.path.abspath(self.models_dir), model_filename)
-                logger.info(f"Attempting to load new model from: {model_path}")
-                
-                if os.path.exists(model_path):
-                    logger.info(f"Found new model file at: {model_path}")
-                    success = bot.load_model(model_path)
-                    if not success:
-                        logger.error(f"Failed to load new model for bot {bot_id}")
-                else:
-                    # Try alternate casing
-                    alt_model_path = os.path.join(os.path.abspath(self.models_dir), f"{kwargs['base_model']}.gguf")
-                    if os.path.exists(alt_model_path):
-                        logger.info(f"Found new model file with alternate casing at: {alt_model_path}")
-                        success = bot.load_model(alt_model_path)
-                        if not success:
-                            logger.error(f"Failed to load new model for bot {bot_id}")
-                    else:
-                        logger.error(f"New model file not found: {model_path} or {alt_model_path}")
+            if model_changed:
+                self._unload_bot_model(bot)  # Release old model
+                self._load_bot_model(bot)
             
             bot.updated_at = datetime.now().isoformat()
             self._save_bot(bot)
@@ -310,21 +292,44 @@ class BotManager:
     def delete_bot(self, bot_id: str) -> bool:
         """Delete a bot"""
         try:
-            bot = self.bots.pop(bot_id, None)
+            bot = self.catalog.cached(bot_id)
             if bot:
-                bot.unload_model()  # Unload model before deletion
-                bot_path = os.path.join(self.bots_dir, f"{bot_id}.json")
-                if os.path.exists(bot_path):
-                    os.remove(bot_path)
-                return True
-            return False
+                bot.detach_model()
+            self.model_pool.release_user(bot_id)  # Release model before deletion
+            return self.catalog.remove(bot_id)
         except Exception as e:
             logger.error(f"Error deleting bot: {str(e)}")
             return False
 
-    def list_bots(self) -> List[Dict]:
-        """List all bots"""
-        return [bot.to_dict() for bot in self.bots.values()]
+    def count_bots(self) -> int:
+        """Get the number of bots"""
+        return len(self.catalog)
+
+    def list_bots(self, offset: int = 0, limit: Optional[int] = None,
+                  fields: Optional[List[str]] = None) -> List[Dict]:
+        """List a page of bots, ordered by ID.
+
+        When every requested field is in the index, no bot file is opened.
+        Otherwise the full definitions of the bots on the page are loaded.
+        """
+        entries = self.catalog.entries(offset, limit)
+        if fields and INDEX_FIELDS.issuperset(fields):
+            return [{field: entry.summary()[field] for field in fields} for entry in entries]
+
+        bots = []
+        for entry in entries:
+            bot = self.get_bot(entry.id, load_model=False)
+            if bot is None:
+                continue
+            bot_data = bot.to_dict()
+            if fields:
+                bot_data = {field: bot_data[field] for field in fields if field in bot_data}
+            bots.append(bot_data)
+        return bots
+
+    def base_models(self) -> Set[str]:
+        """Get the distinct models the bots use, read from the bot index"""
+        return {bot['base_model'] for bot in self.list_bots(fields=['base_model'])}
 
     def chat(self, bot_id: str, message: str, parameters: Dict = None) -> Dict[str, Any]:
         """Generate a chat response from a bot"""
@@ -1,12 +1,13 @@
 from flask import Blueprint, request, jsonify, Response
-from .bot_manager import Bot, BotManager
+from werkzeug.local import LocalProxy
+from .services import get_services
 import logging
 import re
 import json
 
 logger = logging.getLogger(__name__)
 bot_routes = Blueprint('bot_routes', __name__)
-bot_manager = BotManager()
+bot_manager = LocalProxy(lambda: get_services().bot_manager)
 
 def sanitize_bot_id(name: str) -> str:
     """Convert a bot name to a valid bot ID"""
@@ -17,10 +18,23 @@ def sanitize_bot_id(name: str) -> str:
 
 @bot_routes.route('/api/bots', methods=['GET'])
 def list_bots():
-    """List all available bots"""
+    """List available bots.
+
+    Supports ``offset``/``limit`` pagination and a comma-separated ``fields``
+    selection; the total count is returned in the X-Total-Count header.
+    """
     try:
-        bots = bot_manager.list_bots()
-        return jsonify(bots)
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', type=int)
+        fields = request.args.get('fields')
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({"error": "offset and limit must not be negative"}), 400
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+
+        bots = bot_manager.list_bots(offset=offset, limit=limit, fields=fields)
+        response = jsonify(bots)
+        response.headers['X-Total-Count'] = str(bot_manager.count_bots())
+        return response
     except Exception as e:
         logger.error(f"Error listing bots: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -29,7 +43,7 @@ def list_bots():
 def get_bot(bot_id):
     """Get a specific bot's details"""
     try:
-        bot = bot_manager.get_bot(bot_id)
+        bot = bot_manager.get_bot(bot_id, load_model=False)
         if bot is None:
             return jsonify({"error": "Bot not found"}), 404
         return jsonify(bot.to_dict())
@@ -60,16 +74,16 @@ def create_bot():
         if not bot_id:
             return jsonify({"error": "Invalid bot name"}), 400
 
-        # Create the bot
-        bot = Bot(
-            id=bot_id,
+        # Create the bot; raises ValueError if the base model is not available
+        bot = bot_manager.create_bot(
+            bot_id=bot_id,
             name=data['name'],
             system_prompt=data['system_prompt'],
             base_model=data['base_model'],
             parameters=data['parameters']
         )
-        
-        bot = bot_manager.create_bot(bot)
+        if bot is None:
+            return jsonify({"error": "Failed to create bot"}), 500
         logger.info(f"Created new bot: {bot_id}")
         return jsonify(bot.to_dict())
     except ValueError as e:
@@ -99,7 +113,7 @@ def update_bot(bot_id):
             return jsonify({"error": "Missing required parameters"}), 400
         
         # Update the bot
-        bot_manager.update_bot(
+        bot = bot_manager.update_bot(
             bot_id=bot_id,
             name=data['name'],
             description=data['description'],
@@ -108,8 +122,13 @@ def update_bot(bot_id):
             system_prompt=data['system_prompt'],
             parameters=data['parameters']
         )
+        if bot is None:
+            return jsonify({"error": "Bot not found"}), 404
         
         return jsonify({"message": "Bot updated successfully"})
+    except ValueError as e:
+        logger.warning(f"Invalid bot update request: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error updating bot {bot_id}: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,98 @@
+import os
+import logging
+import threading
+from typing import Iterable, Optional
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # inotify is Linux-only; fall back to polling
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+class BotWatcher:
+    """Reloads bot files that change on disk while the backend is running.
+
+    Uses inotify when inotify_simple is installed, and otherwise polls the bots
+    directory and compares file mtimes and sizes with the bot index. Only the
+    changed files are re-read.
+    """
+
+    def __init__(self, bot_manager, poll_interval: float = 2.0, use_inotify: bool = True):
+        self.bot_manager = bot_manager
+        self.bots_dir = bot_manager.bots_dir
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and INotify is not None
+        self._last_scan = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start watching in a background thread"""
+        if self._thread is not None:
+            return
+        target = self._watch_inotify if self.use_inotify else self._watch_polling
+        self._thread = threading.Thread(target=target, name="bot-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.bots_dir} for bot changes ({'inotify' if self.use_inotify else 'polling'})")
+
+    def stop(self) -> None:
+        """Stop watching and wait for the watcher thread to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _reload(self, bot_ids: Iterable[str]) -> None:
+        for bot_id in bot_ids:
+            try:
+                self.bot_manager.reload_bot(bot_id)
+            except Exception as e:
+                logger.error(f"Error reloading bot {bot_id}: {e}")
+
+    @staticmethod
+    def _bot_id(filename: str) -> Optional[str]:
+        if not filename.endswith('.json') or filename.startswith('.'):
+            return None
+        return filename[:-5]  # Remove .json extension
+
+    def _watch_inotify(self) -> None:
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+        with INotify() as inotify:
+            inotify.add_watch(self.bots_dir, mask)
+            while not self._stop.is_set():
+                events = inotify.read(timeout=int(self.poll_interval * 1000))
+                bot_ids = {self._bot_id(event.name) for event in events}
+                bot_ids.discard(None)
+                self._reload(sorted(bot_ids))
+
+    def _scan(self):
+        files = {}
+        with os.scandir(self.bots_dir) as entries:
+            for entry in entries:
+                bot_id = self._bot_id(entry.name)
+                if bot_id is None:
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files[bot_id] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _watch_polling(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                indexed = self.bot_manager.catalog.snapshot()
+                on_disk = self._scan()
+            except OSError as e:
+                logger.error(f"Error scanning bots directory: {e}")
+                continue
+            # Files that failed to parse are retried only once they change again
+            changed = {
+                bot_id for bot_id, stat in on_disk.items()
+                if indexed.get(bot_id) != stat and self._last_scan.get(bot_id) != stat
+            }
+            changed.update(set(indexed) - set(on_disk))
+            self._last_scan = on_disk
+            self._reload(sorted(changed))
@@ -0,0 +1,243 @@
+import os
+import gzip
+import json
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from .chat_storage import ChatStorage, iter_shards, migrate_to_shards, page_bounds, shard_dir
+from .file_utils import file_lock, temp_path
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIRNAME = "archive"
+ARCHIVE_EXT = ".jsonl.gz"
+LOCK_FILENAME = ".lock"
+GZIP_SIZE = struct.Struct("<I")
+
+class TieredChatStorage(ChatStorage):
+    """Hot storage plus a compressed cold tier for chats nobody touches.
+
+    ``archive()`` moves a chat out of the wrapped storage into
+    ``archive/ab/cd/<id>.jsonl.gz``: one gzip-compressed JSON Lines file
+    holding the header and the messages. Archived chats are read straight from the
+    archive and moved back to hot storage on their next write. Hot chats go
+    to the wrapped storage first, so their reads and writes do no extra work.
+    Moves between the tiers hold a thread lock and an flock on
+    ``archive/.lock``, so processes sharing the directory do not race them.
+    """
+
+    def __init__(self, storage: ChatStorage, archive_dir: str, compresslevel: int = 6):
+        self.storage = storage
+        self.archive_dir = archive_dir
+        self.compresslevel = compresslevel
+        self._thread_lock = threading.Lock()
+        os.makedirs(archive_dir, exist_ok=True)
+        migrate_to_shards(archive_dir, (ARCHIVE_EXT,))
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        with self._thread_lock, file_lock(os.path.join(self.archive_dir, LOCK_FILENAME)):
+            yield
+
+    def _archive_path(self, chat_id: str) -> str:
+        return os.path.join(shard_dir(self.archive_dir, chat_id), f"{chat_id}{ARCHIVE_EXT}")
+
+    def _read_archive(self, chat_id: str) -> Optional[Dict]:
+        """Decompress an archived chat"""
+        chat_data = None
+        messages = []
+        try:
+            with gzip.open(self._archive_path(chat_id), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record.pop("type", None) == "message":
+                        messages.append(record)
+                    else:
+                        chat_data = record
+        except FileNotFoundError:
+            return None
+        if chat_data is None:
+            return None
+        chat_data["messages"] = messages
+        return chat_data
+
+    def _write_archive(self, chat_data: Dict) -> int:
+        """Compress a chat into the archive; returns the compressed size"""
+        path = self._archive_path(chat_data["id"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = temp_path(path)
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=self.compresslevel) as f:
+            header = {k: v for k, v in chat_data.items() if k != "messages"}
+            f.write(json.dumps({"type": "header", **header}, ensure_ascii=False) + "\n")
+            for message in chat_data.get("messages", []):
+                f.write(json.dumps({"type": "message", **message}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _restore(self, chat_id: str) -> bool:
+        """Move an archived chat back to hot storage; True if it is in hot storage now"""
+        with self._lock():
+            chat_data = self._read_archive(chat_id)
+            if chat_data is None:
+                # Another thread or process may have restored it first
+                return self.storage.exists(chat_id)
+            self.storage.import_chat(chat_data)
+            os.remove(self._archive_path(chat_id))
+        logger.info(f"Restored chat {chat_id} from the archive")
+        return True
+
+    def archive(self, chat_id: str) -> Optional[Tuple[int, int]]:
+        """Move a hot chat into the archive; returns (original, compressed) sizes.
+
+        Appends and renames do not take the archive lock, so the hot copy is
+        only deleted if it was not written while being archived; otherwise
+        the archive is dropped again and None returned.
+        """
+        with self._lock():
+            revision = self.storage.revision(chat_id)
+            chat_data = self.storage.load(chat_id)
+            if chat_data is None:
+                return None
+            chat_data["id"] = chat_id
+            original_size = self.storage.size(chat_id)
+            compressed_size = self._write_archive(chat_data)
+            if not self.storage.delete_if_unchanged(chat_id, revision):
+                os.remove(self._archive_path(chat_id))
+                logger.info(f"Chat {chat_id} was written while being archived, keeping it in hot storage")
+                return None
+        return original_size, compressed_size
+
+    def is_archived(self, chat_id: str) -> bool:
+        return os.path.exists(self._archive_path(chat_id))
+
+    def archive_stats(self) -> Dict[str, int]:
+        """Count archived chats and their compressed and uncompressed sizes"""
+        stats = {"chats": 0, "bytes": 0, "original_bytes": 0}
+        for entry in self._iter_archived():
+            stats["chats"] += 1
+            stats["bytes"] += entry.stat().st_size
+            # The gzip trailer ends with the uncompressed size modulo 2**32
+            with open(entry.path, 'rb') as f:
+                f.seek(-GZIP_SIZE.size, os.SEEK_END)
+                stats["original_bytes"] += GZIP_SIZE.unpack(f.read(GZIP_SIZE.size))[0]
+        return stats
+
+    def _iter_archived(self) -> Iterator[os.DirEntry]:
+        for shard in iter_shards(self.archive_dir):
+            with os.scandir(shard) as entries:
+                for entry in entries:
+                    if entry.name.endswith(ARCHIVE_EXT):
+                        yield entry
+
+    def create(self, chat_id: str, title: str, created_at: str) -> None:
+        self.storage.create(chat_id, title, created_at)
+
+    def append_message(self, chat_id: str, message: Dict) -> Optional[int]:
+        seq = self.storage.append_message(chat_id, message)
+        if seq is None and self._restore(chat_id):
+            seq = self.storage.append_message(chat_id, message)
+        return seq
+
+    def append_batch(self, messages: List[Tuple[str, Dict]], sync: bool = False) -> List[Optional[int]]:
+        for chat_id in {chat_id for chat_id, _ in messages}:
+            if self.is_archived(chat_id):
+                self._restore(chat_id)
+        return self.storage.append_batch(messages, sync=sync)
+
+    def count_messages(self, chat_id: str) -> Optional[int]:
+        count = self.storage.count_messages(chat_id)
+        if count is None:
+            chat_data = self._read_archive(chat_id)
+            if chat_data is not None:
+                count = len(chat_data["messages"])
+        return count
+
+    def set_title(self, chat_id: str, title: str, timestamp: str) -> bool:
+        if self.storage.set_title(chat_id, title, timestamp):
+            return True
+        return self._restore(chat_id) and self.storage.set_title(chat_id, title, timestamp)
+
+    def import_chat(self, chat_data: Dict) -> None:
+        self.storage.import_chat(chat_data)
+        if self.is_archived(chat_data["id"]):
+            os.remove(self._archive_path(chat_data["id"]))
+
+    def exists(self, chat_id: str) -> bool:
+        return self.storage.exists(chat_id) or self.is_archived(chat_id)
+
+    def load(self, chat_id: str) -> Optional[Dict]:
+        chat_data = self.storage.load(chat_id)
+        if chat_data is None:
+            chat_data = self._read_archive(chat_id)
+        return chat_data
+
+    def iter_messages(self, chat_id: str) -> Iterator[Dict]:
+        if self.storage.exists(chat_id):
+            yield from self.storage.iter_messages(chat_id)
+            return
+        chat_data = self._read_archive(chat_id)
+        yield from (chat_data or {}).get("messages", [])
+
+    def get_messages(self, chat_id: str, limit: Optional[int] = None, before: Optional[int] = None,
+                     after: Optional[int] = None) -> Optional[List[Dict]]:
+        messages = self.storage.get_messages(chat_id, limit=limit, before=before, after=after)
+        if messages is not None:
+            return messages
+        chat_data = self._read_archive(chat_id)
+        if chat_data is None:
+            return None
+        messages = chat_data["messages"]
+        start, end = page_bounds(len(messages), limit, before, after)
+        return [{**message, "seq": seq} for seq, message in enumerate(messages[start:end], start)]
+
+    def size(self, chat_id: str) -> int:
+        if self.storage.exists(chat_id):
+            return self.storage.size(chat_id)
+        try:
+            return os.path.getsize(self._archive_path(chat_id))
+        except FileNotFoundError:
+            return 0
+
+    def revision(self, chat_id: str) -> int:
+        if self.storage.exists(chat_id):
+            return self.storage.revision(chat_id)
+        # Archives are written once, so their size serves
+        return self.size(chat_id)
+
+    def summarize(self, chat_id: str) -> Optional[Dict]:
+        summary = self.storage.summarize(chat_id)
+        if summary is not None:
+            return summary
+        chat_data = self._read_archive(chat_id)
+        if chat_data is None or "created_at" not in chat_data:
+            return None
+        messages = chat_data["messages"]
+        return {
+            "id": chat_id,
+            "title": chat_data.get("title", "New Chat"),
+            "created_at": chat_data["created_at"],
+            "updated_at": (messages[-1].get("timestamp") if messages else None) or chat_data["created_at"],
+            "message_count": len(messages),
+            "byte_size": self.size(chat_id)
+        }
+
+    def delete(self, chat_id: str) -> bool:
+        deleted = self.storage.delete(chat_id)
+        with self._lock():
+            if self.is_archived(chat_id):
+                os.remove(self._archive_path(chat_id))
+                deleted = True
+        return deleted
+
+    def list_ids(self) -> List[str]:
+        chat_ids = set(self.storage.list_ids())
+        for entry in self._iter_archived():
+            chat_ids.add(entry.name[:-len(ARCHIVE_EXT)])
+        return list(chat_ids)
+
+    def close(self) -> None:
+        self.storage.close()
@@ -0,0 +1,39 @@
+import os
+import time
+import threading
+
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+def new_chat_id() -> str:
+    """Create a unique, time-ordered chat id in the ULID format.
+
+    The id is a 48-bit millisecond timestamp followed by 80 random bits, as 26
+    Crockford base32 characters, so ids sort by creation time. Ids created
+    in the same millisecond increment the random part, so they stay unique
+    and ordered within a process; the random bits keep processes apart.
+    """
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms and _last_random + 1 < 1 << RANDOM_BITS:
+            # Same millisecond, or the clock went back: stay after the previous id
+            now_ms = _last_ms
+            random_part = _last_random + 1
+        else:
+            now_ms = max(now_ms, _last_ms + 1)
+            random_part = int.from_bytes(os.urandom(RANDOM_BITS // 8), "big")
+        _last_ms = now_ms
+        _last_random = random_part
+    return _encode(now_ms, 10) + _encode(random_part, 16)
@@ -0,0 +1,145 @@
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SORT_COLUMNS = ('created_at', 'updated_at', 'title', 'message_count', 'byte_size')
+COLUMNS = "id, title, created_at, updated_at, message_count, byte_size"
+
+class ChatIndex:
+    """Persistent metadata index for chats.
+
+    Keeps id, title, created_at, updated_at, message count and byte size for
+    every chat in a SQLite table, so listings are served sorted and paginated
+    without opening any chat file. Each update is its own transaction and
+    records the chat's storage revision (see ChatStorage.revision).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chats ("
+                " id TEXT PRIMARY KEY,"
+                " title TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL,"
+                " message_count INTEGER NOT NULL DEFAULT 0,"
+                " byte_size INTEGER NOT NULL DEFAULT 0,"
+                " revision INTEGER NOT NULL DEFAULT 0)"
+            )
+            if "revision" not in {row["name"] for row in conn.execute("PRAGMA table_info(chats)")}:
+                # Indexes from before revisions used the byte size as the watermark
+                conn.execute("ALTER TABLE chats ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+                conn.execute("UPDATE chats SET revision = byte_size")
+            conn.execute("CREATE INDEX IF NOT EXISTS chats_created_at ON chats (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS chats_updated_at ON chats (updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection to the index"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, chat_id: str, title: str, created_at: str, updated_at: Optional[str] = None,
+            message_count: int = 0, byte_size: int = 0, revision: int = 0) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chats (id, title, created_at, updated_at, message_count, byte_size, revision)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chat_id, title, created_at, updated_at or created_at, message_count, byte_size, revision)
+            )
+
+    def record_message(self, chat_id: str, updated_at: str, byte_size: int, revision: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE chats SET message_count = message_count + 1, updated_at = ?, byte_size = ?, revision = ?"
+                " WHERE id = ?",
+                (updated_at, byte_size, revision, chat_id)
+            )
+
+    def record_messages(self, updates: Iterable[Tuple[str, int, str, int, int]]) -> None:
+        """Apply (chat_id, new message count, updated_at, byte_size, revision) tuples in a single transaction"""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE chats SET message_count = message_count + ?, updated_at = ?, byte_size = ?, revision = ?"
+                " WHERE id = ?",
+                [
+                    (count, updated_at, byte_size, revision, chat_id)
+                    for chat_id, count, updated_at, byte_size, revision in updates
+                ]
+            )
+
+    def rename(self, chat_id: str, title: str, updated_at: str, byte_size: int, revision: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE chats SET title = ?, updated_at = ?, byte_size = ?, revision = ? WHERE id = ?",
+                (title, updated_at, byte_size, revision, chat_id)
+            )
+
+    def set_byte_size(self, chat_id: str, byte_size: int, revision: int) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE chats SET byte_size = ?, revision = ? WHERE id = ?", (byte_size, revision, chat_id))
+
+    def list_idle(self, updated_before: str) -> List[str]:
+        """Get the ids of chats last updated before a timestamp"""
+        rows = self._connect().execute(
+            "SELECT id FROM chats WHERE updated_at < ? ORDER BY updated_at", (updated_before,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_range(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict]:
+        """Stream chats updated within [since, until), oldest first"""
+        cursor = self._connect().execute(
+            f"SELECT {COLUMNS} FROM chats WHERE updated_at >= ? AND (? IS NULL OR updated_at < ?)"
+            " ORDER BY updated_at, id",
+            (since or "", until, until)
+        )
+        for row in cursor:
+            yield dict(row)
+
+    def remove(self, chat_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
+
+    def revisions(self) -> Dict[str, int]:
+        """Get the indexed storage revision of every chat, the watermark checked by ChatManager.reconcile_index"""
+        return {row[0]: row[1] for row in self._connect().execute("SELECT id, revision FROM chats")}
+
+    def get(self, chat_id: str) -> Optional[Dict]:
+        row = self._connect().execute(f"SELECT {COLUMNS} FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, sort: str = 'created_at',
+             descending: bool = True) -> List[Dict]:
+        """Get a page of chat metadata"""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort chats by {sort}")
+        order = "DESC" if descending else "ASC"
+        rows = self._connect().execute(
+            f"SELECT {COLUMNS} FROM chats ORDER BY {sort} {order}, id {order} LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def replace_all(self, chats: List[Dict]) -> None:
+        """Replace the whole index in one transaction"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chats")
+            conn.executemany(
+                "INSERT INTO chats (id, title, created_at, updated_at, message_count, byte_size, revision)"
+                " VALUES (:id, :title, :created_at, :updated_at, :message_count, :byte_size, :revision)",
+                chats
+            )
+        logger.info(f"Rebuilt chat index with {len(chats)} chats")
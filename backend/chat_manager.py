@@ -1,97 +1,270 @@
-import json
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
+from .chat_storage import ChatCorruptedError, ChatStorage, JsonlChatStorage
+from .sqlite_chat_storage import SqliteChatStorage
+from .chat_ids import new_chat_id
+from .chat_index import ChatIndex
+from .chat_search import ChatSearchIndex
+from .write_behind import WriteBehindChatStorage
+from .chat_archive import TieredChatStorage, ARCHIVE_DIRNAME
+
+INDEX_FILENAME = ".index.sqlite3"
+SEARCH_FILENAME = ".search.sqlite3"
+
+STORAGE_BACKENDS = {
+    "jsonl": JsonlChatStorage,
+    "sqlite": SqliteChatStorage
+}
+
+def write_behind_enabled() -> bool:
+    """Check MIDAS_CHAT_WRITE_BEHIND, which puts the group-commit buffer in front of chat storage"""
+    return os.environ.get("MIDAS_CHAT_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+
+def create_chat_storage(backend: str, history_dir: str, write_behind: Optional[bool] = None) -> ChatStorage:
+    """Create a chat storage backend by name.
+
+    With ``write_behind`` (default: the MIDAS_CHAT_WRITE_BEHIND environment
+    variable) the backend is wrapped in a group-commit buffer configured by
+    MIDAS_CHAT_FLUSH_INTERVAL_MS, MIDAS_CHAT_FLUSH_BATCH and MIDAS_CHAT_DURABILITY.
+    """
+    try:
+        storage_class = STORAGE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown chat storage backend: {backend}")
+    storage = TieredChatStorage(storage_class(history_dir), os.path.join(history_dir, ARCHIVE_DIRNAME))
+    if write_behind is None:
+        write_behind = write_behind_enabled()
+    if write_behind:
+        storage = WriteBehindChatStorage(
+            storage,
+            flush_interval=int(os.environ.get("MIDAS_CHAT_FLUSH_INTERVAL_MS", "50")) / 1000,
+            max_batch=int(os.environ.get("MIDAS_CHAT_FLUSH_BATCH", "256")),
+            durability=os.environ.get("MIDAS_CHAT_DURABILITY", "batch")
+        )
+    return storage
 
 class ChatManager:
-    def __init__(self, history_dir: str = "chat_history"):
+    def __init__(self, history_dir: str = "chat_history", storage: Optional[ChatStorage] = None,
+                 backend: Optional[str] = None):
         self.history_dir = history_dir
         os.makedirs(history_dir, exist_ok=True)
+        if storage is None:
+            storage = create_chat_storage(backend or os.environ.get("MIDAS_CHAT_BACKEND", "jsonl"), history_dir)
+        self.storage = storage
         self.logger = logging.getLogger(__name__)
 
-    def _get_chat_path(self, chat_id: str) -> str:
-        return os.path.join(self.history_dir, f"{chat_id}.json")
+        index_path = os.path.join(history_dir, INDEX_FILENAME)
+        index_exists = os.path.exists(index_path)
+        self.index = ChatIndex(index_path)
+        search_path = os.path.join(history_dir, SEARCH_FILENAME)
+        search_exists = os.path.exists(search_path)
+        self.search_index = ChatSearchIndex(search_path)
+        if not index_exists:
+            # Without the metadata index there is no watermark to check the search index against
+            self.rebuild_index()
+        else:
+            if not search_exists:
+                self.rebuild_search_index()
+            self.reconcile_index()
+        # With write-behind, messages are indexed once per flush instead of once per append
+        self._index_on_flush = isinstance(storage, WriteBehindChatStorage)
+        if self._index_on_flush:
+            storage.on_flush = self._index_messages
+
+    def rebuild_index(self) -> None:
+        """Rebuild the metadata and search indexes from the stored chats"""
+        self.rebuild_metadata_index()
+        self.rebuild_search_index()
+
+    def rebuild_metadata_index(self) -> None:
+        """Rebuild the chat metadata index from the stored chats"""
+        chats = []
+        for chat_id in self.storage.list_ids():
+            try:
+                # Read first: a write racing the summary then shows up as a newer revision
+                revision = self.storage.revision(chat_id)
+                summary = self.storage.summarize(chat_id)
+            except Exception as e:
+                self.logger.error(f"Error indexing chat {chat_id}: {e}")
+                continue
+            if summary:
+                chats.append({**summary, "revision": revision})
+        self.index.replace_all(chats)
+
+    def _iter_searchable_chats(self):
+        for chat_id in self.storage.list_ids():
+            try:
+                summary = self.storage.summarize(chat_id)
+                messages = self.storage.get_messages(chat_id)
+            except Exception as e:
+                self.logger.error(f"Error indexing chat {chat_id} for search: {e}")
+                continue
+            if summary and messages is not None:
+                yield chat_id, summary["title"], messages
+
+    def rebuild_search_index(self) -> None:
+        """Rebuild the full-text search index from the stored chats"""
+        self.search_index.replace_all(self._iter_searchable_chats())
+
+    def reconcile_index(self) -> int:
+        """Re-index chats whose storage revision differs from the one in the metadata index.
+
+        Every write updates the storage, then the search index, and the
+        metadata index with the chat's new revision last, so a crash or error
+        part way leaves that revision behind the storage. Chats missing from
+        either side are added or dropped. Returns the number of chats fixed.
+        """
+        indexed = self.index.revisions()
+        fixed = 0
+        for chat_id in self.storage.list_ids():
+            try:
+                if indexed.pop(chat_id, None) != self.storage.revision(chat_id):
+                    self._reindex_chat(chat_id)
+                    fixed += 1
+            except Exception as e:
+                self.logger.error(f"Error reconciling chat {chat_id}: {e}")
+        for chat_id in indexed:
+            self.search_index.remove(chat_id)
+            self.index.remove(chat_id)
+            fixed += 1
+        if fixed:
+            self.logger.info(f"Reconciled the index entries of {fixed} chats with storage")
+        return fixed
+
+    def _reindex_chat(self, chat_id: str) -> None:
+        """Rebuild the search and metadata index entries of one chat from storage"""
+        revision = self.storage.revision(chat_id)
+        summary = self.storage.summarize(chat_id)
+        messages = self.storage.get_messages(chat_id)
+        if summary is None or messages is None:
+            self.search_index.remove(chat_id)
+            self.index.remove(chat_id)
+            return
+        self.search_index.replace_chat(chat_id, summary["title"], messages)
+        self.index.add(chat_id, summary["title"], summary["created_at"], summary["updated_at"],
+                       summary["message_count"], summary["byte_size"], revision)
 
     def create_chat(self, title: str = "New Chat") -> str:
         """Create a new chat history"""
-        chat_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        chat_data = {
-            "id": chat_id,
-            "title": title,
-            "created_at": datetime.now().isoformat(),
-            "messages": []
-        }
-        
+        chat_id = new_chat_id()
+        created_at = datetime.now().isoformat()
+
         try:
-            with open(self._get_chat_path(chat_id), 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, ensure_ascii=False, indent=2)
+            self.storage.create(chat_id, title, created_at)
+            self.search_index.add_chat(chat_id, title)
+            self.index.add(chat_id, title, created_at, byte_size=self.storage.size(chat_id),
+                           revision=self.storage.revision(chat_id))
             return chat_id
         except Exception as e:
             self.logger.error(f"Error creating chat: {e}")
             raise
 
-    def add_message(self, chat_id: str, role: str, content: str) -> bool:
-        """Add a message to an existing chat"""
+    def append_message(self, chat_id: str, role: str, content: str) -> Optional[Dict]:
+        """Add a message to an existing chat and return it with its sequence number"""
         try:
-            chat_data = self.get_chat(chat_id)
-            if not chat_data:
-                return False
-            
             message = {
                 "role": role,
                 "content": content,
                 "timestamp": datetime.now().isoformat()
             }
-            chat_data["messages"].append(message)
-            
-            with open(self._get_chat_path(chat_id), 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, ensure_ascii=False, indent=2)
-            return True
+            seq = self.storage.append_message(chat_id, message)
+            if seq is None:
+                return None
+            if not self._index_on_flush:
+                self.search_index.add_message(chat_id, seq, role, content)
+                self.index.record_message(chat_id, message["timestamp"], self.storage.size(chat_id),
+                                          self.storage.revision(chat_id))
+            return {**message, "seq": seq}
         except Exception as e:
             self.logger.error(f"Error adding message to chat {chat_id}: {e}")
-            return False
+            return None
+
+    def _index_messages(self, messages: List[Tuple[str, Dict]]) -> None:
+        """Index the (chat_id, message) pairs of one write-behind flush"""
+        self.search_index.add_message_batch(
+            (chat_id, message["seq"], message["role"], message["content"]) for chat_id, message in messages
+        )
+        counts: Dict[str, int] = {}
+        updated: Dict[str, str] = {}
+        for chat_id, message in messages:
+            counts[chat_id] = counts.get(chat_id, 0) + 1
+            updated[chat_id] = message["timestamp"]
+        updates = [
+            (chat_id, count, updated[chat_id], self.storage.size(chat_id), self.storage.revision(chat_id))
+            for chat_id, count in counts.items()
+        ]
+        self.index.record_messages(updates)
+
+    def add_message(self, chat_id: str, role: str, content: str) -> bool:
+        """Add a message to an existing chat"""
+        return self.append_message(chat_id, role, content) is not None
 
     def get_chat(self, chat_id: str) -> Optional[Dict]:
-        """Get a specific chat history"""
+        """Get a specific chat history; raises ChatCorruptedError if it exists but cannot be read"""
         try:
-            chat_path = self._get_chat_path(chat_id)
-            if not os.path.exists(chat_path):
-                return None
-            
-            with open(chat_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.storage.load(chat_id)
+        except ChatCorruptedError:
+            raise
         except Exception as e:
             self.logger.error(f"Error retrieving chat {chat_id}: {e}")
             return None
 
-    def list_chats(self) -> List[Dict]:
-        """List all available chats"""
-        chats = []
+    def get_messages(self, chat_id: str, limit: Optional[int] = None, before: Optional[int] = None,
+                     after: Optional[int] = None) -> Optional[List[Dict]]:
+        """Get a page of messages by sequence cursor.
+
+        ``before`` returns the ``limit`` messages preceding that seq, ``after``
+        the ``limit`` messages following it, and neither the newest ``limit``.
+        Messages are in ascending order and carry their ``seq``.
+        """
         try:
-            for filename in os.listdir(self.history_dir):
-                if filename.endswith('.json'):
-                    chat_id = filename[:-5]  # Remove .json extension
-                    chat_data = self.get_chat(chat_id)
-                    if chat_data:
-                        chats.append({
-                            "id": chat_data["id"],
-                            "title": chat_data["title"],
-                            "created_at": chat_data["created_at"]
-                        })
-            return sorted(chats, key=lambda x: x["created_at"], reverse=True)
+            return self.storage.get_messages(chat_id, limit=limit, before=before, after=after)
+        except ChatCorruptedError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error retrieving messages for chat {chat_id}: {e}")
+            return None
+
+    def get_chat_info(self, chat_id: str) -> Optional[Dict]:
+        """Get the indexed metadata of a chat without reading its messages"""
+        return self.index.get(chat_id)
+
+    def chat_exists(self, chat_id: str) -> bool:
+        """Check whether a chat exists"""
+        return self.storage.exists(chat_id)
+
+    def count_chats(self) -> int:
+        """Get the number of chats"""
+        return self.index.count()
+
+    def list_chats(self, offset: int = 0, limit: Optional[int] = None, sort: str = "created_at",
+                   descending: bool = True) -> List[Dict]:
+        """List a page of chats from the metadata index, newest first by default"""
+        try:
+            return self.index.list(offset=offset, limit=limit, sort=sort, descending=descending)
+        except ValueError:
+            raise
         except Exception as e:
             self.logger.error(f"Error listing chats: {e}")
             return []
 
+    def search_chats(self, query: str, offset: int = 0, limit: int = 20) -> List[Dict]:
+        """Full-text search over chat titles and messages, best match first"""
+        results = self.search_index.search(query, offset=offset, limit=limit)
+        for result in results:
+            info = self.index.get(result["chat_id"])
+            result["title"] = info["title"] if info else None
+        return results
+
     def delete_chat(self, chat_id: str) -> bool:
         """Delete a specific chat history"""
         try:
-            chat_path = self._get_chat_path(chat_id)
-            if os.path.exists(chat_path):
-                os.remove(chat_path)
-                return True
-            return False
+            deleted = self.storage.delete(chat_id)
+            self.search_index.remove(chat_id)
+            self.index.remove(chat_id)
+            return deleted
         except Exception as e:
             self.logger.error(f"Error deleting chat {chat_id}: {e}")
             return False
@@ -100,23 +273,134 @@ class ChatManager:
         """Update the title of a chat"""
         self.logger.info(f"Attempting to update chat {chat_id} title to: {new_title}")
         try:
-            chat_data = self.get_chat(chat_id)
-            if not chat_data:
+            updated_at = datetime.now().isoformat()
+            if not self.storage.set_title(chat_id, new_title, updated_at):
                 self.logger.error(f"Chat {chat_id} not found")
                 return False
-            
-            old_title = chat_data["title"]
-            chat_data["title"] = new_title
-            chat_path = self._get_chat_path(chat_id)
-            
-            self.logger.info(f"Writing updated chat data to {chat_path}")
-            self.logger.info(f"Title change: {old_title} -> {new_title}")
-            
-            with open(chat_path, 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, ensure_ascii=False, indent=2)
-            
+            self.search_index.rename(chat_id, new_title)
+            self.index.rename(chat_id, new_title, updated_at, self.storage.size(chat_id),
+                              self.storage.revision(chat_id))
+
             self.logger.info(f"Successfully updated chat {chat_id} title")
             return True
         except Exception as e:
             self.logger.error(f"Error updating chat title {chat_id}: {e}")
             return False
+
+    def export_chats(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict]:
+        """Stream chats updated within [since, until) as records.
+
+        Each chat is a ``chat`` record (id, title, created_at) followed by one
+        ``message`` record per message; only one message is held at a time.
+        """
+        for info in self.index.iter_range(since, until):
+            chat_id = info["id"]
+            yield {"type": "chat", "id": chat_id, "title": info["title"], "created_at": info["created_at"]}
+            for message in self.storage.iter_messages(chat_id):
+                yield {"type": "message", **message}
+
+    def import_chats(self, records: Iterable[Dict], batch_size: int = 500) -> Dict[str, int]:
+        """Store chats from a stream of export records, replacing chats with the same id.
+
+        Messages are written in batches of ``batch_size``, so memory use does
+        not depend on the size of the import. Raises ValueError on a malformed
+        record; everything before it stays imported.
+        """
+        stats = {"chats": 0, "messages": 0}
+        current: Optional[Dict] = None
+        batch: List[Dict] = []
+
+        def flush_batch():
+            if not batch:
+                return
+            chat_id = current["id"]
+            seqs = self.storage.append_batch([(chat_id, message) for message in batch])
+            self.search_index.add_messages(
+                chat_id,
+                ((seq, message["role"], message["content"]) for seq, message in zip(seqs, batch) if seq is not None)
+            )
+            current["message_count"] += len(batch)
+            current["updated_at"] = batch[-1]["timestamp"] or current["updated_at"]
+            stats["messages"] += len(batch)
+            batch.clear()
+
+        def finish_chat():
+            flush_batch()
+            chat_id = current["id"]
+            self.index.add(chat_id, current["title"], current["created_at"], current["updated_at"],
+                           current["message_count"], self.storage.size(chat_id), self.storage.revision(chat_id))
+            stats["chats"] += 1
+
+        try:
+            for record in records:
+                record_type = record.get("type") if isinstance(record, dict) else None
+                if record_type == "chat":
+                    if current is not None:
+                        finish_chat()
+                    chat_id = record.get("id")
+                    if not isinstance(chat_id, str) or not chat_id or "/" in chat_id or chat_id.startswith("."):
+                        current = None
+                        raise ValueError(f"Invalid chat id: {chat_id!r}")
+                    if self.storage.exists(chat_id):
+                        self.delete_chat(chat_id)
+                    title = record.get("title") or "New Chat"
+                    created_at = record.get("created_at") or datetime.now().isoformat()
+                    self.storage.create(chat_id, title, created_at)
+                    self.search_index.add_chat(chat_id, title)
+                    current = {"id": chat_id, "title": title, "created_at": created_at,
+                               "updated_at": created_at, "message_count": 0}
+                elif record_type == "message":
+                    if current is None:
+                        raise ValueError("Message record before any chat record")
+                    if not isinstance(record.get("role"), str) or not isinstance(record.get("content"), str):
+                        raise ValueError("Message record needs string role and content")
+                    batch.append({
+                        "role": record["role"],
+                        "content": record["content"],
+                        "timestamp": record.get("timestamp") or current["created_at"]
+                    })
+                    if len(batch) >= batch_size:
+                        flush_batch()
+                else:
+                    raise ValueError(f"Unknown record type: {record_type!r}")
+        finally:
+            if current is not None:
+                finish_chat()
+        return stats
+
+    def archive_idle_chats(self, days: float) -> Dict[str, int]:
+        """Compress chats not updated for ``days`` days into the cold archive.
+
+        Archived chats stay readable through get_chat and get_messages and are
+        restored to hot storage on their next write.
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        stats = {"archived": 0, "bytes_before": 0, "bytes_after": 0}
+        for chat_id in self.index.list_idle(cutoff):
+            try:
+                if self.storage.is_archived(chat_id):
+                    continue
+                sizes = self.storage.archive(chat_id)
+            except Exception as e:
+                self.logger.error(f"Error archiving chat {chat_id}: {e}")
+                continue
+            if sizes is None:
+                continue
+            original_size, compressed_size = sizes
+            self.index.set_byte_size(chat_id, compressed_size, self.storage.revision(chat_id))
+            stats["archived"] += 1
+            stats["bytes_before"] += original_size
+            stats["bytes_after"] += compressed_size
+        stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+        self.logger.info(f"Archived {stats['archived']} chats, saved {stats['bytes_saved']} bytes")
+        return stats
+
+    def archive_stats(self) -> Dict[str, int]:
+        """Get the size of the cold archive and the space it saves"""
+        stats = self.storage.archive_stats()
+        stats["bytes_saved"] = stats["original_bytes"] - stats["bytes"]
+        return stats
+
+    def close(self) -> None:
+        """Flush and close the chat storage"""
+        self.storage.close()
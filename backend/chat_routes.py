@@ -1,24 +1,169 @@
-from flask import Blueprint, jsonify, request
-from .chat_manager import ChatManager
-from .bot_manager import BotManager
+from flask import Blueprint, Response, jsonify, request
+from werkzeug.local import LocalProxy
+from .services import get_services
+import json
 import logging
 
 chat_routes = Blueprint('chat_routes', __name__)
-chat_manager = ChatManager()
-bot_manager = BotManager()
+chat_manager = LocalProxy(lambda: get_services().chat_manager)
+bot_manager = LocalProxy(lambda: get_services().bot_manager)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+EXPORT_CHUNK_SIZE = 64 * 1024
+TURN_CONTEXT_MESSAGES = 50
+
 @chat_routes.route('/api/chats', methods=['GET'])
 def list_chats():
+    """List chats from the metadata index.
+
+    Supports ``offset``/``limit`` pagination, ``sort`` (created_at, updated_at,
+    title, message_count, byte_size) and ``order`` (asc or desc); the total
+    count is returned in the X-Total-Count header.
+    """
     try:
-        chats = chat_manager.list_chats()
-        return jsonify(chats)
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', type=int)
+        sort = request.args.get('sort', 'created_at')
+        order = request.args.get('order', 'desc')
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({"error": "offset and limit must not be negative"}), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({"error": "order must be asc or desc"}), 400
+
+        try:
+            chats = chat_manager.list_chats(offset=offset, limit=limit, sort=sort, descending=order == 'desc')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        response = jsonify(chats)
+        response.headers['X-Total-Count'] = str(chat_manager.count_chats())
+        return response
     except Exception as e:
         logger.error(f"Error listing chats: {e}")
         return jsonify({"error": str(e)}), 500
 
+@chat_routes.route('/api/chats/search', methods=['GET'])
+def search_chats():
+    """Full-text search over chat titles and message content.
+
+    Takes ``q`` plus ``offset``/``limit`` (default 20, at most 100). Results
+    are ranked best first and carry a snippet with matches in [brackets];
+    ``has_more`` tells whether another page exists.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 20, type=int)
+        if not query:
+            return jsonify({"error": "Missing query"}), 400
+        if offset < 0 or limit < 1 or limit > 100:
+            return jsonify({"error": "offset must not be negative and limit must be between 1 and 100"}), 400
+
+        # Fetch one extra row to know whether there is a next page without counting every match
+        results = chat_manager.search_chats(query, offset=offset, limit=limit + 1)
+        return jsonify({
+            "query": query,
+            "offset": offset,
+            "limit": limit,
+            "has_more": len(results) > limit,
+            "results": results[:limit]
+        })
+    except Exception as e:
+        logger.error(f"Error searching chats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@chat_routes.route('/api/chats/export', methods=['GET'])
+def export_chats():
+    """Stream chats as NDJSON.
+
+    Each chat is a ``{"type": "chat", ...}`` line followed by its
+    ``{"type": "message", ...}`` lines. Optional ``since`` and ``until`` ISO
+    dates select chats by their last update (since inclusive, until exclusive).
+    """
+    since = request.args.get('since')
+    until = request.args.get('until')
+    # Resolve the manager now; the generator runs after the request context is gone
+    manager = get_services().chat_manager
+
+    def generate():
+        chunk = []
+        size = 0
+        for record in manager.export_chats(since, until):
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            chunk.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_SIZE:
+                yield "".join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield "".join(chunk)
+
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=chats.ndjson'})
+
+@chat_routes.route('/api/chats/import', methods=['POST'])
+def import_chats():
+    """Import chats from an NDJSON request body in the export format.
+
+    The body is read line by line, so it may be sent with chunked transfer
+    encoding and any size. Chats with an existing id are replaced.
+    """
+    line_number = 0
+
+    def records():
+        nonlocal line_number
+        for line in request.stream:
+            line_number += 1
+            if line.strip():
+                yield json.loads(line)
+
+    try:
+        stats = chat_manager.import_chats(records())
+        return jsonify(stats)
+    except ValueError as e:
+        return jsonify({"error": f"Line {line_number}: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error importing chats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@chat_routes.route('/api/chats/archive', methods=['GET'])
+def get_archive_stats():
+    """Get the number of archived chats and the space the archive saves"""
+    try:
+        return jsonify(chat_manager.archive_stats())
+    except Exception as e:
+        logger.error(f"Error reading archive stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@chat_routes.route('/api/chats/archive', methods=['POST'])
+def archive_chats():
+    """Compress chats untouched for ``days`` days (default 30) into the cold archive"""
+    try:
+        data = request.get_json(silent=True) or {}
+        days = data.get('days', 30)
+        if not isinstance(days, (int, float)) or days < 0:
+            return jsonify({"error": "days must be a non-negative number"}), 400
+        return jsonify(chat_manager.archive_idle_chats(days))
+    except Exception as e:
+        logger.error(f"Error archiving chats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def _page_args():
+    """Read the limit/before/after message cursor from the query string"""
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+    if before is not None and after is not None:
+        raise ValueError("before and after cannot be combined")
+    if limit is not None and limit < 0:
+        raise ValueError("limit must not be negative")
+    return limit, before, after
+
+def _has_page_args() -> bool:
+    return any(arg in request.args for arg in ('limit', 'before', 'after'))
+
 @chat_routes.route('/api/chats', methods=['POST'])
 def create_chat():
     try:
@@ -32,7 +177,19 @@ def create_chat():
 
 @chat_routes.route('/api/chats/<chat_id>', methods=['GET'])
 def get_chat(chat_id):
+    """Get a chat; with limit/before/after only that page of its messages is read"""
     try:
+        if _has_page_args():
+            try:
+                limit, before, after = _page_args()
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            chat = chat_manager.get_chat_info(chat_id)
+            messages = chat_manager.get_messages(chat_id, limit=limit, before=before, after=after)
+            if chat is None or messages is None:
+                return jsonify({"error": "Chat not found"}), 404
+            return jsonify({**chat, "messages": messages})
+
         chat = chat_manager.get_chat(chat_id)
         if chat is None:
             return jsonify({"error": "Chat not found"}), 404
@@ -51,31 +208,100 @@ def add_message(chat_id):
         if not role or not content:
             return jsonify({"error": "Missing role or content"}), 400
         
-        success = chat_manager.add_message(chat_id, role, content)
-        if not success:
+        message = chat_manager.append_message(chat_id, role, content)
+        if message is None:
+            if not chat_manager.chat_exists(chat_id):
+                return jsonify({"error": "Chat not found"}), 404
             return jsonify({"error": "Failed to add message"}), 500
-        
-        # Get updated chat data
-        chat = chat_manager.get_chat(chat_id)
-        if chat is None:
-            return jsonify({"error": "Chat not found"}), 404
             
-        return jsonify(chat)
+        return jsonify({"seq": message["seq"], "message": message})
     except Exception as e:
         logger.error(f"Error adding message to chat {chat_id}: {e}")
         return jsonify({"error": str(e)}), 500
 
 @chat_routes.route('/api/chats/<chat_id>/messages', methods=['GET'])
 def get_messages(chat_id):
+    """Get messages with their seq, optionally paged by limit/before/after"""
     try:
-        chat = chat_manager.get_chat(chat_id)
-        if chat is None:
+        try:
+            limit, before, after = _page_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        messages = chat_manager.get_messages(chat_id, limit=limit, before=before, after=after)
+        if messages is None:
             return jsonify({"error": "Chat not found"}), 404
-        return jsonify(chat.get("messages", []))
+        return jsonify(messages)
     except Exception as e:
         logger.error(f"Error getting messages for chat {chat_id}: {e}")
         return jsonify({"error": str(e)}), 500
 
+@chat_routes.route('/api/chats/<chat_id>/turn', methods=['POST'])
+def chat_turn(chat_id):
+    """Run one conversation turn in a single request.
+
+    Appends the user message, builds the context from the last
+    ``context_limit`` stored messages and streams the bot's reply as
+    server-sent events in the same format as ``/api/bots/<id>/chat``. The
+    reply is saved when the stream ends, including when the client goes away
+    mid-stream, and a final ``{"done": true, "seq": ...}`` event carries its seq.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        content = data.get('content')
+        bot_id = data.get('bot_id')
+        parameters = data.get('parameters', {})
+        context_limit = data.get('context_limit', TURN_CONTEXT_MESSAGES)
+        if not content or not bot_id:
+            return jsonify({"error": "Missing content or bot_id"}), 400
+        if not isinstance(context_limit, int) or context_limit < 1:
+            return jsonify({"error": "context_limit must be a positive integer"}), 400
+
+        if not chat_manager.chat_exists(chat_id):
+            return jsonify({"error": "Chat not found"}), 404
+        bot = bot_manager.get_bot(bot_id)
+        if bot is None:
+            return jsonify({"error": "Bot not found"}), 404
+
+        message = chat_manager.append_message(chat_id, 'user', content)
+        if message is None:
+            return jsonify({"error": "Failed to add message"}), 500
+        history = chat_manager.get_messages(chat_id, limit=context_limit) or [message]
+        context = [{'role': m['role'], 'content': m['content']} for m in history]
+
+        # The generator outlives the request context, so resolve the manager now
+        manager = get_services().chat_manager
+
+        def generate():
+            reply = []
+            saved = None
+            try:
+                yield f"data: {json.dumps({'seq': message['seq'], 'role': 'user'})}\n\n"
+                for token in bot.generate_response(messages=context, parameters=parameters):
+                    # Models yield {'token': text}; the reply is saved as it was shown,
+                    # except error messages, which are only shown
+                    error = False
+                    if isinstance(token, dict):
+                        error = bool(token.get('error'))
+                        token = token.get('token', '')
+                    if token and error:
+                        yield f"data: {json.dumps({'token': token, 'error': True})}\n\n"
+                    elif token:
+                        reply.append(token)
+                        yield f"data: {json.dumps({'token': token})}\n\n"
+            finally:
+                if reply:
+                    saved = manager.append_message(chat_id, 'assistant', ''.join(reply))
+                    if saved is None:
+                        logger.error(f"Failed to save the reply for chat {chat_id}")
+            yield f"data: {json.dumps({'done': True, 'seq': saved['seq'] if saved else None})}\n\n"
+
+        return Response(generate(), mimetype='text/event-stream')
+    except Exception as e:
+        logger.error(f"Error running a turn for chat {chat_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @chat_routes.route('/api/chats/<chat_id>', methods=['PUT'])
 def update_chat(chat_id):
     try:
@@ -0,0 +1,62 @@
+"""The on-disk chat schema and conversion of older chat layouts.
+
+Version 2 is the JSON Lines log written by JsonlChatStorage, whose header
+record carries ``"schema": 2``. Anything older counts as version 1: logs
+without a schema field, backend ChatManager JSON files (role/content
+messages), frontend ChatHistory JSON files ([user, assistant] pairs) and
+bare lists of pairs. Only version 1 data is ever converted, either by
+``python -m backend.migrate_chats`` or on first write.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+SCHEMA_VERSION = 2
+
+def _pairs_to_messages(pairs: List, timestamp: str) -> List[Dict]:
+    messages = []
+    for pair in pairs:
+        if not isinstance(pair, (list, tuple)):
+            continue
+        for role, content in zip(("user", "assistant"), pair):
+            if content:
+                messages.append({"role": role, "content": content, "timestamp": timestamp})
+    return messages
+
+def _parse_timestamp(value: Optional[str], fallback: str) -> str:
+    """Turn a ChatHistory %Y%m%d_%H%M%S timestamp into ISO format"""
+    if not value:
+        return fallback
+    try:
+        return datetime.strptime(value, "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return value
+
+def normalize_chat(chat_id: str, data: Union[Dict, List], mtime: float) -> Optional[Dict]:
+    """Convert any known chat file layout to the ChatManager format"""
+    fallback = datetime.fromtimestamp(mtime).isoformat()
+    if isinstance(data, list):
+        first = data[0][0] if data and isinstance(data[0], (list, tuple)) and data[0] and data[0][0] else ""
+        return {
+            "id": chat_id,
+            "title": first[:50] + "..." if len(first) > 50 else (first or "New Chat"),
+            "created_at": fallback,
+            "messages": _pairs_to_messages(data, fallback)
+        }
+    if not isinstance(data, dict):
+        return None
+
+    created_at = data.get("created_at") or _parse_timestamp(data.get("timestamp"), fallback)
+    raw_messages = data.get("messages", [])
+    if raw_messages and isinstance(raw_messages[0], (list, tuple)):
+        messages = _pairs_to_messages(raw_messages, created_at)
+    else:
+        messages = [
+            {"role": m["role"], "content": m["content"], "timestamp": m.get("timestamp", created_at)}
+            for m in raw_messages if isinstance(m, dict) and "role" in m and "content" in m
+        ]
+    return {
+        "id": chat_id,
+        "title": data.get("title") or "New Chat",
+        "created_at": created_at,
+        "messages": messages
+    }
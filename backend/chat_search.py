@@ -0,0 +1,146 @@
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_TOKENS = 12
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query.
+
+    Every word is quoted so user input can never be parsed as FTS5 syntax;
+    the words are ANDed and the last one is matched as a prefix.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if not terms:
+        return ""
+    terms[-1] += "*"
+    return " ".join(terms)
+
+class ChatSearchIndex:
+    """Full-text index over chat titles and message content.
+
+    Documents live in an FTS5 table whose rowids point at a plain ``docs``
+    table holding (chat_id, seq, role), so a chat's documents can be found
+    through an ordinary B-tree index when it is renamed or deleted. Titles are
+    stored as documents with a NULL seq.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " id INTEGER PRIMARY KEY,"
+                " chat_id TEXT NOT NULL,"
+                " seq INTEGER,"
+                " role TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS docs_chat ON docs (chat_id, seq)")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search"
+                " USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection to the search index"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, chat_id: str, seq: Optional[int], role: str, text: str) -> None:
+        cursor = conn.execute("INSERT INTO docs (chat_id, seq, role) VALUES (?, ?, ?)", (chat_id, seq, role))
+        conn.execute("INSERT INTO search (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+
+    @staticmethod
+    def _remove(conn: sqlite3.Connection, chat_id: str) -> None:
+        conn.execute(
+            "DELETE FROM search WHERE rowid IN (SELECT id FROM docs WHERE chat_id = ?)", (chat_id,)
+        )
+        conn.execute("DELETE FROM docs WHERE chat_id = ?", (chat_id,))
+
+    def add_chat(self, chat_id: str, title: str) -> None:
+        with self._connect() as conn:
+            self._insert(conn, chat_id, None, "title", title)
+
+    def add_message(self, chat_id: str, seq: int, role: str, content: str) -> None:
+        with self._connect() as conn:
+            self._insert(conn, chat_id, seq, role, content)
+
+    def add_messages(self, chat_id: str, messages: Iterable[Tuple[int, str, str]]) -> None:
+        """Index (seq, role, content) tuples of one chat in a single transaction"""
+        with self._connect() as conn:
+            for seq, role, content in messages:
+                self._insert(conn, chat_id, seq, role, content)
+
+    def add_message_batch(self, messages: Iterable[Tuple[str, int, str, str]]) -> None:
+        """Index (chat_id, seq, role, content) tuples from any chats in a single transaction"""
+        with self._connect() as conn:
+            for chat_id, seq, role, content in messages:
+                self._insert(conn, chat_id, seq, role, content)
+
+    def rename(self, chat_id: str, title: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM search WHERE rowid IN (SELECT id FROM docs WHERE chat_id = ? AND seq IS NULL)",
+                (chat_id,)
+            )
+            conn.execute("DELETE FROM docs WHERE chat_id = ? AND seq IS NULL", (chat_id,))
+            self._insert(conn, chat_id, None, "title", title)
+
+    def remove(self, chat_id: str) -> None:
+        with self._connect() as conn:
+            self._remove(conn, chat_id)
+
+    def replace_chat(self, chat_id: str, title: str, messages: Iterable[Dict]) -> None:
+        """Re-index one chat in a single transaction; messages carry a seq"""
+        with self._connect() as conn:
+            self._remove(conn, chat_id)
+            self._insert(conn, chat_id, None, "title", title)
+            for message in messages:
+                self._insert(conn, chat_id, message["seq"], message["role"], message["content"])
+
+    def replace_all(self, chats: Iterable[Tuple[str, str, Iterable[Dict]]]) -> None:
+        """Rebuild the whole index in one transaction.
+
+        ``chats`` yields (chat_id, title, messages) where messages carry a seq.
+        """
+        count = 0
+        with self._connect() as conn:
+            conn.execute("DELETE FROM search")
+            conn.execute("DELETE FROM docs")
+            for chat_id, title, messages in chats:
+                self._insert(conn, chat_id, None, "title", title)
+                for message in messages:
+                    self._insert(conn, chat_id, message["seq"], message["role"], message["content"])
+                count += 1
+            conn.execute("INSERT INTO search (search) VALUES ('optimize')")
+        logger.info(f"Rebuilt chat search index with {count} chats")
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> List[Dict]:
+        """Get a page of matches ranked by bm25, best first.
+
+        Each result has chat_id, seq (None for a title match), role, a
+        highlighted snippet and its score (lower is better).
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        rows = self._connect().execute(
+            "SELECT d.chat_id, d.seq, d.role,"
+            f" snippet(search, 0, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet,"
+            " search.rank AS score"
+            " FROM search JOIN docs d ON d.id = search.rowid"
+            " WHERE search MATCH ? ORDER BY search.rank LIMIT ? OFFSET ?",
+            (match, limit, offset)
+        ).fetchall()
+        return [dict(row) for row in rows]
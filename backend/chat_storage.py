@@ -0,0 +1,727 @@
+import os
+import json
+import hashlib
+import logging
+import struct
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from .chat_schema import SCHEMA_VERSION, normalize_chat
+from .file_utils import file_lock, temp_path
+
+logger = logging.getLogger(__name__)
+
+LOG_EXT = ".jsonl"
+LEGACY_EXT = ".json"
+OFFSETS_EXT = ".idx"
+OFFSET = struct.Struct("<Q")
+MESSAGE_PREFIX = b'{"type": "message"'
+LOCK_STRIPES = 64
+LOCKS_DIRNAME = ".locks"
+
+class ChatCorruptedError(Exception):
+    """A stored chat exists but cannot be parsed"""
+
+class ChatBatchError(Exception):
+    """append_batch failed part way.
+
+    ``done[i]`` tells whether message i was dealt with (written, or given a
+    None seq because its chat does not exist) and ``seqs[i]`` is its seq;
+    messages that are not done were not written at all and can be retried.
+    """
+
+    def __init__(self, seqs: List[Optional[int]], done: List[bool], cause: Exception):
+        super().__init__(f"Wrote {sum(done)} of {len(done)} messages: {cause}")
+        self.seqs = seqs
+        self.done = done
+
+def shard_dir(root: str, chat_id: str) -> str:
+    """Get the ``root/ab/cd`` directory that holds a chat's files.
+
+    The two levels come from a hash of the id, so any id, including the old
+    timestamp ids, maps to its directory without a scan and no directory
+    grows past a few hundred entries.
+    """
+    digest = hashlib.blake2b(chat_id.encode('utf-8'), digest_size=2).hexdigest()
+    return os.path.join(root, digest[:2], digest[2:])
+
+def iter_shards(root: str) -> Iterator[str]:
+    """Yield every ``root/ab/cd`` shard directory"""
+    with os.scandir(root) as top:
+        for first in top:
+            if not (first.is_dir() and len(first.name) == 2 and not first.name.startswith('.')):
+                continue
+            with os.scandir(first.path) as second:
+                for entry in second:
+                    if entry.is_dir() and len(entry.name) == 2:
+                        yield entry.path
+
+def migrate_to_shards(root: str, extensions: Tuple[str, ...]) -> int:
+    """Move chat files with the given extensions from ``root`` into their shards"""
+    moved = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            for ext in extensions:
+                if entry.name.endswith(ext):
+                    target_dir = shard_dir(root, entry.name[:-len(ext)])
+                    os.makedirs(target_dir, exist_ok=True)
+                    try:
+                        os.replace(entry.path, os.path.join(target_dir, entry.name))
+                    except FileNotFoundError:
+                        # Another process starting on the same directory moved it first
+                        break
+                    moved += 1
+                    break
+    if moved:
+        logger.info(f"Moved {moved} chat files in {root} into shard directories")
+    return moved
+
+def page_bounds(count: int, limit: Optional[int] = None, before: Optional[int] = None,
+                after: Optional[int] = None) -> Tuple[int, int]:
+    """Get the [start, end) sequence range for a message page.
+
+    ``after`` pages forward from a cursor; otherwise the page ends at
+    ``before`` (or the newest message) and extends back by ``limit``.
+    """
+    if after is not None:
+        start = max(after + 1, 0)
+        end = count if limit is None else min(count, start + limit)
+    else:
+        end = count if before is None else min(max(before, 0), count)
+        start = 0 if limit is None else max(end - limit, 0)
+    return start, end
+
+class ChatStorage(ABC):
+    """Storage backend behind ChatManager.
+
+    Chats are returned as dicts with id, title, created_at and a messages
+    list of role/content/timestamp dicts.
+    """
+
+    @abstractmethod
+    def create(self, chat_id: str, title: str, created_at: str) -> None:
+        """Create an empty chat"""
+
+    @abstractmethod
+    def append_message(self, chat_id: str, message: Dict) -> Optional[int]:
+        """Append a message to a chat; returns its sequence number, or None if the chat does not exist"""
+
+    def append_batch(self, messages: List[Tuple[str, Dict]], sync: bool = False) -> List[Optional[int]]:
+        """Append (chat_id, message) pairs in order, returning their sequence numbers.
+
+        With ``sync`` the batch is flushed to stable storage before returning.
+        Raises ChatBatchError if it fails after part of the batch was written.
+        Backends override this to write and sync a whole batch at once.
+        """
+        seqs: List[Optional[int]] = []
+        for chat_id, message in messages:
+            try:
+                seqs.append(self.append_message(chat_id, message))
+            except Exception as e:
+                if not seqs:
+                    raise
+                unwritten = len(messages) - len(seqs)
+                raise ChatBatchError(seqs + [None] * unwritten, [True] * len(seqs) + [False] * unwritten, e) from e
+        return seqs
+
+    @abstractmethod
+    def count_messages(self, chat_id: str) -> Optional[int]:
+        """Get the number of messages in a chat, or None if it does not exist"""
+
+    @abstractmethod
+    def set_title(self, chat_id: str, title: str, timestamp: str) -> bool:
+        """Change the title of a chat; returns False if the chat does not exist"""
+
+    @abstractmethod
+    def import_chat(self, chat_data: Dict) -> None:
+        """Store a complete chat, replacing any chat with the same id"""
+
+    @abstractmethod
+    def exists(self, chat_id: str) -> bool:
+        """Check whether a chat exists"""
+
+    @abstractmethod
+    def load(self, chat_id: str) -> Optional[Dict]:
+        """Read a complete chat"""
+
+    @abstractmethod
+    def iter_messages(self, chat_id: str) -> Iterator[Dict]:
+        """Stream the messages of a chat"""
+
+    @abstractmethod
+    def get_messages(self, chat_id: str, limit: Optional[int] = None, before: Optional[int] = None,
+                     after: Optional[int] = None) -> Optional[List[Dict]]:
+        """Get a page of messages, each with its seq, in ascending order; None if the chat does not exist"""
+
+    @abstractmethod
+    def size(self, chat_id: str) -> int:
+        """Get the stored size of a chat in bytes"""
+
+    def revision(self, chat_id: str) -> int:
+        """Get a number that changes with every write to a chat, title changes included.
+
+        ChatManager stores it in the metadata index as the watermark it
+        reconciles against. Every write to an append-only log changes its
+        size, so by default this is the size.
+        """
+        return self.size(chat_id)
+
+    @abstractmethod
+    def summarize(self, chat_id: str) -> Optional[Dict]:
+        """Get the index metadata of a chat"""
+
+    @abstractmethod
+    def delete(self, chat_id: str) -> bool:
+        """Delete a chat; returns False if it did not exist"""
+
+    def delete_if_unchanged(self, chat_id: str, revision: int) -> bool:
+        """Delete a chat only if its revision is still ``revision``; returns whether it was deleted.
+
+        Backends override this to check and delete under the chat's lock.
+        """
+        return self.revision(chat_id) == revision and self.delete(chat_id)
+
+    @abstractmethod
+    def list_ids(self) -> List[str]:
+        """List the ids of all stored chats"""
+
+    def archive(self, chat_id: str) -> Optional[Tuple[int, int]]:
+        """Move a chat to cold storage; returns (original, compressed) sizes, or None if unsupported"""
+        return None
+
+    def is_archived(self, chat_id: str) -> bool:
+        """Check whether a chat is in cold storage"""
+        return False
+
+    def archive_stats(self) -> Dict[str, int]:
+        """Get the number of archived chats and their compressed and original sizes"""
+        return {"chats": 0, "bytes": 0, "original_bytes": 0}
+
+    def close(self) -> None:
+        """Release any resources held by the storage"""
+
+class JsonlChatStorage(ChatStorage):
+    """Stores each chat as an append-only JSON Lines log.
+
+    The first record is a header (schema version, id, title, created_at).
+    Every message and every title change is one appended record, so a write
+    never touches earlier data. Logs holding superseded records are rewritten
+    in the background by compaction. Chats still in an older single-JSON
+    layout (see chat_schema) are converted when read and rewritten as logs on
+    their first write, or all at once by ``backend.migrate_chats``.
+
+    Writes to one chat are serialized by a lock chosen from a fixed set of
+    stripes by chat id, so different chats are written in parallel. Each
+    stripe is a thread lock plus an flock on a file in ``.locks/``, so
+    processes sharing the directory, such as gunicorn workers, exclude each
+    other too. Whole files are replaced by writing a uniquely named temporary
+    file and renaming it. A record torn by a crash at the end of a log is
+    ignored on read and cut off before the next write.
+
+    Logs live in ``ab/cd/`` shard directories derived from the chat id (see
+    ``shard_dir``); flat logs from older versions are moved there on startup.
+
+    Next to each log, a ``.idx`` file holds the byte offset of every message
+    as a fixed-width integer, so a page of messages is read by seeking
+    straight to its first record.
+    """
+
+    def __init__(self, history_dir: str = "chat_history", compact_interval: Optional[float] = 60.0):
+        self.history_dir = history_dir
+        os.makedirs(history_dir, exist_ok=True)
+        migrate_to_shards(history_dir, (LOG_EXT, OFFSETS_EXT))
+        self.compact_interval = compact_interval
+        self._garbage: Dict[str, int] = {}
+        self._lock_dir = os.path.join(history_dir, LOCKS_DIRNAME)
+        os.makedirs(self._lock_dir, exist_ok=True)
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._garbage_lock = threading.Lock()
+        # Per chat, the file state this process last left or found consistent
+        self._checked: Dict[str, Tuple[int, int, int]] = {}
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name="chat-compactor", daemon=True)
+            self._compactor.start()
+
+    def _log_path(self, chat_id: str) -> str:
+        return os.path.join(shard_dir(self.history_dir, chat_id), f"{chat_id}{LOG_EXT}")
+
+    def _legacy_path(self, chat_id: str) -> str:
+        return os.path.join(self.history_dir, f"{chat_id}{LEGACY_EXT}")
+
+    def _offsets_path(self, chat_id: str) -> str:
+        return os.path.join(shard_dir(self.history_dir, chat_id), f"{chat_id}{OFFSETS_EXT}")
+
+    @contextmanager
+    def _lock(self, chat_id: str) -> Iterator[None]:
+        # crc32 rather than hash(), which is salted per process
+        stripe = zlib.crc32(chat_id.encode('utf-8')) % LOCK_STRIPES
+        with self._locks[stripe], file_lock(os.path.join(self._lock_dir, f"{stripe:02d}")):
+            yield
+
+    @staticmethod
+    def _encode(record: Dict) -> bytes:
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+
+    def _ensure_log(self, chat_id: str) -> bool:
+        """Check that a chat has a log, converting a legacy file; caller holds the chat's lock"""
+        if os.path.exists(self._log_path(chat_id)):
+            self._check(chat_id)
+            return True
+        return self._convert_legacy(chat_id)
+
+    def _signature(self, chat_id: str) -> Optional[Tuple[int, int, int]]:
+        """Get the inode and size of a chat log and the size of its offsets file"""
+        try:
+            stat = os.stat(self._log_path(chat_id))
+        except FileNotFoundError:
+            return None
+        try:
+            offsets_size = os.path.getsize(self._offsets_path(chat_id))
+        except FileNotFoundError:
+            offsets_size = -1
+        return stat.st_ino, stat.st_size, offsets_size
+
+    def _remember(self, chat_id: str) -> None:
+        """Record that this process left a chat's files consistent; caller holds the chat's lock"""
+        self._checked[chat_id] = self._signature(chat_id)
+
+    def _check(self, chat_id: str) -> None:
+        """Repair a chat log unless it is unchanged since this process last saw it; caller holds the chat's lock"""
+        if self._checked.get(chat_id) != self._signature(chat_id):
+            # New to this process, or written by another one, which may have crashed mid-write
+            self._repair(chat_id)
+            self._remember(chat_id)
+
+    def _repair(self, chat_id: str) -> None:
+        """Cut off a torn final record and drop an offsets file that no longer matches the log"""
+        with open(self._log_path(chat_id), 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 1, 0))
+            if size and f.read(1) != b"\n":
+                end = size
+                while end > 0:
+                    start = max(end - 65536, 0)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b"\n")
+                    if newline != -1:
+                        end = start + newline + 1
+                        break
+                    end = start
+                f.truncate(end)
+                logger.warning(f"Discarded {size - end} bytes of a torn record at the end of chat {chat_id}")
+
+        offsets_path = self._offsets_path(chat_id)
+        if os.path.exists(offsets_path) and not self._offsets_match(chat_id):
+            os.remove(offsets_path)
+            logger.warning(f"Rebuilding the message offsets of chat {chat_id}")
+
+    def _offsets_match(self, chat_id: str) -> bool:
+        """Check that the last offset points at the last message of the log"""
+        offsets_size = os.path.getsize(self._offsets_path(chat_id))
+        if offsets_size % OFFSET.size:
+            return False
+        last_offset = 0
+        if offsets_size:
+            with open(self._offsets_path(chat_id), 'rb') as f:
+                f.seek(offsets_size - OFFSET.size)
+                last_offset, = OFFSET.unpack(f.read(OFFSET.size))
+        with open(self._log_path(chat_id), 'rb') as f:
+            f.seek(last_offset)
+            first = f.readline()
+            if offsets_size and not first.startswith(MESSAGE_PREFIX):
+                return False
+            if not offsets_size and first.startswith(MESSAGE_PREFIX):
+                return False
+            return not any(line.startswith(MESSAGE_PREFIX) for line in f)
+
+    def _decode(self, chat_id: str, line: bytes) -> Dict:
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise ChatCorruptedError(f"Chat {chat_id} has a corrupted record: {e}") from e
+
+    @staticmethod
+    def _sync_replace(tmp_path: str, path: str) -> None:
+        """Flush a finished temporary file to disk and move it into place"""
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _ensure_offsets(self, chat_id: str) -> str:
+        """Get the offsets file of a chat, building it from the log if missing; caller holds the lock"""
+        offsets_path = self._offsets_path(chat_id)
+        if not os.path.exists(offsets_path):
+            tmp_path = temp_path(offsets_path)
+            with open(self._log_path(chat_id), 'rb') as log, open(tmp_path, 'wb') as f:
+                offset = 0
+                for line in log:
+                    if line.startswith(MESSAGE_PREFIX):
+                        f.write(OFFSET.pack(offset))
+                    offset += len(line)
+            os.replace(tmp_path, offsets_path)
+            self._remember(chat_id)
+        return offsets_path
+
+    def _append(self, chat_id: str, record: Dict) -> bool:
+        """Append a record to a chat log with a single write"""
+        data = self._encode(record)
+        with self._lock(chat_id):
+            if not self._ensure_log(chat_id):
+                return False
+            with open(self._log_path(chat_id), 'ab') as f:
+                f.write(data)
+            self._remember(chat_id)
+        return True
+
+    def _write_log(self, chat_id: str, chat_data: Dict) -> None:
+        """Write a complete chat log and its offsets to temporary files and swap them in"""
+        log_path = self._log_path(chat_id)
+        offsets_path = self._offsets_path(chat_id)
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        tmp_path = temp_path(log_path)
+        tmp_offsets_path = temp_path(offsets_path)
+        with open(tmp_path, 'wb') as f, open(tmp_offsets_path, 'wb') as offsets:
+            f.write(self._encode({
+                "type": "header",
+                "schema": SCHEMA_VERSION,
+                "id": chat_data.get("id", chat_id),
+                "title": chat_data.get("title", "New Chat"),
+                "created_at": chat_data.get("created_at", "")
+            }))
+            for message in chat_data.get("messages", []):
+                offsets.write(OFFSET.pack(f.tell()))
+                f.write(self._encode({"type": "message", **message}))
+        self._sync_replace(tmp_path, log_path)
+        self._sync_replace(tmp_offsets_path, offsets_path)
+
+    def _read_legacy(self, chat_id: str) -> Optional[Dict]:
+        """Read a single-JSON chat file of any older layout in the current chat format"""
+        legacy_path = self._legacy_path(chat_id)
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            mtime = os.path.getmtime(legacy_path)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise ChatCorruptedError(f"Chat {chat_id} has a corrupted legacy file: {e}") from e
+        chat_data = normalize_chat(chat_id, data, mtime)
+        if chat_data is None:
+            raise ChatCorruptedError(f"Chat {chat_id} has an unsupported legacy format")
+        return chat_data
+
+    def _convert_legacy(self, chat_id: str) -> bool:
+        """Convert a single-JSON chat file into a log; caller holds the lock"""
+        chat_data = self._read_legacy(chat_id)
+        if chat_data is None:
+            return False
+        legacy_path = self._legacy_path(chat_id)
+        self._write_log(chat_id, chat_data)
+        self._remember(chat_id)
+        os.remove(legacy_path)
+        logger.info(f"Converted chat {chat_id} to an append-only log")
+        return True
+
+    def create(self, chat_id: str, title: str, created_at: str) -> None:
+        """Create an empty chat log"""
+        header = {"type": "header", "schema": SCHEMA_VERSION, "id": chat_id, "title": title, "created_at": created_at}
+        log_path = self._log_path(chat_id)
+        with self._lock(chat_id):
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            open(self._offsets_path(chat_id), 'wb').close()
+            tmp_path = temp_path(log_path)
+            with open(tmp_path, 'wb') as f:
+                f.write(self._encode(header))
+            self._sync_replace(tmp_path, log_path)
+            self._remember(chat_id)
+
+    def import_chat(self, chat_data: Dict) -> None:
+        """Store a complete chat, replacing any chat with the same id"""
+        with self._lock(chat_data["id"]):
+            self._write_log(chat_data["id"], chat_data)
+            self._remember(chat_data["id"])
+            legacy_path = self._legacy_path(chat_data["id"])
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+    def append_message(self, chat_id: str, message: Dict) -> Optional[int]:
+        """Append a message to a chat and record its offset"""
+        data = self._encode({"type": "message", **message})
+        with self._lock(chat_id):
+            if not self._ensure_log(chat_id):
+                return None
+            offsets_path = self._ensure_offsets(chat_id)
+            seq = os.path.getsize(offsets_path) // OFFSET.size
+            with open(self._log_path(chat_id), 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+            with open(offsets_path, 'ab') as f:
+                f.write(OFFSET.pack(offset))
+            self._remember(chat_id)
+        return seq
+
+    def append_batch(self, messages: List[Tuple[str, Dict]], sync: bool = False) -> List[Optional[int]]:
+        """Append messages with one write, and at most one fsync, per chat log.
+
+        Each chat's messages are written all or nothing. If a chat fails, the
+        chats written before it stay written and ChatBatchError says which.
+        """
+        by_chat: Dict[str, List[Tuple[int, Dict]]] = {}
+        for i, (chat_id, message) in enumerate(messages):
+            by_chat.setdefault(chat_id, []).append((i, message))
+
+        seqs: List[Optional[int]] = [None] * len(messages)
+        done = [False] * len(messages)
+        for chat_id, items in by_chat.items():
+            try:
+                self._append_chat_batch(chat_id, items, seqs, sync)
+            except Exception as e:
+                if not any(done):
+                    raise
+                raise ChatBatchError(seqs, done, e) from e
+            for i, _ in items:
+                done[i] = True
+        return seqs
+
+    def _append_chat_batch(self, chat_id: str, items: List[Tuple[int, Dict]], seqs: List[Optional[int]],
+                           sync: bool) -> None:
+        """Append one chat's part of a batch, filling in ``seqs``.
+
+        Raises only if nothing was written: a failed log write is cut off
+        again, and once the log holds the messages, errors with the offsets
+        file or fsync are logged instead.
+        """
+        with self._lock(chat_id):
+            if not self._ensure_log(chat_id):
+                return
+            offsets_path = self._ensure_offsets(chat_id)
+            seq = os.path.getsize(offsets_path) // OFFSET.size
+            records = []
+            positions = []
+            with open(self._log_path(chat_id), 'ab', buffering=0) as f:
+                offset = start = f.tell()
+                for i, message in items:
+                    data = self._encode({"type": "message", **message})
+                    records.append(data)
+                    positions.append(OFFSET.pack(offset))
+                    offset += len(data)
+                try:
+                    data = memoryview(b"".join(records))
+                    while data:
+                        data = data[f.write(data):]
+                except BaseException:
+                    f.truncate(start)
+                    raise
+                for (i, _), message_seq in zip(items, range(seq, seq + len(items))):
+                    seqs[i] = message_seq
+                try:
+                    if sync:
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    logger.error(f"Error syncing chat {chat_id}: {e}")
+            try:
+                with open(offsets_path, 'ab') as offsets:
+                    offsets.write(b"".join(positions))
+                    if sync:
+                        offsets.flush()
+                        os.fsync(offsets.fileno())
+            except OSError as e:
+                # The offsets file is rebuilt from the log on its next use
+                logger.error(f"Error writing the message offsets of chat {chat_id}: {e}")
+                if os.path.exists(offsets_path):
+                    os.remove(offsets_path)
+            self._remember(chat_id)
+
+    def count_messages(self, chat_id: str) -> Optional[int]:
+        """Count the messages of a chat from its offsets file"""
+        with self._lock(chat_id):
+            if not self._ensure_log(chat_id):
+                return None
+            return os.path.getsize(self._ensure_offsets(chat_id)) // OFFSET.size
+
+    def set_title(self, chat_id: str, title: str, timestamp: str) -> bool:
+        """Record a title change for a chat"""
+        if not self._append(chat_id, {"type": "title", "title": title, "timestamp": timestamp}):
+            return False
+        with self._garbage_lock:
+            self._garbage[chat_id] = self._garbage.get(chat_id, 0) + 1
+        return True
+
+    def _read_records(self, chat_id: str) -> Iterator[Dict]:
+        with open(self._log_path(chat_id), 'rb') as f:
+            for line in f:
+                # A final line without a newline is a record still being written or torn by a crash
+                if line.strip() and line.endswith(b"\n"):
+                    yield self._decode(chat_id, line)
+
+    def exists(self, chat_id: str) -> bool:
+        return os.path.exists(self._log_path(chat_id)) or os.path.exists(self._legacy_path(chat_id))
+
+    def load(self, chat_id: str) -> Optional[Dict]:
+        """Read a complete chat, streaming its log"""
+        try:
+            chat_data = None
+            messages = []
+            for record in self._read_records(chat_id):
+                record_type = record.pop("type", None)
+                if record_type == "message":
+                    messages.append(record)
+                elif record_type == "header":
+                    record.pop("schema", None)
+                    chat_data = record
+                elif record_type == "title" and chat_data is not None:
+                    chat_data["title"] = record["title"]
+            if chat_data is None:
+                raise ChatCorruptedError(f"Chat {chat_id} has no header record")
+            chat_data["messages"] = messages
+            return chat_data
+        except FileNotFoundError:
+            pass
+
+        return self._read_legacy(chat_id)
+
+    def iter_messages(self, chat_id: str) -> Iterator[Dict]:
+        """Stream the messages of a chat"""
+        if not os.path.exists(self._log_path(chat_id)):
+            chat_data = self.load(chat_id)
+            yield from (chat_data or {}).get("messages", [])
+            return
+        for record in self._read_records(chat_id):
+            if record.pop("type", None) == "message":
+                yield record
+
+    def get_messages(self, chat_id: str, limit: Optional[int] = None, before: Optional[int] = None,
+                     after: Optional[int] = None) -> Optional[List[Dict]]:
+        """Read a page of messages by seeking to its first record"""
+        with self._lock(chat_id):
+            log_path = self._log_path(chat_id)
+            if not os.path.exists(log_path):
+                chat_data = self.load(chat_id)
+                if not isinstance(chat_data, dict):
+                    return None
+                messages = chat_data.get("messages", [])
+                start, end = page_bounds(len(messages), limit, before, after)
+                return [{**message, "seq": seq} for seq, message in enumerate(messages[start:end], start)]
+
+            self._check(chat_id)
+            offsets_path = self._ensure_offsets(chat_id)
+            start, end = page_bounds(os.path.getsize(offsets_path) // OFFSET.size, limit, before, after)
+            if start >= end:
+                return []
+            with open(offsets_path, 'rb') as f:
+                f.seek(start * OFFSET.size)
+                first_offset, = OFFSET.unpack(f.read(OFFSET.size))
+
+            messages = []
+            with open(log_path, 'rb') as f:
+                f.seek(first_offset)
+                seq = start
+                for line in f:
+                    if seq >= end:
+                        break
+                    if not line.startswith(MESSAGE_PREFIX):
+                        continue
+                    record = self._decode(chat_id, line)
+                    del record["type"]
+                    record["seq"] = seq
+                    messages.append(record)
+                    seq += 1
+            return messages
+
+    def size(self, chat_id: str) -> int:
+        """Get the on-disk size of a chat in bytes"""
+        for path in (self._log_path(chat_id), self._legacy_path(chat_id)):
+            try:
+                return os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+        return 0
+
+    def summarize(self, chat_id: str) -> Optional[Dict]:
+        """Collect the index metadata of a chat by streaming it once"""
+        chat_data = self.load(chat_id)
+        if not isinstance(chat_data, dict) or "created_at" not in chat_data:
+            return None
+        messages = chat_data.get("messages", [])
+        last_timestamp = messages[-1].get("timestamp") if messages and isinstance(messages[-1], dict) else None
+        return {
+            "id": chat_data.get("id", chat_id),
+            "title": chat_data.get("title", "New Chat"),
+            "created_at": chat_data["created_at"],
+            "updated_at": last_timestamp or chat_data["created_at"],
+            "message_count": len(messages),
+            "byte_size": self.size(chat_id)
+        }
+
+    def delete(self, chat_id: str) -> bool:
+        """Delete a chat"""
+        with self._lock(chat_id):
+            return self._delete(chat_id)
+
+    def delete_if_unchanged(self, chat_id: str, revision: int) -> bool:
+        """Delete a chat unless it was written since ``revision`` was read"""
+        with self._lock(chat_id):
+            return self.revision(chat_id) == revision and self._delete(chat_id)
+
+    def _delete(self, chat_id: str) -> bool:
+        """Remove a chat's files; caller holds the chat's lock"""
+        deleted = False
+        with self._garbage_lock:
+            self._garbage.pop(chat_id, None)
+        self._checked.pop(chat_id, None)
+        for path in (self._log_path(chat_id), self._legacy_path(chat_id)):
+            if os.path.exists(path):
+                os.remove(path)
+                deleted = True
+        if os.path.exists(self._offsets_path(chat_id)):
+            os.remove(self._offsets_path(chat_id))
+        return deleted
+
+    def list_ids(self) -> List[str]:
+        """List the ids of all stored chats"""
+        chat_ids = set()
+        with os.scandir(self.history_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(LEGACY_EXT) and not entry.name.startswith('.'):
+                    chat_ids.add(entry.name[:-len(LEGACY_EXT)])
+        for shard in iter_shards(self.history_dir):
+            with os.scandir(shard) as entries:
+                for entry in entries:
+                    if entry.name.endswith(LOG_EXT):
+                        chat_ids.add(entry.name[:-len(LOG_EXT)])
+        return list(chat_ids)
+
+    def compact(self, chat_id: str) -> None:
+        """Rewrite a chat log as a header plus its messages"""
+        with self._garbage_lock:
+            self._garbage.pop(chat_id, None)
+        with self._lock(chat_id):
+            if not os.path.exists(self._log_path(chat_id)):
+                return
+            chat_data = self.load(chat_id)
+            if chat_data is not None:
+                self._write_log(chat_id, chat_data)
+                self._remember(chat_id)
+
+    def _compact_loop(self) -> None:
+        while not self._stop.wait(self.compact_interval):
+            with self._garbage_lock:
+                chat_ids = list(self._garbage)
+            for chat_id in chat_ids:
+                try:
+                    self.compact(chat_id)
+                except Exception as e:
+                    logger.error(f"Error compacting chat {chat_id}: {e}")
+
+    def close(self) -> None:
+        """Stop background compaction"""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
@@ -0,0 +1,59 @@
+"""Helpers for the stores that keep their data in plain files.
+
+Several gunicorn workers can share the data directories, so writers take
+``file_lock`` to exclude each other across processes, and write whole files
+through ``temp_path`` names no other writer can pick.
+"""
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, only thread locks apply
+    fcntl = None
+
+def _read_umask() -> int:
+    # The umask can only be read by setting it, so it is read once, at import
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+UMASK = _read_umask()
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive flock on ``path``, creating the file if needed.
+
+    The file is opened for every acquisition rather than kept open, because
+    a descriptor inherited across fork would share its lock with the parent.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+def temp_path(path: str) -> str:
+    """Create an empty temporary file with a unique name next to ``path`` and return its name.
+
+    mkstemp creates the file owner-only; it is given the mode of the file it
+    will replace, or the umask default for a new file, so that os.replace
+    does not change who can read the data.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.",
+                                    suffix=".tmp")
+    os.close(fd)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.chmod(tmp_path, mode)
+    return tmp_path
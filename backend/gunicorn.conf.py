@@ -0,0 +1,43 @@
+"""Gunicorn settings for the backend.
+
+Usage:
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:application
+
+Models are loaded once in the master (preload_app) and shared with the
+forked workers. Unless MIDAS_WORKERS is set, the app picks the worker count
+from the cores and the memory left after the weights when it is preloaded,
+and splits llama.cpp threads between workers. Workers share the chat and
+bot directories through file locks; with MIDAS_CHAT_WRITE_BEHIND only one
+worker is run. gthread workers keep serving API calls while other threads
+stream replies. On
+SIGHUP or SIGTERM a worker stops accepting requests and finishes its
+in-flight SSE streams for up to MIDAS_GRACEFUL_TIMEOUT seconds before it
+exits.
+"""
+import os
+
+bind = os.environ.get("MIDAS_BIND", "127.0.0.1:7860")
+preload_app = True
+worker_class = "gthread"
+threads = int(os.environ.get("MIDAS_WORKER_THREADS", "8"))
+graceful_timeout = int(os.environ.get("MIDAS_GRACEFUL_TIMEOUT", "600"))
+# gthread workers heartbeat from their main thread, so long streams do not trip this
+timeout = 120
+keepalive = 5
+
+# Without MIDAS_WORKERS the app sizes the workers from its bot table while it
+# is preloaded (see backend/wsgi.py), before it loads the models
+os.environ.setdefault("MIDAS_WORKERS", "auto")
+workers = int(os.environ["MIDAS_WORKERS"]) if os.environ["MIDAS_WORKERS"].isdigit() else 1
+
+def on_starting(server):
+    # Runs after the preload, so MIDAS_WORKERS holds the count the app chose
+    server.num_workers = int(os.environ["MIDAS_WORKERS"])
+
+def post_fork(server, worker):
+    from backend.wsgi import services
+    services.after_fork()
+
+def worker_exit(server, worker):
+    from backend.wsgi import services
+    services.close()
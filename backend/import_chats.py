@@ -0,0 +1,67 @@
+"""Bulk import of chat_history/*.json files into a chat storage backend.
+
+Usage:
+    python -m backend.import_chats --source chat_history --backend sqlite
+
+Files are streamed one at a time, so memory use is bounded by the largest
+single chat. Three layouts are understood: the backend ChatManager format
+(role/content messages), the frontend ChatHistory format (a dict whose
+messages are [user, assistant] pairs) and the oldest format, a bare list of
+[user, assistant] pairs.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from typing import Dict, Iterator, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.chat_manager import ChatManager, STORAGE_BACKENDS
+from backend.chat_schema import normalize_chat
+
+logger = logging.getLogger(__name__)
+
+def iter_chat_files(source_dir: str) -> Iterator[Tuple[str, str]]:
+    """Yield (chat_id, path) for every JSON chat file in a directory"""
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith('.json') and not entry.name.startswith('.'):
+                yield entry.name[:-5], entry.path
+
+def import_chats(source_dir: str, manager: ChatManager) -> Dict[str, int]:
+    """Stream every chat file in source_dir into the manager's storage"""
+    stats = {"imported": 0, "skipped": 0, "messages": 0}
+    for chat_id, path in iter_chat_files(source_dir):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            chat_data = normalize_chat(chat_id, data, os.path.getmtime(path))
+        except (OSError, ValueError) as e:
+            logger.error(f"Skipping unreadable chat file {path}: {e}")
+            chat_data = None
+        if chat_data is None:
+            stats["skipped"] += 1
+            continue
+        manager.storage.import_chat(chat_data)
+        stats["imported"] += 1
+        stats["messages"] += len(chat_data["messages"])
+    manager.rebuild_index()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Import chat_history/*.json files into a chat storage backend")
+    parser.add_argument("--source", default="chat_history", help="Directory containing the JSON chat files")
+    parser.add_argument("--target", default=None, help="History directory of the target storage (defaults to --source)")
+    parser.add_argument("--backend", default="sqlite", choices=sorted(STORAGE_BACKENDS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manager = ChatManager(args.target or args.source, backend=args.backend)
+    stats = import_chats(args.source, manager)
+    manager.storage.close()
+    print(f"Imported {stats['imported']} chats ({stats['messages']} messages), skipped {stats['skipped']}")
+
+if __name__ == "__main__":
+    main()
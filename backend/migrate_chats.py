@@ -0,0 +1,103 @@
+"""Offline migration of chat_history/ to the current chat schema.
+
+Usage:
+    python -m backend.migrate_chats --history chat_history --workers 8
+
+Run it while the backend is stopped. Every single-JSON chat file (backend
+ChatManager or frontend ChatHistory layout) is converted into a schema
+version 2 log, and every log whose header lacks the current schema version
+is rewritten. Files are processed in parallel by worker processes, then the
+metadata and search indexes are rebuilt. After a migration, reads never
+convert anything.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.chat_manager import ChatManager, INDEX_FILENAME, SEARCH_FILENAME
+from backend.chat_schema import SCHEMA_VERSION
+from backend.chat_storage import JsonlChatStorage, LEGACY_EXT, LOG_EXT, iter_shards
+
+logger = logging.getLogger(__name__)
+
+_storage: Optional[JsonlChatStorage] = None
+
+def _init_worker(history_dir: str) -> None:
+    global _storage
+    _storage = JsonlChatStorage(history_dir, compact_interval=None)
+
+def _is_current(log_path: str) -> bool:
+    with open(log_path, 'rb') as f:
+        header = json.loads(f.readline() or b"{}")
+    return header.get("type") == "header" and header.get("schema") == SCHEMA_VERSION
+
+def migrate_chat(task: Tuple[str, str]) -> Tuple[str, str, str]:
+    """Bring one chat to the current schema; returns (chat_id, status, detail)"""
+    kind, chat_id = task
+    try:
+        with _storage._lock(chat_id):
+            log_exists = os.path.exists(_storage._log_path(chat_id))
+            if kind == LEGACY_EXT:
+                if log_exists:
+                    return chat_id, "conflict", "a log with the same id already exists"
+                _storage._convert_legacy(chat_id)
+                return chat_id, "converted", ""
+            if _is_current(_storage._log_path(chat_id)):
+                return chat_id, "current", ""
+        _storage.compact(chat_id)
+        return chat_id, "upgraded", ""
+    except Exception as e:
+        return chat_id, "failed", str(e)
+
+def iter_tasks(history_dir: str) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, chat_id) for every legacy file and every log"""
+    with os.scandir(history_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(LEGACY_EXT) and not entry.name.startswith('.'):
+                yield LEGACY_EXT, entry.name[:-len(LEGACY_EXT)]
+    for shard in iter_shards(history_dir):
+        with os.scandir(shard) as entries:
+            for entry in entries:
+                if entry.name.endswith(LOG_EXT):
+                    yield LOG_EXT, entry.name[:-len(LOG_EXT)]
+
+def migrate_chats(history_dir: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """Migrate every chat in history_dir in parallel and rebuild the indexes"""
+    # Move flat logs into their shards before the workers start
+    JsonlChatStorage(history_dir, compact_interval=None)
+    stats = {"converted": 0, "upgraded": 0, "current": 0, "conflict": 0, "failed": 0}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(history_dir,)) as pool:
+        for chat_id, status, detail in pool.map(migrate_chat, iter_tasks(history_dir), chunksize=64):
+            stats[status] += 1
+            if detail:
+                logger.error(f"Chat {chat_id} {status}: {detail}")
+
+    # A missing index is built by ChatManager itself; an existing one is stale now
+    indexes_exist = all(os.path.exists(os.path.join(history_dir, name)) for name in (INDEX_FILENAME, SEARCH_FILENAME))
+    manager = ChatManager(history_dir, backend="jsonl")
+    if indexes_exist:
+        manager.rebuild_index()
+    manager.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate chat_history/ to the current chat schema")
+    parser.add_argument("--history", default="chat_history", help="Chat history directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = migrate_chats(args.history, args.workers)
+    print(
+        f"Converted {stats['converted']} legacy files, upgraded {stats['upgraded']} logs, "
+        f"{stats['current']} already current, {stats['conflict']} conflicts, {stats['failed']} failed"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODEL_EXTENSIONS = ('.gguf',)
+
+def normalize_model_id(model_id: str) -> str:
+    """Normalize a model id, name or file name to the key used by the index"""
+    name = os.path.basename(model_id.strip())
+    for ext in MODEL_EXTENSIONS:
+        if name.lower().endswith(ext):
+            name = name[:-len(ext)]
+            break
+    return name.lower()
+
+class ModelIndex:
+    """Maps normalized model ids to model files.
+
+    The index is built once from the models directory and the model registry
+    (``models_info.json``) and then served from memory until it is invalidated.
+    """
+
+    def __init__(self, models_dir: str = "models"):
+        self.models_dir = os.path.abspath(models_dir)
+        self.registry_path = os.path.join(self.models_dir, "models_info.json")
+        self._files: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> Dict[str, str]:
+        """Scan the registry and the models directory"""
+        files = {}
+        try:
+            if os.path.exists(self.registry_path):
+                with open(self.registry_path, 'r') as f:
+                    for model_id, data in json.load(f).items():
+                        local_path = os.path.abspath(data.get('local_path', ''))
+                        if os.path.isfile(local_path):
+                            files[normalize_model_id(model_id)] = local_path
+                            files[normalize_model_id(local_path)] = local_path
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading model registry: {e}")
+
+        try:
+            with os.scandir(self.models_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(MODEL_EXTENSIONS):
+                        files.setdefault(normalize_model_id(entry.name), entry.path)
+        except FileNotFoundError:
+            pass
+
+        logger.info(f"Indexed {len(set(files.values()))} model files in {self.models_dir}")
+        return files
+
+    def _get_files(self) -> Dict[str, str]:
+        files = self._files
+        if files is None:
+            with self._lock:
+                if self._files is None:
+                    self._files = self._build()
+                files = self._files
+        return files
+
+    def resolve(self, model_id: str) -> Optional[str]:
+        """Get the path of the model file for a model id, or None if it is not available"""
+        if not model_id:
+            return None
+        return self._get_files().get(normalize_model_id(model_id))
+
+    def contains(self, model_id: str) -> bool:
+        """Check whether a model file is available for a model id"""
+        return self.resolve(model_id) is not None
+
+    def invalidate(self) -> None:
+        """Drop the index so it is rebuilt on next lookup"""
+        with self._lock:
+            self._files = None
+
+_indexes: Dict[str, ModelIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_model_index(models_dir: str = "models") -> ModelIndex:
+    """Get the process-wide model index for a models directory"""
+    key = os.path.abspath(models_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ModelIndex(key)
+        return index
@@ -1,14 +1,49 @@
 import os
+import copy
 import json
+import time
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from pathlib import Path
 from dataclasses import dataclass
 from llama_cpp import Llama
 import itertools
+import threading
 
 logger = logging.getLogger(__name__)
 
+KV_CACHE_BYTES_PER_VALUE = 2  # llama.cpp keeps the KV cache in f16 by default
+
+def mapped_rss(path: str) -> Optional[int]:
+    """Resident bytes of a file memory-mapped by this process, from /proc/self/smaps"""
+    path = os.path.realpath(path)
+    rss = 0
+    in_mapping = False
+    try:
+        with open('/proc/self/smaps', 'r') as f:
+            for line in f:
+                if line[0] in '0123456789abcdef' and '-' in line.split(' ', 1)[0]:
+                    # Mapping header: address perms offset dev inode [path]
+                    parts = line.split(None, 5)
+                    in_mapping = len(parts) == 6 and parts[5].strip() == path
+                elif in_mapping and line.startswith('Rss:'):
+                    rss += int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return rss
+
+def kv_cache_bytes(metadata: Dict[str, str], n_ctx: int) -> Optional[int]:
+    """Size of the KV cache from GGUF metadata: keys and values for every layer and context slot"""
+    try:
+        arch = metadata['general.architecture']
+        n_layer = int(metadata[f'{arch}.block_count'])
+        n_embd = int(metadata[f'{arch}.embedding_length'])
+        n_head = int(metadata[f'{arch}.attention.head_count'])
+        n_head_kv = int(metadata.get(f'{arch}.attention.head_count_kv', n_head))
+    except (KeyError, ValueError):
+        return None
+    return 2 * n_ctx * n_layer * (n_embd * n_head_kv // n_head) * KV_CACHE_BYTES_PER_VALUE
+
 @dataclass
 class ModelConfig:
     model_path: str
@@ -21,10 +56,34 @@ class ModelConfig:
     repeat_penalty: float = 1.1
 
 class ModelInference:
+    # Generations on one model run one at a time (see _generate_lock)
+    GENERATION_SLOTS = 1
+
     def __init__(self):
         self._model = None
         self._model_path = None
-        
+        # A llama.cpp context is not thread-safe; bots sharing a model take turns
+        self._generate_lock = threading.Lock()
+        self._kv_cache_bytes: Optional[int] = None
+        self._stats_lock = threading.Lock()
+        self._active_sessions = 0
+        self._usage = self._new_usage()
+
+    @staticmethod
+    def _new_usage() -> Dict:
+        return {
+            "generations": 0,
+            "prompt_tokens": 0,
+            "tokens": 0,
+            "prefill": {"wall_seconds": 0.0, "cpu_seconds": 0.0},
+            "decode": {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+        }
+
+    @property
+    def busy(self) -> bool:
+        """Whether a generation is running on this model"""
+        return self._generate_lock.locked()
+
     def __del__(self):
         """Clean up model when object is deleted"""
         try:
@@ -54,6 +113,12 @@ class ModelInference:
                 n_batch=config.n_batch
             )
             self._model_path = model_path
+            try:
+                self._kv_cache_bytes = kv_cache_bytes(self._model.metadata, self._model.n_ctx())
+            except AttributeError:  # llama-cpp-python without GGUF metadata
+                self._kv_cache_bytes = None
+            with self._stats_lock:
+                self._usage = self._new_usage()
             logger.info(f"Model loaded successfully from {model_path}")
             print("[DEBUG] Model loaded successfully")
             print(f"[DEBUG] Model config: ctx={config.n_ctx}, threads={config.n_threads}, batch={config.n_batch}")
@@ -67,16 +132,80 @@ class ModelInference:
             return False
     
     def unload_model(self) -> None:
-        """Unload the current model"""
+        """Unload the current model once any running generation has finished"""
         try:
-            if self._model is not None:
-                del self._model
-                self._model = None
-                self._model_path = None
-                logger.info("Model unloaded")
+            with self._generate_lock:
+                if self._model is not None:
+                    del self._model
+                    self._model = None
+                    self._model_path = None
+                    logger.info("Model unloaded")
         except:
             pass
     
+    def stats(self) -> Dict:
+        """Resource use of this model since it was loaded.
+
+        Memory is the resident part of the memory-mapped weights (the file
+        size where /proc is unavailable) plus the KV cache. Prefill is the
+        first llama.cpp step of each generation and decode the rest; their
+        CPU seconds are process CPU time, so generations running on other
+        models at the same time are counted too.
+        """
+        model_path = self._model_path
+        weights = None
+        if model_path:
+            weights = mapped_rss(model_path)
+            if not weights:
+                try:
+                    weights = os.path.getsize(model_path)
+                except OSError:
+                    weights = None
+        with self._stats_lock:
+            usage = copy.deepcopy(self._usage)
+            active_sessions = self._active_sessions
+        for phase in ("prefill", "decode"):
+            usage[phase] = {key: round(value, 3) for key, value in usage[phase].items()}
+        # The first token of each generation comes out of prefill
+        decode_tokens = usage["tokens"] - usage["generations"]
+        decode_seconds = usage["decode"]["wall_seconds"]
+        return {
+            "model_path": model_path,
+            "memory": {
+                "weights_bytes": weights,
+                "kv_cache_bytes": self._kv_cache_bytes,
+                "total_bytes": (weights or 0) + (self._kv_cache_bytes or 0)
+            },
+            "active_sessions": active_sessions,
+            "busy": self.busy,
+            **usage,
+            "decode_tokens_per_second": round(decode_tokens / decode_seconds, 2) if decode_seconds else None
+        }
+
+    def _metered(self, outputs: Iterator) -> Iterator:
+        """Pass llama.cpp outputs through, timing only the work inside the model"""
+        phase = "prefill"
+        tokens = 0
+        try:
+            iterator = iter(outputs)
+            while True:
+                wall, cpu = time.perf_counter(), time.process_time()
+                try:
+                    output = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+                    with self._stats_lock:
+                        self._usage[phase]["wall_seconds"] += wall
+                        self._usage[phase]["cpu_seconds"] += cpu
+                tokens += 1
+                phase = "decode"
+                yield output
+        finally:
+            with self._stats_lock:
+                self._usage["tokens"] += tokens
+
     def generate_response(
         self,
         messages: List[Dict],
@@ -87,6 +216,16 @@ class ModelInference:
         repeat_penalty: float = 1.1
     ):
         """Generate a streaming response using the loaded model"""
+        with self._stats_lock:
+            self._active_sessions += 1
+        try:
+            yield from self._generate(messages, temperature, max_tokens, top_p, top_k, repeat_penalty)
+        finally:
+            with self._stats_lock:
+                self._active_sessions -= 1
+
+    def _generate(self, messages: List[Dict], temperature: float, max_tokens: int, top_p: float,
+                  top_k: int, repeat_penalty: float):
         try:
             if not self._model:
                 raise ValueError("Model not loaded")
@@ -118,40 +257,45 @@ class ModelInference:
             # Generate streaming response
             try:
                 print("[DEBUG] Calling model generate...")
-                for output in self._model(prompt, stream=True, **params):
-                    print(f"[DEBUG] Got output: {output}")
-                    if isinstance(output, dict) and 'choices' in output and len(output['choices']) > 0:
-                        token = output['choices'][0].get('text', '')
-                        print(f"[DEBUG] Got token: {token}")
-                        if token:
-                            token_count += 1
-                            if token_count % 10 == 0:  # Print every 10 tokens
-                                print(f"[DEBUG] Generated {token_count} tokens...")
+                with self._generate_lock:
+                    prompt_tokens = len(self._model.tokenize(prompt.encode('utf-8')))
+                    with self._stats_lock:
+                        self._usage["generations"] += 1
+                        self._usage["prompt_tokens"] += prompt_tokens
+                    for output in self._metered(self._model(prompt, stream=True, **params)):
+                        print(f"[DEBUG] Got output: {output}")
+                        if isinstance(output, dict) and 'choices' in output and len(output['choices']) > 0:
+                            token = output['choices'][0].get('text', '')
+                            print(f"[DEBUG] Got token: {token}")
+                            if token:
+                                token_count += 1
+                                if token_count % 10 == 0:  # Print every 10 tokens
+                                    print(f"[DEBUG] Generated {token_count} tokens...")
                                 
-                            # Add token to full response
-                            full_response += token
+                                # Add token to full response
+                                full_response += token
                             
-                            # Remove prefix once we have enough text
-                            if not prefix_removed and len(full_response.strip()) > 10:
-                                print(f"[DEBUG] Removing prefix from: {full_response[:50]}...")
-                                full_response = self.process_response(full_response)
-                                prefix_removed = True
-                                print(f"[DEBUG] After prefix removal: {full_response[:50]}...")
-                                # Yield the processed initial text
-                                yield {'token': full_response}
-                            elif prefix_removed:
-                                # Format the token for markdown if needed
-                                if '\n' in token or token.startswith('#') or token.startswith('`'):
-                                    formatted_token = self.format_response(token)
-                                    if formatted_token != token:
-                                        print(f"[DEBUG] Formatted token: {formatted_token}")
-                                        yield {'token': formatted_token}
-                                        continue
+                                # Remove prefix once we have enough text
+                                if not prefix_removed and len(full_response.strip()) > 10:
+                                    print(f"[DEBUG] Removing prefix from: {full_response[:50]}...")
+                                    full_response = self.process_response(full_response)
+                                    prefix_removed = True
+                                    print(f"[DEBUG] After prefix removal: {full_response[:50]}...")
+                                    # Yield the processed initial text
+                                    yield {'token': full_response}
+                                elif prefix_removed:
+                                    # Format the token for markdown if needed
+                                    if '\n' in token or token.startswith('#') or token.startswith('`'):
+                                        formatted_token = self.format_response(token)
+                                        if formatted_token != token:
+                                            print(f"[DEBUG] Formatted token: {formatted_token}")
+                                            yield {'token': formatted_token}
+                                            continue
                                 
-                                # Yield the raw token
-                                yield {'token': token}
-                    else:
-                        print(f"[DEBUG] Unexpected output format: {output}")
+                                    # Yield the raw token
+                                    yield {'token': token}
+                        else:
+                            print(f"[DEBUG] Unexpected output format: {output}")
             except Exception as e:
                 print(f"[ERROR] Error in model generation: {e}")
                 raise
@@ -161,7 +305,7 @@ class ModelInference:
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             print(f"[ERROR] Response generation failed: {str(e)}")
-            yield {'token': "I apologize, but I encountered an error while generating the response."}
+            yield {'token': "I apologize, but I encountered an error while generating the response.", 'error': True}
 
     def _format_prompt(self, messages: List[Dict]) -> str:
         """Format conversation history into prompt"""
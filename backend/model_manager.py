@@ -6,6 +6,7 @@ from typing import Dict, List, Optional
 from dataclasses import dataclass
 import requests
 from tqdm import tqdm
+from .model_index import get_model_index
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +27,7 @@ class ModelManager:
         self.models_info_path = self.models_dir / "models_info.json"
         self.config_path = self.models_dir / "config.json"
         self.models: Dict[str, ModelInfo] = {}
+        self.model_index = get_model_index(str(self.models_dir))
         self.last_selected_model = None
         self._load_config()
         self._load_models_info()
@@ -134,6 +136,7 @@ class ModelManager:
         
         self.models[model_id] = model_info
         self._save_models_info()
+        self.model_index.invalidate()
         return model_info
 
     def remove_model(self, model_id: str) -> bool:
@@ -147,6 +150,7 @@ class ModelManager:
         
         del self.models[model_id]
         self._save_models_info()
+        self.model_index.invalidate()
         return True
 
     def download_model(self, model_id: str, force: bool = False) -> bool:
@@ -178,6 +182,7 @@ class ModelManager:
             
             model.is_downloaded = True
             self._save_models_info()
+            self.model_index.invalidate()
             logger.info(f"Model {model_id} downloaded successfully")
             return True
             
@@ -185,6 +190,7 @@ class ModelManager:
             logger.error(f"Error downloading model {model_id}: {e}")
             if os.path.exists(model.local_path):
                 os.remove(model.local_path)
+            self.model_index.invalidate()
             return False
 
     def get_model_info(self, model_id: str) -> Optional[ModelInfo]:
@@ -0,0 +1,136 @@
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set
+from .model_inference import ModelInference, ModelConfig
+
+logger = logging.getLogger(__name__)
+
+class ModelPool:
+    """Process-wide set of loaded models.
+
+    Every bot that uses the same model file shares one ModelInference, and a
+    model is unloaded once the last bot using it releases it.
+    """
+
+    def __init__(self, n_ctx: int = 2048, n_threads: Optional[int] = None, n_batch: int = 512):
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads  # None uses all available threads
+        self.n_batch = n_batch
+        self._models: Dict[str, ModelInference] = {}
+        self._users: Dict[str, Set[str]] = {}
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, model_path: str, user: str) -> Optional[ModelInference]:
+        """Get the loaded model for a model file, loading it on first use.
+
+        The load runs outside the pool lock, so other models stay usable
+        meanwhile; concurrent callers for the same file wait for that one load.
+        """
+        while True:
+            with self._lock:
+                inference = self._models.get(model_path)
+                if inference is not None:
+                    self._users.setdefault(model_path, set()).add(user)
+                    return inference
+                loading = self._loading.get(model_path)
+                if loading is None:
+                    loading = self._loading[model_path] = Future()
+                    break
+            # Another caller is loading this file; if the model was released again
+            # before we could take it, loop and load it ourselves
+            if loading.result() is None:
+                return None
+
+        inference = None
+        try:
+            inference = self._load(model_path)
+        finally:
+            with self._lock:
+                del self._loading[model_path]
+                if inference is not None:
+                    self._models[model_path] = inference
+                    self._users.setdefault(model_path, set()).add(user)
+            loading.set_result(inference)
+        return inference
+
+    def _load(self, model_path: str) -> Optional[ModelInference]:
+        inference = ModelInference()
+        config = ModelConfig(
+            model_path=model_path,
+            n_ctx=self.n_ctx,
+            n_threads=self.n_threads,
+            n_batch=self.n_batch
+        )
+        if not inference.load_model(model_path, config):
+            return None
+        return inference
+
+    def release(self, model_path: str, user: str) -> None:
+        """Release a model; it is unloaded when no users remain"""
+        with self._lock:
+            users = self._users.get(model_path)
+            if users is None:
+                return
+            users.discard(user)
+            if users:
+                return
+            del self._users[model_path]
+            inference = self._models.pop(model_path, None)
+
+        # Unload outside the pool lock; this waits for a running generation to finish
+        if inference is not None:
+            inference.unload_model()
+            logger.info(f"Unloaded unused model: {model_path}")
+
+    def release_user(self, user: str, keep: Optional[str] = None) -> List[str]:
+        """Release every model a bot uses, whether or not its Bot object is still around.
+
+        The model at ``keep``, if any, stays acquired. Returns the paths of
+        the models it released.
+        """
+        with self._lock:
+            released = [path for path, users in self._users.items() if user in users and path != keep]
+            unload = []
+            for model_path in released:
+                users = self._users[model_path]
+                users.discard(user)
+                if not users:
+                    del self._users[model_path]
+                    unload.append((model_path, self._models.pop(model_path, None)))
+
+        for model_path, inference in unload:
+            if inference is not None:
+                inference.unload_model()
+                logger.info(f"Unloaded unused model: {model_path}")
+        return released
+
+    def loaded_models(self) -> Dict[str, ModelInference]:
+        """Get the currently loaded models keyed by model path"""
+        with self._lock:
+            return dict(self._models)
+
+    def capacity(self) -> Dict[str, int]:
+        """Count loaded models, their generation slots and the busy slots"""
+        models = self.loaded_models().values()
+        return {
+            "loaded_models": len(models),
+            "slots": sum(model.GENERATION_SLOTS for model in models),
+            "busy": sum(model.busy for model in models)
+        }
+
+    def stats(self) -> List[Dict]:
+        """Resource use of every loaded model and the bots using it"""
+        with self._lock:
+            models = list(self._models.items())
+            users = {path: sorted(bots) for path, bots in self._users.items()}
+        return [
+            {**inference.stats(), "model_path": path, "bots": users.get(path, [])}
+            for path, inference in models
+        ]
+
+    def users(self, model_path: str) -> Set[str]:
+        """Get the ids of the bots using a model"""
+        with self._lock:
+            return set(self._users.get(model_path, ()))
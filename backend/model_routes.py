@@ -1,10 +1,15 @@
+import os
 from flask import Blueprint, request, jsonify
-from .model_manager import ModelManager
+from werkzeug.local import LocalProxy
+from .model_inference import ModelInference
+from .services import get_services
 import logging
 
 logger = logging.getLogger(__name__)
 model_routes = Blueprint('model_routes', __name__)
-model_manager = ModelManager()
+model_manager = LocalProxy(lambda: get_services().model_manager)
+bot_manager = LocalProxy(lambda: get_services().bot_manager)
+model_pool = LocalProxy(lambda: get_services().model_pool)
 
 @model_routes.route('/api/models', methods=['GET'])
 def list_models():
@@ -23,6 +28,36 @@ def list_models():
         logger.error(f"Error listing models: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@model_routes.route('/api/capacity', methods=['GET'])
+def get_capacity():
+    """Report how many generations the backend can run at once.
+
+    ``slots`` is loaded models times generation slots per model and
+    ``busy`` how many are generating now. Models load on first use, so
+    ``max_slots`` also counts the models the bots use but have not loaded yet.
+    These counts are per process; ``workers`` is how many backend processes
+    serve requests (set by gunicorn.conf.py, 1 otherwise).
+    """
+    try:
+        capacity = model_pool.capacity()
+        models = max(capacity["loaded_models"], len(bot_manager.base_models()))
+        capacity["slots_per_model"] = ModelInference.GENERATION_SLOTS
+        capacity["max_slots"] = max(capacity["slots"], models * ModelInference.GENERATION_SLOTS)
+        capacity["workers"] = int(os.environ.get("MIDAS_WORKERS", "1"))
+        return jsonify(capacity)
+    except Exception as e:
+        logger.error(f"Error getting capacity: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@model_routes.route('/api/models/stats', methods=['GET'])
+def get_model_stats():
+    """Per-model resource accounting for the loaded models"""
+    try:
+        return jsonify(model_pool.stats())
+    except Exception as e:
+        logger.error(f"Error getting model stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @model_routes.route('/api/models/downloaded', methods=['GET'])
 def list_downloaded_models():
     """List downloaded models"""
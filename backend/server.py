@@ -1,5 +1,6 @@
 import sys
 import os
+import atexit
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -9,6 +10,8 @@ from flask_cors import CORS
 from backend.chat_routes import chat_routes
 from backend.bot_routes import bot_routes
 from backend.model_routes import model_routes
+from backend.system_routes import system_routes
+from backend.services import init_app
 import logging
 
 app = Flask(__name__)
@@ -18,10 +21,16 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Share one set of managers across all blueprints
+services = init_app(app)
+services.system_sampler  # Start sampling now so /api/system has data on the first request
+atexit.register(services.close)
+
 # Register blueprints
 app.register_blueprint(chat_routes)
 app.register_blueprint(bot_routes)
 app.register_blueprint(model_routes)
+app.register_blueprint(system_routes)
 
 if __name__ == '__main__':
     app.run(port=7860)
@@ -0,0 +1,133 @@
+import os
+import threading
+import logging
+from typing import Optional
+from flask import Flask, current_app, has_app_context
+from .bot_manager import BotManager
+from .bot_watcher import BotWatcher
+from .chat_manager import ChatManager
+from .model_manager import ModelManager
+from .model_pool import ModelPool
+from .system_monitor import SystemSampler
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_KEY = 'midas_services'
+
+class Services:
+    """Application-scoped container for the backend managers.
+
+    Each manager is created on first use and then shared by every blueprint,
+    so a process has one bot table, one chat store and one set of loaded models.
+    """
+
+    def __init__(self, bots_dir: str = "bots", models_dir: str = "models", history_dir: str = "chat_history",
+                 watch_bots: bool = True):
+        self.bots_dir = bots_dir
+        self.models_dir = models_dir
+        self.history_dir = history_dir
+        self.watch_bots = watch_bots
+        model_threads = os.environ.get("MIDAS_MODEL_THREADS")
+        self.model_pool = ModelPool(n_threads=int(model_threads) if model_threads else None)
+        self.bot_watcher: Optional[BotWatcher] = None
+        self._model_manager: Optional[ModelManager] = None
+        self._bot_manager: Optional[BotManager] = None
+        self._chat_manager: Optional[ChatManager] = None
+        self._system_sampler: Optional[SystemSampler] = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_manager(self) -> ModelManager:
+        if self._model_manager is None:
+            with self._lock:
+                if self._model_manager is None:
+                    self._model_manager = ModelManager(self.models_dir)
+        return self._model_manager
+
+    @property
+    def bot_manager(self) -> BotManager:
+        if self._bot_manager is None:
+            with self._lock:
+                if self._bot_manager is None:
+                    self._bot_manager = BotManager(self.bots_dir, self.models_dir, model_pool=self.model_pool)
+                    if self.watch_bots:
+                        self.bot_watcher = BotWatcher(self._bot_manager)
+                        self.bot_watcher.start()
+        return self._bot_manager
+
+    @property
+    def chat_manager(self) -> ChatManager:
+        if self._chat_manager is None:
+            with self._lock:
+                if self._chat_manager is None:
+                    self._chat_manager = ChatManager(self.history_dir)
+        return self._chat_manager
+
+    @property
+    def system_sampler(self) -> SystemSampler:
+        """The running system sampler, configured by MIDAS_SYSTEM_SAMPLE_INTERVAL and MIDAS_SYSTEM_HISTORY"""
+        if self._system_sampler is None:
+            with self._lock:
+                if self._system_sampler is None:
+                    sampler = SystemSampler(
+                        interval=float(os.environ.get("MIDAS_SYSTEM_SAMPLE_INTERVAL", "1.0")),
+                        capacity=int(os.environ.get("MIDAS_SYSTEM_HISTORY", "3600"))
+                    )
+                    sampler.start()
+                    self._system_sampler = sampler
+        return self._system_sampler
+
+    def after_fork(self) -> None:
+        """Reset per-process state in a freshly forked worker.
+
+        Loaded models are kept, so the child shares their memory-mapped
+        weights with the parent. Threads do not survive a fork, so the
+        sampler and bot watcher are started again, and the chat manager is
+        reopened so the worker gets its own SQLite connections and flusher.
+        """
+        self._lock = threading.Lock()
+        self._chat_manager = None
+        if self._system_sampler is not None:
+            self._system_sampler = None
+            self.system_sampler
+        if self.bot_watcher is not None and self.watch_bots:
+            self.bot_watcher = BotWatcher(self._bot_manager)
+            self.bot_watcher.start()
+
+    def close(self) -> None:
+        """Stop background threads and flush pending chat writes"""
+        with self._lock:
+            if self._system_sampler is not None:
+                self._system_sampler.stop()
+                self._system_sampler = None
+            if self.bot_watcher is not None:
+                self.bot_watcher.stop()
+                self.bot_watcher = None
+            if self._chat_manager is not None:
+                self._chat_manager.close()
+                self._chat_manager = None
+
+_default_services: Optional[Services] = None
+_default_lock = threading.Lock()
+
+def get_default_services() -> Services:
+    """Get the process-wide service container"""
+    global _default_services
+    with _default_lock:
+        if _default_services is None:
+            _default_services = Services()
+        return _default_services
+
+def init_app(app: Flask, services: Optional[Services] = None) -> Services:
+    """Attach a service container to a Flask app"""
+    services = services or get_default_services()
+    app.extensions[EXTENSION_KEY] = services
+    return services
+
+def get_services() -> Services:
+    """Get the service container for the current app, or the process-wide one"""
+    if has_app_context():
+        services = current_app.extensions.get(EXTENSION_KEY)
+        if services is not None:
+            return services
+    return get_default_services()
@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import logging
+import threading
+import weakref
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .chat_storage import ChatStorage
+
+logger = logging.getLogger(__name__)
+
+DB_FILENAME = "chats.sqlite3"
+
+class _ConnectionHolder:
+    """Holds one thread's connection in its thread-local storage.
+
+    The holder is dropped with the thread's locals when the thread exits,
+    and a finalizer then closes the connection.
+    """
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+def _close_connection(conn: sqlite3.Connection, connections: Set[sqlite3.Connection], lock: threading.Lock) -> None:
+    with lock:
+        connections.discard(conn)
+    conn.close()
+
+class SqliteChatStorage(ChatStorage):
+    """Stores chats in a SQLite database in WAL mode.
+
+    Messages are rows keyed by (chat_id, seq). Each conversation row keeps
+    its message count and byte size, updated in the transaction that inserts
+    a message, so ``size`` reads one row, and a revision bumped by every write. Each thread keeps its own
+    connection, and statements are reused from sqlite3's statement cache.
+    A connection is closed when its thread exits, so short-lived request
+    threads do not leave connections behind.
+    """
+
+    def __init__(self, history_dir: str = "chat_history", db_path: Optional[str] = None):
+        self.history_dir = history_dir
+        os.makedirs(history_dir, exist_ok=True)
+        self.db_path = db_path or os.path.join(history_dir, DB_FILENAME)
+        self._local = threading.local()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " id TEXT PRIMARY KEY,"
+                " title TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " message_count INTEGER NOT NULL DEFAULT 0,"
+                " byte_size INTEGER NOT NULL DEFAULT 0,"
+                " revision INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " chat_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,"
+                " seq INTEGER NOT NULL,"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " timestamp TEXT,"
+                " PRIMARY KEY (chat_id, seq)) WITHOUT ROWID"
+            )
+        self._add_counters()
+
+    def _add_counters(self) -> None:
+        """Add and fill the counter columns of databases created without them"""
+        conn = self._connect()
+
+        def columns():
+            return {row["name"] for row in conn.execute("PRAGMA table_info(conversations)")}
+
+        if "revision" in columns():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Checked again under the write lock, in case another process got here first
+            if "byte_size" not in columns():
+                conn.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+                conn.execute("ALTER TABLE conversations ADD COLUMN byte_size INTEGER NOT NULL DEFAULT 0")
+                conn.execute(
+                    "UPDATE conversations SET"
+                    " message_count = (SELECT COUNT(*) FROM messages WHERE chat_id = conversations.id),"
+                    " byte_size = (SELECT COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0)"
+                    " FROM messages WHERE chat_id = conversations.id)"
+                )
+            if "revision" not in columns():
+                conn.execute("ALTER TABLE conversations ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=128, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            holder = _ConnectionHolder(conn)
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.add(conn)
+            weakref.finalize(holder, _close_connection, conn, self._connections, self._connections_lock)
+        return holder.conn
+
+    @staticmethod
+    def _message(row: sqlite3.Row) -> Dict:
+        return {"role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
+
+    @staticmethod
+    def _insert_message(conn: sqlite3.Connection, chat_id: str, message: Dict) -> Optional[int]:
+        """Insert a message as the chat's next seq and update its counters; runs in the caller's transaction"""
+        cursor = conn.execute(
+            "INSERT INTO messages (chat_id, seq, role, content, timestamp)"
+            " SELECT id, (SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE chat_id = ?), ?, ?, ?"
+            " FROM conversations WHERE id = ?",
+            (chat_id, message["role"], message["content"], message.get("timestamp"), chat_id)
+        )
+        if cursor.rowcount != 1:
+            return None
+        conn.execute(
+            "UPDATE conversations SET message_count = message_count + 1, byte_size = byte_size + ?,"
+            " revision = revision + 1 WHERE id = ?",
+            (len(message["content"].encode('utf-8')), chat_id)
+        )
+        # Still inside the write transaction, so this is the row just inserted
+        return conn.execute("SELECT MAX(seq) FROM messages WHERE chat_id = ?", (chat_id,)).fetchone()[0]
+
+    def create(self, chat_id: str, title: str, created_at: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO conversations (id, title, created_at) VALUES (?, ?, ?)",
+                (chat_id, title, created_at)
+            )
+
+    def append_message(self, chat_id: str, message: Dict) -> Optional[int]:
+        with self._connect() as conn:
+            return self._insert_message(conn, chat_id, message)
+
+    def append_batch(self, messages: List[Tuple[str, Dict]], sync: bool = False) -> List[Optional[int]]:
+        """Append messages in a single transaction; with ``sync`` its commit is fsynced"""
+        conn = self._connect()
+        if sync:
+            conn.execute("PRAGMA synchronous=FULL")
+        try:
+            with conn:
+                return [self._insert_message(conn, chat_id, message) for chat_id, message in messages]
+        finally:
+            if sync:
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+    def count_messages(self, chat_id: str) -> Optional[int]:
+        if not self.exists(chat_id):
+            return None
+        return self._connect().execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE chat_id = ?", (chat_id,)
+        ).fetchone()[0]
+
+    def set_title(self, chat_id: str, title: str, timestamp: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE conversations SET title = ?, revision = revision + 1 WHERE id = ?", (title, chat_id)
+            )
+            return cursor.rowcount == 1
+
+    def import_chat(self, chat_data: Dict) -> None:
+        chat_id = chat_data["id"]
+        messages = chat_data.get("messages", [])
+        with self._connect() as conn:
+            # The replacement continues the old chat's revisions, so it never repeats one
+            row = conn.execute("SELECT revision FROM conversations WHERE id = ?", (chat_id,)).fetchone()
+            conn.execute("DELETE FROM conversations WHERE id = ?", (chat_id,))
+            conn.execute(
+                "INSERT INTO conversations (id, title, created_at, message_count, byte_size, revision)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (chat_id, chat_data.get("title", "New Chat"), chat_data.get("created_at", ""), len(messages),
+                 sum(len(message["content"].encode('utf-8')) for message in messages), row[0] + 1 if row else 0)
+            )
+            conn.executemany(
+                "INSERT INTO messages (chat_id, seq, role, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (chat_id, seq, message["role"], message["content"], message.get("timestamp"))
+                    for seq, message in enumerate(messages)
+                )
+            )
+
+    def exists(self, chat_id: str) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (chat_id,)
+        ).fetchone() is not None
+
+    def load(self, chat_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        row = conn.execute("SELECT id, title, created_at FROM conversations WHERE id = ?", (chat_id,)).fetchone()
+        if row is None:
+            return None
+        chat_data = dict(row)
+        chat_data["messages"] = list(self.iter_messages(chat_id))
+        return chat_data
+
+    def iter_messages(self, chat_id: str) -> Iterator[Dict]:
+        cursor = self._connect().execute(
+            "SELECT role, content, timestamp FROM messages WHERE chat_id = ? ORDER BY seq", (chat_id,)
+        )
+        for row in cursor:
+            yield self._message(row)
+
+    def get_messages(self, chat_id: str, limit: Optional[int] = None, before: Optional[int] = None,
+                     after: Optional[int] = None) -> Optional[List[Dict]]:
+        conn = self._connect()
+        sql_limit = -1 if limit is None else limit
+        if after is not None:
+            rows = conn.execute(
+                "SELECT seq, role, content, timestamp FROM messages"
+                " WHERE chat_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (chat_id, after, sql_limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT seq, role, content, timestamp FROM messages"
+                " WHERE chat_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (chat_id, 2 ** 62 if before is None else before, sql_limit)
+            ).fetchall()
+            rows.reverse()
+        if not rows and not self.exists(chat_id):
+            return None
+        return [{**self._message(row), "seq": row["seq"]} for row in rows]
+
+    def size(self, chat_id: str) -> int:
+        row = self._connect().execute("SELECT byte_size FROM conversations WHERE id = ?", (chat_id,)).fetchone()
+        return row[0] if row else 0
+
+    def revision(self, chat_id: str) -> int:
+        row = self._connect().execute("SELECT revision FROM conversations WHERE id = ?", (chat_id,)).fetchone()
+        return row[0] if row else 0
+
+    def summarize(self, chat_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT id, title, created_at,"
+            " COALESCE((SELECT MAX(timestamp) FROM messages WHERE chat_id = conversations.id), created_at) AS updated_at,"
+            " message_count, byte_size"
+            " FROM conversations WHERE id = ?",
+            (chat_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, chat_id: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM conversations WHERE id = ?", (chat_id,))
+            return cursor.rowcount == 1
+
+    def delete_if_unchanged(self, chat_id: str, revision: int) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM conversations WHERE id = ? AND revision = ?", (chat_id, revision))
+            return cursor.rowcount == 1
+
+    def list_ids(self) -> List[str]:
+        return [row[0] for row in self._connect().execute("SELECT id FROM conversations")]
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -1,34 +1,151 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
 import psutil
-import GPUtil
-import torch
-
-def get_system_info():
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    
-    if hasattr(psutil, "sensors_temperatures"):
-        temps = psutil.sensors_temperatures()
-    else:
-        temps = {}
-    
-    # GPU Information
-    if torch.cuda.is_available():
-        gpu_info = ""
+
+try:
+    import GPUtil
+except ImportError:  # GPU stats are optional
+    GPUtil = None
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    "time",
+    "cpu_percent",
+    "ram_percent",
+    "ram_used",
+    "swap_percent",
+    "temperature",
+    "gpu_load",
+    "gpu_memory_used",
+    "gpu_memory_total"
+)
+_COLUMN = {field: i for i, field in enumerate(FIELDS)}
+
+def _to_json(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 3)
+
+class SystemSampler:
+    """Samples machine stats in a background thread into a ring buffer.
+
+    Every ``interval`` seconds one row of FIELDS is written into a
+    ``capacity`` x len(FIELDS) float64 array, overwriting the oldest row when
+    full. Missing values (no temperature sensors, no GPU) are NaN. Readers
+    only copy rows under a lock, so they never wait on psutil or nvidia-smi.
+    """
+
+    def __init__(self, interval: float = 1.0, capacity: int = 3600, gpu: bool = True):
+        self.interval = interval
+        self.capacity = capacity
+        self.gpu = gpu and GPUtil is not None
+        self._buffer = np.full((capacity, len(FIELDS)), np.nan)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        # The first cpu_percent() call only sets the baseline for the next one
+        psutil.cpu_percent(interval=None)
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling system stats every {self.interval}s ({'with' if self.gpu else 'no'} GPU)")
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling system stats: {e}")
+
+    @staticmethod
+    def _temperature() -> float:
+        if not hasattr(psutil, "sensors_temperatures"):
+            return np.nan
+        readings = [t.current for sensors in psutil.sensors_temperatures().values() for t in sensors]
+        return max(readings) if readings else np.nan
+
+    def _gpu(self) -> List[float]:
+        """Load and memory in MB summed over all GPUs, NaN without one"""
+        if not self.gpu:
+            return [np.nan] * 3
         try:
             gpus = GPUtil.getGPUs()
-            for gpu in gpus:
-                gpu_info += f"\nGPU {gpu.id}: {gpu.name}"
-                gpu_info += f"\n - Memory Used: {gpu.memoryUsed}MB/{gpu.memoryTotal}MB"
-                gpu_info += f"\n - GPU Load: {gpu.load*100}%"
-        except:
-            gpu_info = "\nGPU information unavailable"
-    else:
-        gpu_info = "\nNo GPU available"
-    
-    return f"""
-    CPU Usage: {cpu_percent}%
-    RAM Usage: {memory.percent}%
-    Used RAM: {memory.used / (1024**3):.1f}GB
-    Total RAM: {memory.total / (1024**3):.1f}GB
-    {gpu_info}
-    """
+        except Exception:
+            gpus = []
+        if not gpus:
+            return [np.nan] * 3
+        return [
+            max(gpu.load for gpu in gpus) * 100,
+            sum(gpu.memoryUsed for gpu in gpus),
+            sum(gpu.memoryTotal for gpu in gpus)
+        ]
+
+    def sample(self) -> None:
+        """Take one sample now"""
+        memory = psutil.virtual_memory()
+        row = [
+            time.time(),
+            psutil.cpu_percent(interval=None),
+            memory.percent,
+            memory.used,
+            psutil.swap_memory().percent,
+            self._temperature(),
+            *self._gpu()
+        ]
+        with self._lock:
+            self._buffer[self._next] = row
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _rows(self) -> np.ndarray:
+        """Copy the samples, oldest first"""
+        with self._lock:
+            if self._count < self.capacity:
+                return self._buffer[:self._count].copy()
+            return np.roll(self._buffer, -self._next, axis=0)
+
+    def latest(self) -> Optional[Dict[str, Optional[float]]]:
+        """Get the most recent sample, or None before the first one"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            row = self._buffer[(self._next - 1) % self.capacity].copy()
+        sample = {field: _to_json(value) for field, value in zip(FIELDS, row)}
+        sample["cpu_count"] = os.cpu_count()
+        return sample
+
+    def history(self, seconds: Optional[float] = None, points: Optional[int] = None) -> Dict[str, List]:
+        """Get the samples of the last ``seconds`` as one list per field.
+
+        With ``points``, consecutive samples are averaged into at most that
+        many buckets; NaNs are ignored, and a bucket with no values is None.
+        """
+        rows = self._rows()
+        if seconds is not None and len(rows):
+            rows = rows[rows[:, _COLUMN["time"]] >= time.time() - seconds]
+        if points is not None and 0 < points < len(rows):
+            starts = np.linspace(0, len(rows), points, endpoint=False).astype(int)
+            valid = ~np.isnan(rows)
+            sums = np.add.reduceat(np.where(valid, rows, 0.0), starts, axis=0)
+            counts = np.add.reduceat(valid, starts, axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rows = np.where(counts > 0, sums / counts, np.nan)
+        return {field: [_to_json(value) for value in rows[:, i]] for i, field in enumerate(FIELDS)}
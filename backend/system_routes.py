@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, request
+from werkzeug.local import LocalProxy
+from .services import get_services
+import logging
+
+logger = logging.getLogger(__name__)
+system_routes = Blueprint('system_routes', __name__)
+system_sampler = LocalProxy(lambda: get_services().system_sampler)
+
+@system_routes.route('/api/system', methods=['GET'])
+def get_system():
+    """Get the latest system sample, read from the background sampler.
+
+    With ``history=<seconds>`` the samples of that window are returned as
+    one list per field, averaged down to at most ``points`` values.
+    """
+    try:
+        seconds = request.args.get('history', type=float)
+        points = request.args.get('points', type=int)
+        if (seconds is not None and seconds <= 0) or (points is not None and points <= 0):
+            return jsonify({"error": "history and points must be positive"}), 400
+
+        response = {"interval": system_sampler.interval, "latest": system_sampler.latest()}
+        if seconds is not None:
+            response["history"] = system_sampler.history(seconds=seconds, points=points)
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"Error getting system stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,317 @@
+import logging
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from .chat_storage import ChatBatchError, ChatStorage, page_bounds
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("none", "batch", "sync")
+
+class WriteBehindChatStorage(ChatStorage):
+    """Group-commit buffer in front of another chat storage.
+
+    Appends are given their seq and acknowledged from memory, then written
+    by a background thread in batches, every ``flush_interval`` seconds or
+    as soon as ``max_batch`` messages are queued. Reads merge the messages
+    still waiting in the buffer, so a caller always sees its own writes.
+
+    ``durability`` controls what an acknowledged append means:
+
+    - ``none``: buffered in memory, batches are written without fsync
+    - ``batch``: buffered in memory, each batch is fsynced once (default)
+    - ``sync``: the append waits until its batch has been fsynced; concurrent
+      appends share that fsync. If the write fails, the append raises, and so
+      do later appends to the same chat that were queued behind it. An append
+      not written within ``sync_timeout`` seconds raises TimeoutError but
+      stays queued.
+
+    ``on_flush``, if set, is called from the flushing thread with the
+    (chat_id, message) pairs each flush wrote, so indexes can be updated once
+    per batch instead of once per message.
+
+    Everything other than appends goes straight to the wrapped storage.
+    """
+
+    def __init__(self, storage: ChatStorage, flush_interval: float = 0.05, max_batch: int = 256,
+                 durability: str = "batch", sync_timeout: float = 30.0):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.durability = durability
+        self.sync_timeout = sync_timeout
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        # (chat_id, record, ticket); tickets number appends in order
+        self._queue: List[Tuple[str, Dict, int]] = []
+        self._pending: Dict[str, List[Dict]] = {}
+        self._next_seq: Dict[str, int] = {}
+        self._enqueued = 0
+        self._written = 0
+        self._waiting: Set[int] = set()
+        self._failures: Dict[int, Exception] = {}
+        self._closed = False
+        self.on_flush: Optional[Callable[[List[Tuple[str, Dict]]], None]] = None
+        self._flusher = threading.Thread(target=self._flush_loop, name="chat-write-behind", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._queue) >= self.max_batch
+                    or (self.durability == "sync" and self._queue),
+                    timeout=self.flush_interval
+                )
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing chat messages, will retry: {e}")
+            if closed:
+                return
+
+    def flush(self) -> None:
+        """Write every queued message to the wrapped storage.
+
+        If the write fails part way, only the messages that were not written
+        are queued again, ahead of newer ones, and the error is raised. In
+        ``sync`` mode they fail instead, since nobody has been told they are
+        stored.
+        """
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Body of flush; caller holds the flush lock"""
+        with self._cond:
+            batch = self._queue
+            self._queue = []
+            ticket = self._enqueued
+        error = None
+        seqs: List[Optional[int]] = [None] * len(batch)
+        done = [False] * len(batch)
+        if batch:
+            try:
+                seqs = self.storage.append_batch(
+                    [(chat_id, self._strip(record)) for chat_id, record, _ in batch],
+                    sync=self.durability != "none"
+                )
+                done = [True] * len(batch)
+            except ChatBatchError as e:
+                seqs, done, error = e.seqs, e.done, e
+            except Exception as e:
+                error = e
+        unwritten = []
+        stored = []
+        with self._cond:
+            for item, seq, written in zip(batch, seqs, done):
+                chat_id, record, _ = item
+                if not written:
+                    unwritten.append(item)
+                    continue
+                pending = self._pending.get(chat_id)
+                if pending:
+                    pending.remove(record)
+                    if not pending:
+                        del self._pending[chat_id]
+                if seq is None:
+                    continue
+                if seq != record["seq"]:
+                    logger.error(f"Chat {chat_id} stored message {record['seq']} as {seq}")
+                stored.append((chat_id, {**record, "seq": seq}))
+            if unwritten and self.durability == "sync":
+                self._fail(unwritten, error)
+            elif unwritten:
+                self._queue = unwritten + self._queue
+            if not unwritten or self.durability == "sync":
+                self._written = ticket
+            self._cond.notify_all()
+        if stored and self.on_flush is not None:
+            try:
+                self.on_flush(stored)
+            except Exception as e:
+                logger.error(f"Error handling {len(stored)} flushed chat messages: {e}")
+        if error is not None:
+            raise error
+
+    def _fail(self, items: List[Tuple[str, Dict, int]], error: Exception) -> None:
+        """Fail queued appends and everything queued after them in their chats; caller holds _cond"""
+        chat_ids = {chat_id for chat_id, _, _ in items}
+        # Later appends to these chats were numbered after the failed ones
+        items = items + [item for item in self._queue if item[0] in chat_ids]
+        self._queue = [item for item in self._queue if item[0] not in chat_ids]
+        for _, _, ticket in items:
+            if ticket in self._waiting:
+                self._failures[ticket] = error
+        for chat_id in chat_ids:
+            self._pending.pop(chat_id, None)
+            self._next_seq.pop(chat_id, None)
+
+    def _snapshot(self, chat_id: str) -> List[Dict]:
+        """Copy the buffered messages of a chat; taken before reading the wrapped storage"""
+        with self._cond:
+            return list(self._pending.get(chat_id, ()))
+
+    @staticmethod
+    def _strip(record: Dict) -> Dict:
+        return {k: v for k, v in record.items() if k != "seq"}
+
+    def _forget(self, chat_id: str) -> None:
+        """Drop everything buffered for a chat; caller holds the flush lock"""
+        with self._cond:
+            self._pending.pop(chat_id, None)
+            self._next_seq.pop(chat_id, None)
+            self._queue = [item for item in self._queue if item[0] != chat_id]
+
+    def create(self, chat_id: str, title: str, created_at: str) -> None:
+        self.storage.create(chat_id, title, created_at)
+        with self._cond:
+            self._next_seq[chat_id] = 0
+
+    def append_message(self, chat_id: str, message: Dict) -> Optional[int]:
+        count = None
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Chat storage is closed")
+                # Another append may have numbered the chat while we counted
+                seq = self._next_seq.get(chat_id, count)
+                if seq is not None:
+                    self._enqueue(chat_id, message, seq)
+                    return seq
+            # Counted outside the lock so a slow read does not stall other chats
+            count = self.storage.count_messages(chat_id)
+            if count is None:
+                return None
+
+    def _enqueue(self, chat_id: str, message: Dict, seq: int) -> None:
+        """Queue a message as ``seq``, waiting for it in sync mode; caller holds _cond"""
+        self._next_seq[chat_id] = seq + 1
+        record = {**message, "seq": seq}
+        self._enqueued += 1
+        ticket = self._enqueued
+        self._queue.append((chat_id, record, ticket))
+        self._pending.setdefault(chat_id, []).append(record)
+        if len(self._queue) >= self.max_batch or self.durability == "sync":
+            self._cond.notify_all()
+        if self.durability == "sync":
+            self._waiting.add(ticket)
+            written = self._cond.wait_for(
+                lambda: ticket in self._failures or self._written >= ticket, timeout=self.sync_timeout
+            )
+            self._waiting.discard(ticket)
+            error = self._failures.pop(ticket, None)
+            if error is not None:
+                raise RuntimeError(f"Message {seq} of chat {chat_id} was not written: {error}") from error
+            if not written:
+                raise TimeoutError(f"Message {seq} of chat {chat_id} was not written within {self.sync_timeout}s")
+
+    def append_batch(self, messages: List[Tuple[str, Dict]], sync: bool = False) -> List[Optional[int]]:
+        """Write messages straight to the wrapped storage, after everything buffered.
+
+        Meant for bulk imports; these messages are not passed to on_flush.
+        """
+        with self._flush_lock:
+            self._flush()
+            with self._cond:
+                for chat_id in {chat_id for chat_id, _ in messages}:
+                    self._next_seq.pop(chat_id, None)
+            return self.storage.append_batch(messages, sync=sync)
+
+    def count_messages(self, chat_id: str) -> Optional[int]:
+        with self._cond:
+            if chat_id in self._next_seq:
+                return self._next_seq[chat_id]
+        return self.storage.count_messages(chat_id)
+
+    def set_title(self, chat_id: str, title: str, timestamp: str) -> bool:
+        return self.storage.set_title(chat_id, title, timestamp)
+
+    def import_chat(self, chat_data: Dict) -> None:
+        with self._flush_lock:
+            self._forget(chat_data["id"])
+            self.storage.import_chat(chat_data)
+
+    def exists(self, chat_id: str) -> bool:
+        return self.storage.exists(chat_id)
+
+    def load(self, chat_id: str) -> Optional[Dict]:
+        pending = self._snapshot(chat_id)
+        chat_data = self.storage.load(chat_id)
+        if chat_data is None or not pending:
+            return chat_data
+        messages = chat_data.setdefault("messages", [])
+        count = len(messages)
+        messages.extend(self._strip(record) for record in pending if record["seq"] >= count)
+        return chat_data
+
+    def iter_messages(self, chat_id: str) -> Iterator[Dict]:
+        pending = self._snapshot(chat_id)
+        count = 0
+        for message in self.storage.iter_messages(chat_id):
+            count += 1
+            yield message
+        for record in pending:
+            if record["seq"] >= count:
+                yield self._strip(record)
+
+    def get_messages(self, chat_id: str, limit: Optional[int] = None, before: Optional[int] = None,
+                     after: Optional[int] = None) -> Optional[List[Dict]]:
+        pending = self._snapshot(chat_id)
+        if not pending:
+            return self.storage.get_messages(chat_id, limit=limit, before=before, after=after)
+        start, end = page_bounds(pending[-1]["seq"] + 1, limit, before, after)
+        if start >= end:
+            return [] if self.storage.exists(chat_id) else None
+        messages = self.storage.get_messages(chat_id, limit=end - start, after=start - 1)
+        if messages is None:
+            return None
+        next_seq = start + len(messages)
+        messages.extend(dict(record) for record in pending if next_seq <= record["seq"] < end)
+        return messages
+
+    def size(self, chat_id: str) -> int:
+        return self.storage.size(chat_id)
+
+    def revision(self, chat_id: str) -> int:
+        return self.storage.revision(chat_id)
+
+    def summarize(self, chat_id: str) -> Optional[Dict]:
+        pending = self._snapshot(chat_id)
+        summary = self.storage.summarize(chat_id)
+        if summary and pending:
+            summary["message_count"] = max(summary["message_count"], pending[-1]["seq"] + 1)
+            summary["updated_at"] = pending[-1].get("timestamp") or summary["updated_at"]
+        return summary
+
+    def delete(self, chat_id: str) -> bool:
+        with self._flush_lock:
+            self._forget(chat_id)
+            return self.storage.delete(chat_id)
+
+    def list_ids(self) -> List[str]:
+        return self.storage.list_ids()
+
+    def archive(self, chat_id: str) -> Optional[Tuple[int, int]]:
+        self.flush()
+        with self._flush_lock:
+            self._forget(chat_id)
+            return self.storage.archive(chat_id)
+
+    def is_archived(self, chat_id: str) -> bool:
+        return self.storage.is_archived(chat_id)
+
+    def archive_stats(self) -> Dict[str, int]:
+        return self.storage.archive_stats()
+
+    def close(self) -> None:
+        """Flush everything still buffered and close the wrapped storage"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        if self._queue:
+            logger.error(f"Dropped {len(self._queue)} chat messages that could not be written")
+        self.storage.close()
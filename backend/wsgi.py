@@ -0,0 +1,91 @@
+"""WSGI entry point for running the backend under a production server.
+
+Usage:
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:application
+
+Importing this module creates the app and, unless MIDAS_PRELOAD_MODELS=0,
+loads the model of every bot. With gunicorn's preload_app that happens once
+in the master process; the forked workers then share the memory-mapped
+weights copy-on-write instead of each loading its own copy.
+
+When MIDAS_WORKERS is ``auto`` (the gunicorn.conf.py default) the worker
+count is picked here, from the bot table the app loaded, before any model is
+loaded, because the llama.cpp thread count depends on it.
+"""
+import os
+import sys
+import logging
+
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.chat_manager import write_behind_enabled
+from backend.model_index import get_model_index
+from backend.server import app, services
+
+logger = logging.getLogger(__name__)
+
+# Private memory per worker on top of the shared weights: KV caches
+# written copy-on-write, scratch buffers and the Python heap
+WORKER_MEMORY_MB = int(os.environ.get("MIDAS_WORKER_MEMORY_MB", "1024"))
+MEMORY_FRACTION = 0.8
+
+def model_bytes() -> int:
+    """Total size of the model files the bots use, read from the app's bot index without loading them"""
+    model_index = get_model_index(services.models_dir)
+    paths = {model_index.resolve(model) for model in services.bot_manager.base_models()}
+    paths.discard(None)
+    return sum(os.path.getsize(path) for path in paths)
+
+def recommended_workers(cpu_count: int, total_memory: int, shared_bytes: int, worker_bytes: int,
+                        memory_fraction: float = MEMORY_FRACTION) -> int:
+    """Pick a worker count that fits both the cores and the memory.
+
+    The weights are shared, so they are counted once; every worker then
+    needs ``worker_bytes`` of its own out of ``memory_fraction`` of RAM.
+    """
+    budget = total_memory * memory_fraction - shared_bytes
+    by_memory = int(budget // worker_bytes) if worker_bytes > 0 else cpu_count
+    return max(1, min(cpu_count, by_memory))
+
+def configure_workers() -> int:
+    """Resolve MIDAS_WORKERS to a number and split the llama.cpp threads between the workers"""
+    cpu_count = os.cpu_count() or 1
+    explicit = os.environ["MIDAS_WORKERS"] != "auto"
+    if explicit:
+        workers = int(os.environ["MIDAS_WORKERS"])
+    else:
+        workers = recommended_workers(cpu_count, psutil.virtual_memory().total, model_bytes(),
+                                      WORKER_MEMORY_MB * 1024**2)
+    # The write-behind buffer numbers and holds messages in one process's memory,
+    # so other workers would hand out the same seqs and miss buffered messages
+    if write_behind_enabled() and workers > 1:
+        if explicit:
+            raise RuntimeError("MIDAS_CHAT_WRITE_BEHIND needs MIDAS_WORKERS=1")
+        workers = 1
+    # Read by gunicorn.conf.py's on_starting and reported by /api/capacity,
+    # so the UI sizes its queue for every worker
+    os.environ["MIDAS_WORKERS"] = str(workers)
+    # Split the cores between workers so parallel generations do not oversubscribe them
+    model_threads = os.environ.setdefault("MIDAS_MODEL_THREADS", str(max(1, cpu_count // workers)))
+    services.model_pool.n_threads = int(model_threads)
+    logger.info(f"Sizing for {workers} workers with {model_threads} model threads each")
+    return workers
+
+def preload_models() -> int:
+    """Load the model of every bot into the shared model pool; returns the number loaded"""
+    bot_manager = services.bot_manager
+    for bot in bot_manager.list_bots(fields=['id']):
+        bot_manager.get_bot(bot['id'], load_model=True)
+    loaded = len(services.model_pool.loaded_models())
+    logger.info(f"Preloaded {loaded} models")
+    return loaded
+
+if "MIDAS_WORKERS" in os.environ:
+    configure_workers()
+
+if os.environ.get("MIDAS_PRELOAD_MODELS", "1") == "1":
+    preload_models()
+
+application = app
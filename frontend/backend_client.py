@@ -0,0 +1,321 @@
+import io
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+BACKEND_URL = os.environ.get("MIDAS_BACKEND_URL", "http://127.0.0.1:7860")
+
+Timeout = Union[float, Tuple[float, float]]
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT: Timeout = (3.05, 30)
+STREAM_TIMEOUT: Timeout = (3.05, 300)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+class BackendError(Exception):
+    """A backend call failed with an HTTP error status"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class _WSGIBody(io.RawIOBase):
+    """Read a WSGI response iterable as a file, one chunk at a time"""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = iter(response.response)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk.encode() if isinstance(chunk, str) else chunk
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            # Closing the WSGI response runs the cleanup of streaming generators
+            self._response.close()
+        super().close()
+
+class WSGIAdapter(BaseAdapter):
+    """Send requests straight to a Flask app in this process.
+
+    Used by the in-process client: the UI calls the backend's routes without
+    a socket, so both share one set of services and one model pool.
+    """
+
+    def __init__(self, app):
+        super().__init__()
+        self.client = app.test_client()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlsplit(request.url)
+        wsgi_response = self.client.open(
+            url.path,
+            method=request.method,
+            query_string=url.query,
+            headers=dict(request.headers),
+            data=request.body,
+            buffered=False
+        )
+        response = requests.Response()
+        response.status_code = wsgi_response.status_code
+        response.reason = wsgi_response.status.partition(" ")[2]
+        response.headers = CaseInsensitiveDict(wsgi_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _WSGIBody(wsgi_response)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+class BackendClient:
+    """Client for the MIDAS backend API.
+
+    All calls share one keep-alive session with a pool of up to
+    ``pool_size`` connections. Every call has a timeout; idempotent calls
+    (GET, PUT, DELETE) are retried up to ``retries`` times on connection
+    errors and 502/503/504 responses, while POSTs are never retried. Calls
+    are timed per endpoint template and reported by ``latency_stats()``.
+    """
+
+    def __init__(self, base_url: str = BACKEND_URL, timeout: Timeout = DEFAULT_TIMEOUT,
+                 stream_timeout: Timeout = STREAM_TIMEOUT, retries: int = 2, pool_size: int = 16):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def in_process(cls, app) -> "BackendClient":
+        """Create a client that calls ``app`` directly instead of over HTTP"""
+        client = cls(base_url="http://in-process")
+        client.session.mount("http://in-process", WSGIAdapter(app))
+        return client
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["errors"] += failed
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+
+    def latency_stats(self) -> Dict[str, Dict]:
+        """Call count, error count and mean/max latency in ms per endpoint"""
+        with self._stats_lock:
+            return {
+                endpoint: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "mean_ms": round(stats["total"] / stats["count"] * 1000, 2),
+                    "max_ms": round(stats["max"] * 1000, 2)
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+    def request(self, method: str, template: str, *args: str, stream: bool = False,
+                timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        """Call ``template`` with ``args`` quoted into its ``{}`` placeholders.
+
+        Raises BackendError for error statuses. Latency is recorded under
+        "METHOD template", so all chats share one entry for example.
+        """
+        endpoint = f"{method} {template}"
+        url = self.base_url + template.format(*(quote(str(arg), safe="") for arg in args))
+        if timeout is None:
+            timeout = self.stream_timeout if stream else self.timeout
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, stream=stream, timeout=timeout, **kwargs)
+            failed = response.status_code >= 400
+        finally:
+            if not stream or failed:
+                self._record(endpoint, time.perf_counter() - start, failed)
+        if failed:
+            raise BackendError(response.status_code, self._error_message(response))
+        return response
+
+    @staticmethod
+    def _error_message(response: requests.Response) -> str:
+        try:
+            return response.json().get("error") or response.text
+        except ValueError:
+            return response.text or f"HTTP {response.status_code}"
+        finally:
+            response.close()
+
+    def _json(self, method: str, template: str, *args: str, **kwargs):
+        return self.request(method, template, *args, **kwargs).json()
+
+    def stream_events(self, method: str, template: str, *args: str, **kwargs) -> Iterator[Dict]:
+        """Yield the JSON payloads of a server-sent event stream.
+
+        The stream's latency is recorded once it ends, under the same
+        endpoint key as ordinary calls.
+        """
+        endpoint = f"{method} {template}"
+        start = time.perf_counter()
+        response = self.request(method, template, *args, stream=True, **kwargs)
+        failed = True
+        try:
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                try:
+                    yield json.loads(line[6:])
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping malformed event from {endpoint}: {e}")
+            failed = False
+        finally:
+            response.close()
+            self._record(endpoint, time.perf_counter() - start, failed)
+
+    def close(self) -> None:
+        self.session.close()
+
+    # Models
+
+    def list_models(self) -> List[Dict]:
+        return self._json("GET", "/api/models")
+
+    def list_downloaded_models(self) -> List[Dict]:
+        return self._json("GET", "/api/models/downloaded")
+
+    def download_model(self, model_name: str) -> Dict:
+        return self._json("POST", "/api/models/{}/download", model_name)
+
+    def remove_model(self, model_name: str) -> Dict:
+        return self._json("DELETE", "/api/models/{}", model_name)
+
+    def add_model(self, model: Dict) -> Dict:
+        return self._json("POST", "/api/models", json=model)
+
+    def capacity(self) -> Dict:
+        return self._json("GET", "/api/capacity")
+
+    def model_stats(self) -> List[Dict]:
+        return self._json("GET", "/api/models/stats")
+
+    # System
+
+    def system(self, history: Optional[float] = None, points: Optional[int] = None) -> Dict:
+        params = {}
+        if history is not None:
+            params["history"] = history
+        if points is not None:
+            params["points"] = points
+        return self._json("GET", "/api/system", params=params)
+
+    # Chats
+
+    def list_chats(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        params = {"offset": offset}
+        if limit is not None:
+            params["limit"] = limit
+        return self._json("GET", "/api/chats", params=params)
+
+    def create_chat(self, title: str) -> Dict:
+        return self._json("POST", "/api/chats", json={"title": title})
+
+    def get_chat(self, chat_id: str) -> Dict:
+        return self._json("GET", "/api/chats/{}", chat_id)
+
+    def rename_chat(self, chat_id: str, title: str) -> Dict:
+        return self._json("PUT", "/api/chats/{}", chat_id, json={"title": title})
+
+    def delete_chat(self, chat_id: str) -> Dict:
+        return self._json("DELETE", "/api/chats/{}", chat_id)
+
+    def get_messages(self, chat_id: str, limit: Optional[int] = None) -> List[Dict]:
+        params = {"limit": limit} if limit is not None else None
+        return self._json("GET", "/api/chats/{}/messages", chat_id, params=params)
+
+    def add_message(self, chat_id: str, role: str, content: str) -> Dict:
+        return self._json("POST", "/api/chats/{}/messages", chat_id, json={"role": role, "content": content})
+
+    def chat_turn(self, chat_id: str, bot_id: str, content: str, parameters: Dict,
+                  context_limit: Optional[int] = None) -> Iterator[Dict]:
+        """Stream the events of one conversation turn"""
+        data = {"bot_id": bot_id, "content": content, "parameters": parameters}
+        if context_limit is not None:
+            data["context_limit"] = context_limit
+        return self.stream_events("POST", "/api/chats/{}/turn", chat_id, json=data)
+
+    # Bots
+
+    def list_bots(self, fields: Optional[str] = None) -> List[Dict]:
+        params = {"fields": fields} if fields else None
+        return self._json("GET", "/api/bots", params=params)
+
+    def get_bot(self, bot_id: str) -> Dict:
+        return self._json("GET", "/api/bots/{}", bot_id)
+
+    def create_bot(self, bot: Dict) -> Dict:
+        return self._json("POST", "/api/bots", json=bot)
+
+    def update_bot(self, bot_id: str, bot: Dict) -> Dict:
+        return self._json("PUT", "/api/bots/{}", bot_id, json=bot)
+
+    def delete_bot(self, bot_id: str) -> Dict:
+        return self._json("DELETE", "/api/bots/{}", bot_id)
+
+    def chat(self, data: Dict) -> Dict:
+        return self._json("POST", "/api/chat", json=data)
+
+_client: Optional[BackendClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> BackendClient:
+    """Get the process-wide backend client.
+
+    With MIDAS_UI_IN_PROCESS=1 the UI runs the backend app in its own
+    process and calls it directly, sharing its loaded models; otherwise it
+    talks to the backend at MIDAS_BACKEND_URL.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.environ.get("MIDAS_UI_IN_PROCESS", "0") == "1":
+                from backend.server import app
+                _client = BackendClient.in_process(app)
+            else:
+                _client = BackendClient()
+        return _client
@@ -1,22 +1,19 @@
 import os
 import sys
-import json
-import time
-import torch
 import gradio as gr
-import requests
-import threading
 from datetime import datetime
-from queue import Queue
+from typing import Tuple
 
 # Constants
-BACKEND_URL = "http://localhost:7860"
+CHAT_LIST_LIMIT = 100
+# Queued requests allowed per backend generation slot before new ones are turned away
+QUEUE_PER_SLOT = int(os.environ.get("MIDAS_UI_QUEUE_PER_SLOT", "4"))
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.system_monitor import get_system_info
-from backend.llm_interface import LLMInterface
+from frontend.backend_client import BackendError, get_client
+from frontend.streaming import coalesce
 
 # Load external CSS file
 with open('frontend/static/styles.css', 'r') as f:
@@ -122,16 +119,31 @@ CUSTOM_CSS += """
 
 """
 
+def queue_settings(client) -> Tuple[int, int]:
+    """Derive the UI's (concurrency, queue size) from the backend's capacity.
+
+    The UI runs as many events at once as the backend has generation slots
+    across all its workers, so requests wait in Gradio's queue, where users
+    see their position and estimated wait, instead of piling up on the model
+    lock and timing out. This is computed once when the UI starts; restart
+    the UI after adding bots or backend workers. If the backend cannot be
+    reached, the UI falls back to one event at a time.
+    """
+    try:
+        capacity = client.capacity()
+        slots = capacity["max_slots"] * capacity.get("workers", 1)
+    except Exception as e:
+        print(f"[ERROR] Failed to get backend capacity, running one event at a time: {e}")
+        slots = 0
+    concurrency = max(1, slots)
+    return concurrency, concurrency * QUEUE_PER_SLOT
+
 def create_interface():
-    llm = LLMInterface()
+    client = get_client()
     
     def get_downloaded_models():
         try:
-            response = requests.get(f'{BACKEND_URL}/api/models/downloaded')
-            if response.status_code == 200:
-                models = response.json()
-                return [model['name'] for model in models]
-            return []
+            return [model['name'] for model in client.list_downloaded_models()]
         except Exception as e:
             print(f"[ERROR] Failed to get downloaded models: {e}")
             return []
@@ -145,38 +157,34 @@ def create_interface():
     # Model Management Functions
     def list_available_models():
         try:
-            response = requests.get(f'{BACKEND_URL}/api/models')
-            if response.status_code == 200:
-                models = response.json()
-                return [
-                    [
-                        model['name'],
-                        model['size'],
-                        "✓" if model['is_downloaded'] else "✗",
-                        "✓" if model['is_loaded'] else "✗"
-                    ]
-                    for model in models
+            return [
+                [
+                    model['name'],
+                    model['size'],
+                    "✓" if model['is_downloaded'] else "✗",
+                    "✓" if model['is_loaded'] else "✗"
                 ]
-            return []
+                for model in client.list_models()
+            ]
         except Exception as e:
             print(f"[ERROR] Failed to list models: {e}")
             return []
 
     def download_model(model_name):
         try:
-            response = requests.post(f'{BACKEND_URL}/api/models/{model_name.lower()}/download')
-            if response.status_code == 200:
-                return f"Successfully started downloading {model_name}"
-            return f"Failed to download {model_name}: {response.text}"
+            client.download_model(model_name.lower())
+            return f"Successfully started downloading {model_name}"
+        except BackendError as e:
+            return f"Failed to download {model_name}: {e}"
         except Exception as e:
             return f"Error downloading model: {str(e)}"
 
     def remove_model(model_name):
         try:
-            response = requests.delete(f'{BACKEND_URL}/api/models/{model_name.lower()}')
-            if response.status_code == 200:
-                return f"Successfully removed {model_name}"
-            return f"Failed to remove {model_name}: {response.text}"
+            client.remove_model(model_name.lower())
+            return f"Successfully removed {model_name}"
+        except BackendError as e:
+            return f"Failed to remove {model_name}: {e}"
         except Exception as e:
             return f"Error removing model: {str(e)}"
 
@@ -192,37 +200,76 @@ def create_interface():
                 "url": url
             }
             
-            response = requests.post(
-                f'{BACKEND_URL}/api/models',
-                json=data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                return "Successfully added new model"
-            return f"Failed to add model: {response.text}"
+            client.add_model(data)
+            return "Successfully added new model"
+        except BackendError as e:
+            return f"Failed to add model: {e}"
         except Exception as e:
             return f"Error adding model: {str(e)}"
 
     def refresh_model_list():
         return gr.update(value=list_available_models())
 
+    def system_summary():
+        """Format the backend's latest system sample"""
+        try:
+            sample = client.system()["latest"]
+        except Exception as e:
+            return f"System information unavailable: {e}"
+        if sample is None:
+            return "Waiting for the first system sample..."
+        lines = [
+            f"**CPU:** {sample['cpu_percent']}% of {sample['cpu_count']} cores",
+            f"**RAM:** {sample['ram_percent']}% ({sample['ram_used'] / 1024**3:.1f} GB used)",
+            f"**Swap:** {sample['swap_percent']}%"
+        ]
+        if sample['temperature'] is not None:
+            lines.append(f"**Temperature:** {sample['temperature']:.0f}°C")
+        if sample['gpu_load'] is not None:
+            lines.append(
+                f"**GPU:** {sample['gpu_load']:.0f}% load, "
+                f"{sample['gpu_memory_used']:.0f}/{sample['gpu_memory_total']:.0f} MB"
+            )
+        return "  \n".join(lines)
+
+    def model_usage():
+        """Per-model resource use reported by the backend"""
+        try:
+            models = client.model_stats()
+        except Exception as e:
+            print(f"[ERROR] Failed to get model stats: {e}")
+            return []
+        mb = lambda value: round(value / 1024**2) if value is not None else None
+        return [
+            [
+                os.path.basename(model["model_path"]),
+                ", ".join(model["bots"]),
+                mb(model["memory"]["weights_bytes"]),
+                mb(model["memory"]["kv_cache_bytes"]),
+                model["active_sessions"],
+                model["tokens"],
+                model["prefill"]["cpu_seconds"],
+                model["decode"]["cpu_seconds"],
+                model["decode_tokens_per_second"]
+            ]
+            for model in models
+        ]
+
+    def backend_latency():
+        """Per-endpoint latency of this UI's backend calls"""
+        return [
+            [endpoint, stats["count"], stats["errors"], stats["mean_ms"], stats["max_ms"]]
+            for endpoint, stats in sorted(client.latency_stats().items())
+        ]
+
     def list_chats():
-        """Get list of available chats"""
+        """Get (title, id) choices for the most recent chats.
+
+        The list is fetched once per session; later actions update it in
+        place, so their cost does not grow with the number of chats.
+        """
         try:
-            response = requests.get('http://127.0.0.1:7860/api/chats')
-            if response.status_code == 200:
-                chats = response.json()
-                # Sort chats by timestamp if available
-                if chats and 'timestamp' in chats[0]:
-                    chats.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-                # Store chat_id in the value but only show title in display
-                choices = {chat['title']: f"{chat['title']} ({chat['id']})" for chat in chats}
-                return list(choices.keys())  # Only return the titles
-            else:
-                print(f"[ERROR] Failed to get chats: {response.status_code}")
-                print(f"[ERROR] Response: {response.text}")
-                return []
+            return [(chat['title'], chat['id']) for chat in client.list_chats(limit=CHAT_LIST_LIMIT)]
         except Exception as e:
             print(f"[ERROR] Exception in list_chats: {str(e)}")
             return []
@@ -232,7 +279,7 @@ def create_interface():
         print("[DEBUG] Refreshing chat list")
         choices = list_chats()
         print(f"[DEBUG] Updated chat list: {choices}")
-        return gr.update(choices=choices)
+        return gr.update(choices=choices), choices
 
     def create_title_from_message(message, max_words=3):
         """Create a concise 2-3 word title from the user's message"""
@@ -243,37 +290,22 @@ def create_interface():
             return clean_msg
         return ' '.join(words[:max_words]) + '...'
 
-    def create_new_chat():
-        """Create a new chat and return its title"""
+    def create_new_chat(choices):
+        """Create a new chat and select it by id"""
         try:
-            # Create new chat with headers
-            headers = {'Content-Type': 'application/json'}
             initial_title = f"Chat {datetime.now().strftime('%I:%M %p')}"
+            chat_id = client.create_chat(initial_title)['id']
             
-            response = requests.post(
-                'http://127.0.0.1:7860/api/chats',
-                json={'title': initial_title, 'temporary': True},  # Mark as temporary
-                headers=headers
-            )
-            
-            if response.status_code == 200:
-                chat_data = response.json()
-                chat_id = chat_data['id']
-                
-                # Update chat list and return new state
-                choices = list_chats()
-                return gr.update(choices=choices, value=initial_title), [], f"### {initial_title}"
-            else:
-                print(f"[ERROR] Failed to create chat: {response.status_code}")
-                print(f"[ERROR] Response: {response.text}")
-                return gr.update(), [], "### Error creating chat"
+            # Newest chats come first in the list
+            choices = [(initial_title, chat_id)] + (choices or [])
+            return gr.update(choices=choices, value=chat_id), [], f"### {initial_title}", choices, chat_id
         except Exception as e:
             print(f"[ERROR] Failed to create chat: {e}")
-            return gr.update(), [], "### Error creating chat"
+            return gr.update(), [], "### Error creating chat", choices, gr.update()
 
-    def submit_message(msg, history, chat_selection, bot_selection, temperature, max_new_tokens, top_p, top_k, repetition_penalty):
+    def submit_message(msg, history, chat_id, bot_selection, temperature, max_new_tokens, top_p, top_k, repetition_penalty):
         """Submit a message and get streaming response"""
-        if not msg or not chat_selection:
+        if not msg or not chat_id:
             return history, ""
             
         print("\n[DEBUG] Processing new message...")
@@ -287,117 +319,44 @@ def create_interface():
         yield history, ""  # Show user message immediately
         
         try:
-            # Get chat ID from selection
-            print("[DEBUG] Fetching chat information...")
-            response = requests.get('http://127.0.0.1:7860/api/chats')
-            chats = response.json() if response.status_code == 200 else []
-            selected_chat = next((chat for chat in chats if chat['title'] == chat_selection), None)
-            
-            if not selected_chat:
-                print(f"[ERROR] Could not find chat for title: {chat_selection}")
-                history[-1][1] = "Error: Could not find chat"
-                yield history, ""
-                return
-                
-            chat_id = selected_chat['id']
             print(f"[DEBUG] Using chat ID: {chat_id}")
             
-            # Save the user's message
-            headers = {'Content-Type': 'application/json'}
-            if chat_id:
-                try:
-                    print("[DEBUG] Saving user message to chat history...")
-                    # Mark chat as permanent since a message was sent
-                    requests.put(
-                        f'http://127.0.0.1:7860/api/chats/{chat_id}',
-                        json={'temporary': False},
-                        headers=headers
-                    )
-                    
-                    # Save the message
-                    response = requests.post(
-                        f'http://127.0.0.1:7860/api/chats/{chat_id}/messages',
-                        json={'role': 'user', 'content': formatted_msg},
-                        headers=headers
-                    )
-                    print(f"[DEBUG] Message saved. Status: {response.status_code}")
-                except Exception as e:
-                    print(f"[ERROR] Failed to save user message: {e}")
-            
-            # Get streaming response
+            # One request saves the message, streams the reply and saves it
             try:
                 print("[DEBUG] Requesting bot response...")
                 print(f"[DEBUG] Parameters: temp={temperature}, tokens={max_new_tokens}, top_p={top_p}, top_k={top_k}")
                 
-                response = requests.post(
-                    f'http://127.0.0.1:7860/api/bots/{bot_selection}/chat',
-                    json={
-                        'message': formatted_msg,
-                        'parameters': {
-                            'temperature': temperature,
-                            'max_new_tokens': max_new_tokens,
-                            'top_p': top_p,
-                            'top_k': top_k,
-                            'repetition_penalty': repetition_penalty
-                        }
-                    },
-                    headers=headers,
-                    stream=True
+                events = client.chat_turn(
+                    chat_id,
+                    bot_selection,
+                    formatted_msg,
+                    {
+                        'temperature': temperature,
+                        'max_new_tokens': max_new_tokens,
+                        'top_p': top_p,
+                        'top_k': top_k,
+                        'repetition_penalty': repetition_penalty
+                    }
                 )
                 
-                if response.status_code == 200:
-                    print("[DEBUG] Starting to process streaming response...")
-                    token_count = 0
-                    current_response = ""
-                    
-                    # Process streaming response
-                    for line in response.iter_lines():
-                        if line and line.startswith(b'data: '):
-                            try:
-                                # Remove 'data: ' prefix and parse JSON
-                                json_str = line.decode()[6:]
-                                print(f"[DEBUG] Raw JSON: {json_str}")
-                                data = json.loads(json_str)
-                                print(f"[DEBUG] Decoded data: {data}")
-                                
-                                if 'token' in data:
-                                    token = data['token']
-                                    print(f"[DEBUG] Got token: {token}")
-                                    token_count += 1
-                                    if token_count % 20 == 0:
-                                        print(f"[DEBUG] Received {token_count} tokens...")
-                                    
-                                    current_response += token
-                                    history[-1][1] = current_response
-                                    yield history, ""
-                                    
-                            except json.JSONDecodeError as e:
-                                print(f"[ERROR] Failed to decode JSON: {e}")
-                                print(f"[DEBUG] Problem line: {line}")
-                                continue
-                            except Exception as e:
-                                print(f"[ERROR] Error processing token: {e}")
-                                continue
-                    
-                    print(f"[DEBUG] Response complete. Total tokens: {token_count}")
-                    print(f"[DEBUG] Final response: {current_response[:100]}...")
-                    
-                    # Save the complete response
-                    if chat_id and current_response:
-                        print("[DEBUG] Saving complete response to chat history...")
-                        save_response = requests.post(
-                            f'http://127.0.0.1:7860/api/chats/{chat_id}/messages',
-                            json={'role': 'assistant', 'content': current_response},
-                            headers=headers
-                        )
-                        print(f"[DEBUG] Response saved. Status: {save_response.status_code}")
-                        
-                else:
-                    error_msg = f"Error: Failed to get response (Status: {response.status_code})"
-                    print(f"[ERROR] {error_msg}")
-                    history[-1][1] = error_msg
+                print("[DEBUG] Starting to process streaming response...")
+                tokens = (data['token'] for data in events if 'token' in data)
+                
+                # Re-render the chat per batch of tokens rather than per token
+                for current_response in coalesce(tokens):
+                    history[-1][1] = current_response
                     yield history, ""
+                
+                print("[DEBUG] Response complete")
                     
+            except BackendError as e:
+                if e.status_code == 404:
+                    error_msg = "Error: Could not find chat"
+                else:
+                    error_msg = f"Error: Failed to get response (Status: {e.status_code})"
+                print(f"[ERROR] {error_msg}")
+                history[-1][1] = error_msg
+                yield history, ""
             except Exception as e:
                 print(f"[ERROR] Error in streaming response: {e}")
                 history[-1][1] = f"Error: {str(e)}"
@@ -408,30 +367,20 @@ def create_interface():
             history[-1][1] = f"Error: {str(e)}"
             yield history, ""
 
-    def load_selected_chat(chat_selection):
-        """Load a selected chat from the dropdown menu"""
-        if not chat_selection:
-            return None, "### New Chat"
+    def load_selected_chat(chat_id):
+        """Load the chat selected in the dropdown, which is keyed by chat id"""
+        if not chat_id:
+            return None, "### New Chat", None
         
         try:
-            # Get chat ID mapping
-            response = requests.get('http://127.0.0.1:7860/api/chats')
-            chats = response.json() if response.status_code == 200 else []
-            title_to_id = {chat['title']: chat['id'] for chat in chats}
-            chat_id = title_to_id.get(chat_selection)
-            
-            if not chat_id:
-                print(f"[ERROR] Could not find chat ID for title: {chat_selection}")
-                return None, "### Error Loading Chat"
-            
             print(f"\n[DEBUG] Loading chat {chat_id}")
             
-            response = requests.get(f'http://127.0.0.1:7860/api/chats/{chat_id}')
-            if response.status_code != 200:
-                print(f"[ERROR] Failed to load chat: {response.status_code}")
-                return None, "### Error Loading Chat"
+            try:
+                chat_data = client.get_chat(chat_id)
+            except BackendError as e:
+                print(f"[ERROR] Failed to load chat: {e.status_code}")
+                return None, "### Error Loading Chat", None
             
-            chat_data = response.json()
             history = []
             messages = chat_data.get('messages', [])
             
@@ -467,195 +416,41 @@ def create_interface():
             
             title = chat_data.get('title', 'Chat')
             print(f"[DEBUG] Loaded chat with {len(history)} messages")
-            return history, f"### {title}"
+            return history, f"### {title}", chat_id
             
         except Exception as e:
             print(f"[ERROR] Error loading chat: {e}")
-            return None, "### Error Loading Chat"
+            return None, "### Error Loading Chat", None
 
-    def delete_chat(chat_selection):
-        if not chat_selection:
-            return gr.update(), None, "### New Chat"
+    def delete_chat(chat_id, choices):
+        if not chat_id:
+            return gr.update(), None, "### New Chat", choices, None
         try:
-            # Get chat ID mapping
-            response = requests.get('http://127.0.0.1:7860/api/chats')
-            chats = response.json() if response.status_code == 200 else []
-            title_to_id = {chat['title']: chat['id'] for chat in chats}
-            chat_id = title_to_id.get(chat_selection)
-            
-            if not chat_id:
-                print(f"[ERROR] Could not find chat ID for title: {chat_selection}")
-                return None, None, "### Error"
-            
             print(f"Deleting chat: {chat_id}")  # Debug print
-            response = requests.delete(f'http://127.0.0.1:7860/api/chats/{chat_id}')
-            if response.status_code != 200:
-                print(f"Error deleting chat: {response.status_code} - {response.text}")
-                return None, None, "### Error"
-            # Update choices after deletion
-            choices = list_chats()
-            print(f"Available chats after deletion: {choices}")  # Debug print
-            return gr.update(choices=choices, value=None), None, "### New Chat"
+            client.delete_chat(chat_id)
+            choices = [choice for choice in choices or [] if choice[1] != chat_id]
+            return gr.update(choices=choices, value=None), None, "### New Chat", choices, None
         except Exception as e:
             print(f"Error deleting chat: {e}")
-            return None, None, "### Error"
+            return gr.update(), None, "### Error", choices, chat_id
 
-    def rename_chat(chat_selection):
-        if not chat_selection:
-            return gr.update(), None
+    def rename_chat(chat_id, choices):
+        if not chat_id:
+            return gr.update(), gr.update(), choices
         try:
-            # Get chat ID mapping
-            response = requests.get('http://127.0.0.1:7860/api/chats')
-            chats = response.json() if response.status_code == 200 else []
-            title_to_id = {chat['title']: chat['id'] for chat in chats}
-            chat_id = title_to_id.get(chat_selection)
-            
-            if not chat_id:
-                print(f"[ERROR] Could not find chat ID for title: {chat_selection}")
-                return None, None
-            
             print(f"Renaming chat: {chat_id}")  # Debug print
             new_title = create_title_from_message("New Title")
-            response = requests.put(
-                f'http://127.0.0.1:7860/api/chats/{chat_id}',
-                json={'title': new_title},
-                headers={'Content-Type': 'application/json'}
-            )
-            if response.status_code != 200:
-                print(f"Error renaming chat: {response.status_code} - {response.text}")
-            # Update choices after renaming
-            choices = list_chats()
-            print(f"Available chats after renaming: {choices}")  # Debug print
-            return gr.update(choices=choices, value=new_title), f"### {new_title}"
+            client.rename_chat(chat_id, new_title)
+            choices = [(new_title if id_ == chat_id else title, id_) for title, id_ in choices or []]
+            return gr.update(choices=choices, value=chat_id), f"### {new_title}", choices
         except Exception as e:
             print(f"Error renaming chat: {e}")
-            return None, None
-
-    def bot(history, temperature, max_new_tokens, top_p, top_k, rep_pen, chat_selection):
-        if not history:
-            return history
-        
-        try:
-            # Get chat ID mapping
-            response = requests.get('http://127.0.0.1:7860/api/chats')
-            chats = response.json() if response.status_code == 200 else []
-            title_to_id = {chat['title']: chat['id'] for chat in chats}
-            chat_id = title_to_id.get(chat_selection)
-            
-            if not chat_id:
-                print(f"[ERROR] Could not find chat ID for title: {chat_selection}")
-                return history
-            
-            print(f"\n[DEBUG] Processing message for chat {chat_id}")
-            history[-1][1] = ""
-            last_response = ""
-            headers = {'Content-Type': 'application/json'}
-            
-            title_updated = False
-            current_title = None
-            
-            # First save the user's message and check if title update is needed
-            if chat_id:
-                try:
-                    print(f"[DEBUG] Saving user message: '{history[-1][0][:50]}...'")
-                    response = requests.post(
-                        f'http://127.0.0.1:7860/api/chats/{chat_id}/messages',
-                        json={'role': 'user', 'content': history[-1][0]},
-                        headers=headers
-                    )
-                    print(f"[DEBUG] User message saved. Status: {response.status_code}")
-                    
-                    # Check if title update is needed
-                    messages_response = requests.get(f'http://127.0.0.1:7860/api/chats/{chat_id}/messages')
-                    if messages_response.status_code == 200:
-                        messages = messages_response.json()
-                        user_messages = [m for m in messages if m.get('role') == 'user']
-                        print(f"[DEBUG] Found {len(user_messages)} user messages")
-                        
-                        if len(user_messages) == 1:  # First user message
-                            # Generate title from the actual message content
-                            new_title = create_title_from_message(history[-1][0])
-                            current_title = new_title
-                            print(f"[DEBUG] Starting title update to: {new_title}")
-                            # Update title immediately
-                            response = requests.put(
-                                f'http://127.0.0.1:7860/api/chats/{chat_id}',
-                                json={'title': new_title},
-                                headers=headers
-                            )
-                            if response.status_code == 200:
-                                print("[DEBUG] Title updated successfully")
-                                # Update frontend
-                                choices = list_chats()
-                                chat_history_dropdown.update(choices=choices, value=new_title)
-                                chat_title_display.update(value=f"### {new_title}")
-                                title_updated = True
-                except Exception as e:
-                    print(f"[ERROR] Failed to save user message or update title: {e}")
-            
-            print("[DEBUG] Starting response generation...")
-            for response in llm.generate_response(
-                history[-1][0],
-                history[:-1],
-                temperature=temperature,
-                max_new_tokens=max_new_tokens,
-                top_p=top_p,
-                top_k=top_k,
-                repetition_penalty=rep_pen
-            ):
-                last_response = response
-                history[-1][1] = response
-                
-                # Update title during generation if not yet updated
-                if current_title and not title_updated:
-                    try:
-                        print(f"[DEBUG] Updating title during generation to: {current_title}")
-                        chat_history_dropdown.update(choices=list_chats(), value=current_title)
-                        chat_title_display.update(value=f"### {current_title}")
-                        title_updated = True
-                    except Exception as e:
-                        print(f"[ERROR] Failed to update title during generation: {e}")
-                
-                yield history
-
-            print("[DEBUG] Response generation complete")
-            # Save the final response
-            if chat_id and last_response:
-                try:
-                    print(f"[DEBUG] Saving assistant response")
-                    response = requests.post(
-                        f'http://127.0.0.1:7860/api/chats/{chat_id}/messages',
-                        json={'role': 'assistant', 'content': last_response},
-                        headers=headers,
-                        timeout=5
-                    )
-                    print(f"[DEBUG] Assistant response saved. Status: {response.status_code}")
-                except Exception as e:
-                    print(f"[ERROR] Failed to save assistant message: {e}")
-            
-            # Final title update check
-            if current_title and not title_updated:
-                try:
-                    print(f"[DEBUG] Final title update to: {current_title}")
-                    chat_history_dropdown.update(choices=list_chats(), value=current_title)
-                    chat_title_display.update(value=f"### {current_title}")
-                except Exception as e:
-                    print(f"[ERROR] Failed final title update: {e}")
-            
-            print("[DEBUG] Message processing complete\n")
-        except Exception as e:
-            print(f"[ERROR] Error in bot function: {e}")
-            history[-1][1] = "Error generating response. Please try again."
-            yield history
+            return gr.update(), gr.update(), choices
 
     def list_bots():
         """Get list of available bots"""
         try:
-            response = requests.get(f"{BACKEND_URL}/api/bots")
-            if response.status_code == 200:
-                bots = response.json()
-                return [bot["name"] for bot in bots]
-            return []
+            return [bot["name"] for bot in client.list_bots(fields='name')]
         except Exception as e:
             print(f"Error listing bots: {e}")
             return []
@@ -664,12 +459,10 @@ def create_interface():
         """Get details for a specific bot"""
         try:
             # Find bot ID from name
-            response = requests.get(f"{BACKEND_URL}/api/bots")
-            if response.status_code == 200:
-                bots = response.json()
-                bot = next((b for b in bots if b["name"] == bot_name), None)
-                if bot:
-                    return bot
+            bots = client.list_bots(fields='id,name')
+            bot = next((b for b in bots if b["name"] == bot_name), None)
+            if bot:
+                return client.get_bot(bot['id'])
             return None
         except Exception as e:
             print(f"Error getting bot details: {e}")
@@ -697,29 +490,20 @@ def create_interface():
                 }
             }
             
-            if is_update:
-                # Update existing bot
-                response = requests.put(
-                    f"{BACKEND_URL}/api/bots/{name.lower()}",
-                    json=data,
-                    headers={'Content-Type': 'application/json'}
-                )
-            else:
-                # Create new bot
-                response = requests.post(
-                    f"{BACKEND_URL}/api/bots",
-                    json=data,
-                    headers={'Content-Type': 'application/json'}
-                )
-            
-            if response.status_code == 200:
-                message = "Bot updated successfully" if is_update else "Bot created successfully"
-                gr.Info(message)
-                return gr.update(value=""), gr.update(choices=list_bots(), value=name)
-            else:
-                error_msg = response.json().get('error', 'Unknown error')
-                gr.Warning(f"Failed to {'update' if is_update else 'create'} bot: {error_msg}")
+            try:
+                if is_update:
+                    # Update existing bot
+                    client.update_bot(name.lower(), data)
+                else:
+                    # Create new bot
+                    client.create_bot(data)
+            except BackendError as e:
+                gr.Warning(f"Failed to {'update' if is_update else 'create'} bot: {e}")
                 return gr.update(), gr.update()
+            
+            message = "Bot updated successfully" if is_update else "Bot created successfully"
+            gr.Info(message)
+            return gr.update(value=""), gr.update(choices=list_bots(), value=name)
                 
         except Exception as e:
             gr.Warning(f"Error {'updating' if is_update else 'creating'} bot: {str(e)}")
@@ -736,11 +520,10 @@ def create_interface():
             if not bot:
                 return gr.Warning("Bot not found"), bot_dropdown.choices
                 
-            response = requests.delete(f"{BACKEND_URL}/api/bots/{bot['id']}")
-            if response.status_code == 200:
-                return gr.Info("Bot deleted successfully"), list_bots()
-            else:
-                return gr.Warning(f"Failed to delete bot: {response.json().get('error', 'Unknown error')}"), bot_dropdown.choices
+            client.delete_bot(bot['id'])
+            return gr.Info("Bot deleted successfully"), list_bots()
+        except BackendError as e:
+            return gr.Warning(f"Failed to delete bot: {e}"), bot_dropdown.choices
         except Exception as e:
             return gr.Warning(f"Error deleting bot: {str(e)}"), bot_dropdown.choices
 
@@ -791,13 +574,14 @@ def create_interface():
                 data["messages"].insert(0, {"role": "user", "content": user_msg})
             
             # Send chat request
-            response = requests.post(f"{BACKEND_URL}/api/chat", json=data)
-            if response.status_code != 200:
-                history.append((message, f"Error: {response.json().get('error', 'Failed to process message')}"))
+            try:
+                result = client.chat(data)
+            except BackendError as e:
+                history.append((message, f"Error: {e}"))
                 return history
                 
             # Add response to history
-            assistant_message = response.json().get("response", "Error: No response received")
+            assistant_message = result.get("response", "Error: No response received")
             history.append((message, assistant_message))
             
         except Exception as e:
@@ -883,13 +667,16 @@ def create_interface():
                         
                         # Chat history
                         with gr.Accordion("Chat History", open=False):
+                            # Choices are (title, id) pairs, so the dropdown value is the chat id
                             chat_history_dropdown = gr.Dropdown(
-                                choices=list_chats(),
+                                choices=[],
                                 label="Select Chat",
                                 interactive=True,
                                 allow_custom_value=False,
                                 value=None
                             )
+                            chat_choices = gr.State([])
+                            current_chat_id = gr.State(None)
                             chat_title_display = gr.Markdown("### New Chat", elem_id="chat-title")
                             with gr.Row():
                                 new_chat_btn = gr.Button("New", size="sm")
@@ -1100,13 +887,37 @@ def create_interface():
                     outputs=[base_model]
                 )
 
+            # Filled on page load (see interface.load below), not when the UI is built
+            with gr.Tab("System"):
+                gr.Markdown("### Machine")
+                system_info = gr.Markdown()
+                gr.Markdown("### Models")
+                model_usage_table = gr.Dataframe(
+                    headers=["Model", "Bots", "Weights (MB)", "KV Cache (MB)", "Sessions", "Tokens",
+                             "Prefill CPU (s)", "Decode CPU (s)", "Tokens/s"],
+                    interactive=False,
+                    elem_classes="dark table"
+                )
+                system_refresh_btn = gr.Button("🔄 Refresh", size="sm", scale=0.2)
+                system_refresh_btn.click(fn=system_summary, outputs=[system_info], queue=False)
+                system_refresh_btn.click(fn=model_usage, outputs=[model_usage_table], queue=False)
+
+                gr.Markdown("### Backend Latency")
+                latency_table = gr.Dataframe(
+                    headers=["Endpoint", "Calls", "Errors", "Mean (ms)", "Max (ms)"],
+                    interactive=False,
+                    elem_classes="dark table"
+                )
+                latency_refresh_btn = gr.Button("🔄 Refresh", size="sm", scale=0.2)
+                latency_refresh_btn.click(fn=backend_latency, outputs=[latency_table], queue=False)
+
         # Event handlers for chat
         submit_btn.click(
             submit_message,
             inputs=[
                 msg,
                 chatbot,
-                chat_history_dropdown,
+                current_chat_id,
                 bot_dropdown,
                 temperature,
                 max_new_tokens,
@@ -1128,7 +939,7 @@ def create_interface():
             inputs=[
                 msg,
                 chatbot,
-                chat_history_dropdown,
+                current_chat_id,
                 bot_dropdown,
                 temperature,
                 max_new_tokens,
@@ -1149,13 +960,15 @@ def create_interface():
         edit_bot_btn.click(
             switch_to_bot_config,
             None,
-            [chat_panel, bot_config_panel]
+            [chat_panel, bot_config_panel],
+            queue=False
         )
         
         back_to_chat.click(
             switch_to_chat,
             None,
-            [chat_panel, bot_config_panel]
+            [chat_panel, bot_config_panel],
+            queue=False
         )
         
         config_bot_dropdown.change(
@@ -1185,31 +998,51 @@ def create_interface():
             [chat_panel, bot_config_panel]
         )
 
+        # System panel: current numbers per page load; polling with every= would take queue slots
+        interface.load(system_summary, None, [system_info], queue=False)
+        interface.load(model_usage, None, [model_usage_table], queue=False)
+        interface.load(backend_latency, None, [latency_table], queue=False)
+
         # Chat history handlers
+        interface.load(
+            refresh_chat_list,
+            None,
+            [chat_history_dropdown, chat_choices],
+            queue=False
+        )
+
         new_chat_btn.click(
             create_new_chat,
-            None,
-            [chat_history_dropdown, chatbot, chat_title_display]
+            inputs=[chat_choices],
+            outputs=[chat_history_dropdown, chatbot, chat_title_display, chat_choices, current_chat_id],
+            queue=False
         )
 
         delete_btn.click(
             delete_chat,
-            inputs=[chat_history_dropdown],
-            outputs=[chat_history_dropdown, chatbot, chat_title_display]
+            inputs=[current_chat_id, chat_choices],
+            outputs=[chat_history_dropdown, chatbot, chat_title_display, chat_choices, current_chat_id],
+            queue=False
         )
 
         rename_btn.click(
             rename_chat,
-            inputs=[chat_history_dropdown],
-            outputs=[chat_history_dropdown, chat_title_display]
+            inputs=[current_chat_id, chat_choices],
+            outputs=[chat_history_dropdown, chat_title_display, chat_choices],
+            queue=False
         )
 
         chat_history_dropdown.change(
             load_selected_chat,
             inputs=[chat_history_dropdown],
-            outputs=[chatbot, chat_title_display]
+            outputs=[chatbot, chat_title_display, current_chat_id],
+            queue=False
         )
 
+    # Only generations and other slow calls wait in the queue; the chat
+    # handlers above skip it so they stay responsive while it is full
+    concurrency, max_size = queue_settings(client)
+    interface.queue(concurrency_count=concurrency, max_size=max_size)
     return interface
 
 if __name__ == "__main__":
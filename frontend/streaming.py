@@ -0,0 +1,30 @@
+import os
+import time
+from typing import Iterable, Iterator
+
+# How often a streaming reply is pushed to the browser
+STREAM_FPS = float(os.environ.get("MIDAS_UI_STREAM_FPS", "15"))
+STREAM_TOKENS = int(os.environ.get("MIDAS_UI_STREAM_TOKENS", "32"))
+
+def coalesce(tokens: Iterable[str], fps: float = STREAM_FPS, max_tokens: int = STREAM_TOKENS) -> Iterator[str]:
+    """Yield the text accumulated from ``tokens`` in batches.
+
+    A batch is flushed once 1/``fps`` seconds have passed since the last
+    one or ``max_tokens`` tokens are pending, whichever comes first; a
+    non-positive value disables that limit. The last value yielded is
+    always the complete text.
+    """
+    interval = 1 / fps if fps > 0 else float("inf")
+    text = ""
+    parts = []
+    last_flush = time.monotonic()
+    for token in tokens:
+        parts.append(token)
+        now = time.monotonic()
+        if len(parts) >= max_tokens > 0 or now - last_flush >= interval:
+            text += "".join(parts)
+            parts.clear()
+            last_flush = now
+            yield text
+    if parts:
+        yield text + "".join(parts)
@@ -0,0 +1,24 @@
+import json
+
+from backend.bot_catalog import BotCatalog
+
+def bot(name):
+    return {"name": name, "system_prompt": "", "base_model": "model.gguf", "parameters": {}}
+
+def catalog(bots_dir):
+    catalog = BotCatalog(str(bots_dir), lambda bot_id, data: data)
+    catalog.load()
+    return catalog
+
+def test_processes_sharing_a_directory_keep_each_others_index_entries(tmp_path):
+    # Two workers that loaded the catalog before either wrote
+    first, second = catalog(tmp_path), catalog(tmp_path)
+    first.put("a", bot("A"), bot("A"))
+    second.put("b", bot("B"), bot("B"))
+    second.remove("b")
+    second.put("c", bot("C"), bot("C"))
+
+    with open(first.index_path, encoding="utf-8") as f:
+        assert sorted(json.load(f)["bots"]) == ["a", "c"]
+    assert [entry.id for entry in catalog(tmp_path).entries()] == ["a", "c"]
+    assert not [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
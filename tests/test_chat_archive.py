@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from backend.chat_archive import TieredChatStorage
+from backend.chat_storage import JsonlChatStorage
+from backend.sqlite_chat_storage import SqliteChatStorage
+
+def message(i):
+    return {"role": "user", "content": f"message {i}", "timestamp": f"2024-01-01T00:00:{i:02d}"}
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def tiered(request, tmp_path):
+    if request.param == "jsonl":
+        hot = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    else:
+        hot = SqliteChatStorage(str(tmp_path))
+    storage = TieredChatStorage(hot, os.path.join(tmp_path, "archive"))
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    storage.append_message("chat", message(0))
+    yield storage
+    storage.close()
+
+def test_archive_and_restore(tiered):
+    assert tiered.archive("chat") is not None
+    assert tiered.is_archived("chat")
+    assert [m["content"] for m in tiered.get_messages("chat")] == ["message 0"]
+
+    assert tiered.append_message("chat", message(1)) == 1
+    assert not tiered.is_archived("chat")
+    assert [m["content"] for m in tiered.get_messages("chat")] == ["message 0", "message 1"]
+
+@pytest.mark.parametrize("write, check", [
+    (lambda storage: storage.append_message("chat", message(1)), lambda chat: len(chat["messages"]) == 2),
+    (lambda storage: storage.set_title("chat", "Renamed", "2024-01-02T00:00:00"), lambda chat: chat["title"] == "Renamed"),
+])
+def test_write_during_archive_keeps_the_chat_hot(tiered, monkeypatch, write, check):
+    write_archive = tiered._write_archive
+
+    def racing_write(chat_data):
+        # The hot path does not take the archive lock
+        write(tiered.storage)
+        return write_archive(chat_data)
+
+    monkeypatch.setattr(tiered, "_write_archive", racing_write)
+    assert tiered.archive("chat") is None
+
+    assert not tiered.is_archived("chat")
+    assert check(tiered.storage.load("chat"))
+    assert check(tiered.load("chat"))
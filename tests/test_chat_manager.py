@@ -0,0 +1,76 @@
+import pytest
+
+from backend.chat_manager import ChatManager, create_chat_storage
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ChatManager(str(tmp_path), backend="jsonl")
+    yield manager
+    manager.close()
+
+def test_append_updates_index_and_search(manager):
+    chat_id = manager.create_chat("Trip plans")
+    assert manager.append_message(chat_id, "user", "book a flight to Lisbon")["seq"] == 0
+    assert manager.get_chat_info(chat_id)["message_count"] == 1
+    assert [r["chat_id"] for r in manager.search_chats("lisbon")] == [chat_id]
+
+def test_reconcile_fixes_chats_behind_the_index(tmp_path, manager):
+    chat_id = manager.create_chat("Notes")
+    manager.append_message(chat_id, "user", "first")
+    # Crash after the storage write, before the index updates
+    manager.storage.append_message(chat_id, {"role": "assistant", "content": "orphaned reply", "timestamp": None})
+    stale = manager.create_chat("Deleted")
+    manager.storage.delete(stale)
+    manager.close()
+
+    restarted = ChatManager(str(tmp_path), backend="jsonl")
+    try:
+        assert restarted.get_chat_info(chat_id)["message_count"] == 2
+        assert restarted.get_chat_info(chat_id)["byte_size"] == restarted.storage.size(chat_id)
+        assert [r["seq"] for r in restarted.search_chats("orphaned")] == [1]
+        assert restarted.get_chat_info(stale) is None
+        assert restarted.reconcile_index() == 0
+    finally:
+        restarted.close()
+
+def test_write_behind_indexes_messages_per_flush(tmp_path, monkeypatch):
+    monkeypatch.setenv("MIDAS_CHAT_FLUSH_INTERVAL_MS", "60000")
+    manager = ChatManager(str(tmp_path), storage=create_chat_storage("jsonl", str(tmp_path), write_behind=True))
+    try:
+        chat_id = manager.create_chat("Trip plans")
+        manager.append_message(chat_id, "user", "book a flight to Lisbon")
+        manager.append_message(chat_id, "assistant", "which dates?")
+        assert manager.get_chat_info(chat_id)["message_count"] == 0
+
+        manager.storage.flush()
+        info = manager.get_chat_info(chat_id)
+        assert info["message_count"] == 2
+        assert info["byte_size"] == manager.storage.size(chat_id)
+        assert [r["seq"] for r in manager.search_chats("lisbon")] == [0]
+
+        # Imports write around the buffer and index themselves, once
+        manager.import_chats([
+            {"type": "chat", "id": "imported", "title": "Imported"},
+            {"type": "message", "role": "user", "content": "hello from Porto"},
+        ])
+        manager.storage.flush()
+        assert manager.get_chat_info("imported")["message_count"] == 1
+        assert len(manager.search_chats("porto")) == 1
+    finally:
+        manager.close()
+
+def test_reconcile_catches_renames_that_keep_the_size(tmp_path):
+    manager = ChatManager(str(tmp_path), backend="sqlite")
+    chat_id = manager.create_chat("Old title")
+    manager.append_message(chat_id, "user", "hello")
+    # Crash after the storage rename, before the index update; the byte size is unchanged
+    manager.storage.set_title(chat_id, "New title", "2024-01-02T00:00:00")
+    manager.close()
+
+    restarted = ChatManager(str(tmp_path), backend="sqlite")
+    try:
+        assert restarted.get_chat_info(chat_id)["title"] == "New title"
+        assert [r["chat_id"] for r in restarted.search_chats("new")] == [chat_id]
+        assert restarted.reconcile_index() == 0
+    finally:
+        restarted.close()
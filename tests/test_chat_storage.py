@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from backend.chat_storage import ChatCorruptedError, JsonlChatStorage
+
+def message(i, role="user"):
+    return {"role": role, "content": f"message {i}", "timestamp": f"2024-01-01T00:00:{i:02d}"}
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    yield storage
+    storage.close()
+
+def test_append_assigns_consecutive_seqs(storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    assert [storage.append_message("chat", message(i)) for i in range(5)] == [0, 1, 2, 3, 4]
+    assert storage.count_messages("chat") == 5
+    assert [m["content"] for m in storage.load("chat")["messages"]] == [f"message {i}" for i in range(5)]
+
+def test_append_to_missing_chat(storage):
+    assert storage.append_message("missing", message(0)) is None
+    assert storage.count_messages("missing") is None
+    assert storage.get_messages("missing") is None
+
+def test_get_messages_pages_by_seq(storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    for i in range(10):
+        storage.append_message("chat", message(i))
+    storage.set_title("chat", "Renamed", "2024-01-02T00:00:00")
+    storage.append_message("chat", message(10))
+
+    assert [m["seq"] for m in storage.get_messages("chat", limit=3)] == [8, 9, 10]
+    assert [m["seq"] for m in storage.get_messages("chat", limit=3, before=8)] == [5, 6, 7]
+    assert [m["seq"] for m in storage.get_messages("chat", limit=2, after=1)] == [2, 3]
+    assert storage.get_messages("chat", after=10) == []
+    assert storage.get_messages("chat", limit=1)[0]["content"] == "message 10"
+    assert storage.load("chat")["title"] == "Renamed"
+
+def test_append_batch_matches_single_appends(storage):
+    storage.create("a", "A", "2024-01-01T00:00:00")
+    storage.create("b", "B", "2024-01-01T00:00:00")
+    storage.append_message("a", message(0))
+    seqs = storage.append_batch([("a", message(1)), ("b", message(2)), ("missing", message(3)), ("a", message(4))],
+                                sync=True)
+    assert seqs == [1, 0, None, 2]
+    assert [m["content"] for m in storage.get_messages("a")] == ["message 0", "message 1", "message 4"]
+
+def test_torn_record_is_ignored_and_cut_before_the_next_write(tmp_path, storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    storage.append_message("chat", message(0))
+    log_path = storage._log_path("chat")
+    size = os.path.getsize(log_path)
+    with open(log_path, "ab") as f:
+        f.write(b'{"type": "message", "role": "user", "cont')
+
+    assert len(storage.load("chat")["messages"]) == 1
+
+    # A new process repairs the log before its first write
+    restarted = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    assert restarted.append_message("chat", message(1)) == 1
+    assert os.path.getsize(log_path) > size
+    assert [m["content"] for m in restarted.get_messages("chat")] == ["message 0", "message 1"]
+
+def test_stale_offsets_are_rebuilt(tmp_path, storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    for i in range(3):
+        storage.append_message("chat", message(i))
+    # Crash between the log write and the offsets write
+    offsets_path = storage._offsets_path("chat")
+    with open(offsets_path, "rb+") as f:
+        f.truncate(os.path.getsize(offsets_path) - 8)
+
+    restarted = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    assert restarted.count_messages("chat") == 3
+    assert restarted.append_message("chat", message(3)) == 3
+    assert [m["seq"] for m in restarted.get_messages("chat", limit=2)] == [2, 3]
+
+def test_corrupted_record_raises(storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    with open(storage._log_path("chat"), "ab") as f:
+        f.write(b"not json\n")
+    with pytest.raises(ChatCorruptedError):
+        storage.load("chat")
+
+def test_concurrent_appends_get_unique_seqs(storage):
+    chat_ids = ["a", "b", "c"]
+    for chat_id in chat_ids:
+        storage.create(chat_id, chat_id, "2024-01-01T00:00:00")
+    seqs = {chat_id: [] for chat_id in chat_ids}
+
+    def append(worker):
+        for i in range(50):
+            chat_id = chat_ids[(worker + i) % len(chat_ids)]
+            seq = storage.append_message(chat_id, {"role": "user", "content": f"{worker}-{i}", "timestamp": None})
+            seqs[chat_id].append(seq)
+
+    threads = [threading.Thread(target=append, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for chat_id in chat_ids:
+        count = len(seqs[chat_id])
+        assert sorted(seqs[chat_id]) == list(range(count))
+        stored = storage.get_messages(chat_id)
+        assert [m["seq"] for m in stored] == list(range(count))
+        assert len({m["content"] for m in stored}) == count
+
+def test_torn_record_from_another_process_is_cut_before_the_next_write(tmp_path, storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    storage.append_message("chat", message(0))
+    # Another worker appends, then crashes part way through its next record
+    other = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    assert other.append_message("chat", message(1)) == 1
+    with open(storage._log_path("chat"), "ab") as f:
+        f.write(b'{"type": "message", "role": "user", "cont')
+
+    assert storage.append_message("chat", message(2)) == 2
+    assert [m["content"] for m in storage.get_messages("chat")] == ["message 0", "message 1", "message 2"]
+
+def _append_from_process(history_dir):
+    storage = JsonlChatStorage(history_dir, compact_interval=None)
+    seqs = []
+    for i in range(25):
+        seqs.append(storage.append_message("chat", message(i)))
+        seqs.extend(storage.append_batch([("chat", message(i)), ("chat", message(i))]))
+    return seqs
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_appends_from_several_processes_get_unique_seqs(tmp_path, storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        results = pool.map(_append_from_process, [str(tmp_path)] * 4)
+
+    seqs = sorted(seq for result in results for seq in result)
+    assert seqs == list(range(300))
+    assert storage.count_messages("chat") == 300
+    assert [m["seq"] for m in storage.get_messages("chat")] == list(range(300))
@@ -0,0 +1,19 @@
+import os
+import stat
+
+from backend.file_utils import UMASK, temp_path
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+def test_temp_file_for_a_new_file_follows_the_umask(tmp_path):
+    tmp = temp_path(str(tmp_path / "new.json"))
+    assert mode(tmp) == 0o666 & ~UMASK
+
+def test_temp_file_keeps_the_mode_of_the_file_it_replaces(tmp_path):
+    target = tmp_path / "chat.jsonl"
+    target.write_bytes(b"")
+    os.chmod(target, 0o640)
+    tmp = temp_path(str(target))
+    os.replace(tmp, target)
+    assert mode(target) == 0o640
@@ -0,0 +1,93 @@
+import gc
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from backend.sqlite_chat_storage import SqliteChatStorage
+
+def message(i):
+    return {"role": "user", "content": f"message {i}", "timestamp": f"2024-01-01T00:00:{i:02d}"}
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SqliteChatStorage(str(tmp_path))
+    yield storage
+    storage.close()
+
+def test_append_and_page(storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    assert [storage.append_message("chat", message(i)) for i in range(6)] == list(range(6))
+    assert storage.append_message("missing", message(0)) is None
+    assert [m["seq"] for m in storage.get_messages("chat", limit=2, before=4)] == [2, 3]
+    assert [m["seq"] for m in storage.get_messages("chat", limit=2, after=3)] == [4, 5]
+    assert storage.summarize("chat")["message_count"] == 6
+
+def test_append_batch(storage):
+    storage.create("a", "A", "2024-01-01T00:00:00")
+    assert storage.append_batch([("a", message(0)), ("missing", message(1)), ("a", message(2))], sync=True) == [0, None, 1]
+
+def test_size_is_kept_on_the_conversation_row(storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    storage.append_message("chat", {"role": "user", "content": "héllo", "timestamp": None})
+    storage.append_batch([("chat", message(1)), ("chat", message(2))])
+    assert storage.size("chat") == len("héllo".encode("utf-8")) + 2 * len("message 1")
+    assert storage.summarize("chat")["message_count"] == 3
+    assert storage.size("missing") == 0
+
+    storage.import_chat({"id": "copy", "title": "Copy", "created_at": "", "messages": storage.load("chat")["messages"]})
+    assert storage.size("copy") == storage.size("chat")
+    assert storage.summarize("copy")["message_count"] == 3
+
+def test_counters_are_filled_in_for_old_databases(tmp_path):
+    conn = sqlite3.connect(os.path.join(tmp_path, "chats.sqlite3"))
+    conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, title TEXT NOT NULL, created_at TEXT NOT NULL)")
+    conn.execute(
+        "CREATE TABLE messages (chat_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL,"
+        " content TEXT NOT NULL, timestamp TEXT, PRIMARY KEY (chat_id, seq)) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO conversations VALUES ('chat', 'Title', '2024-01-01T00:00:00')")
+    conn.executemany("INSERT INTO messages VALUES ('chat', ?, 'user', ?, NULL)", [(0, "ab"), (1, "cde")])
+    conn.commit()
+    conn.close()
+
+    storage = SqliteChatStorage(str(tmp_path))
+    assert storage.size("chat") == 5
+    assert storage.append_message("chat", message(2)) == 2
+    assert storage.summarize("chat")["message_count"] == 3
+    storage.close()
+
+def test_concurrent_appends_from_many_connections(tmp_path, storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    # A second storage object stands in for another process on the same database
+    other = SqliteChatStorage(str(tmp_path))
+    seqs = []
+    lock = threading.Lock()
+
+    def append(target, worker):
+        for i in range(25):
+            seq = target.append_message("chat", {"role": "user", "content": f"{worker}-{i}", "timestamp": None})
+            with lock:
+                seqs.append(seq)
+
+    threads = [threading.Thread(target=append, args=(storage if worker % 2 else other, worker)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    other.close()
+
+    assert sorted(seqs) == list(range(200))
+    assert [m["seq"] for m in storage.get_messages("chat")] == list(range(200))
+    assert storage.size("chat") == sum(len(m["content"]) for m in storage.get_messages("chat"))
+
+def test_connections_of_finished_threads_are_closed(storage):
+    storage.create("chat", "Title", "2024-01-01T00:00:00")
+    threads = [threading.Thread(target=storage.exists, args=("chat",)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    gc.collect()
+    # Only the connection of this thread, opened by create(), is left
+    assert len(storage._connections) == 1
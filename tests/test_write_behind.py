@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from backend.chat_storage import JsonlChatStorage
+from backend.write_behind import WriteBehindChatStorage
+
+def message(i):
+    return {"role": "user", "content": f"message {i}", "timestamp": f"2024-01-01T00:00:{i:02d}"}
+
+def contents(storage, chat_id):
+    return [m["content"] for m in storage.get_messages(chat_id)]
+
+@pytest.fixture
+def jsonl(tmp_path):
+    storage = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    for chat_id in ("a", "b"):
+        storage.create(chat_id, chat_id, "2024-01-01T00:00:00")
+    return storage
+
+def buffered(storage, **kwargs):
+    # A long interval keeps the background flusher out of the way; tests flush explicitly
+    return WriteBehindChatStorage(storage, flush_interval=60, **kwargs)
+
+def test_appends_are_ordered_and_readable_before_the_flush(jsonl):
+    storage = buffered(jsonl)
+    assert [storage.append_message("a", message(i)) for i in range(3)] == [0, 1, 2]
+    assert storage.append_message("b", message(3)) == 0
+    assert storage.append_message("missing", message(4)) is None
+
+    assert jsonl.count_messages("a") == 0
+    assert contents(storage, "a") == ["message 0", "message 1", "message 2"]
+    assert [m["seq"] for m in storage.get_messages("a", limit=2)] == [1, 2]
+    assert storage.count_messages("a") == 3
+
+    storage.flush()
+    assert contents(jsonl, "a") == ["message 0", "message 1", "message 2"]
+    assert contents(jsonl, "b") == ["message 3"]
+    storage.close()
+
+def test_failed_flush_requeues_only_unwritten_messages(jsonl, monkeypatch):
+    storage = buffered(jsonl)
+    append_chat_batch = jsonl._append_chat_batch
+    failures = ["b"]
+
+    def flaky(chat_id, *args):
+        if chat_id in failures:
+            failures.remove(chat_id)
+            raise OSError("disk full")
+        return append_chat_batch(chat_id, *args)
+
+    monkeypatch.setattr(jsonl, "_append_chat_batch", flaky)
+    storage.append_message("a", message(0))
+    storage.append_message("b", message(1))
+    storage.append_message("a", message(2))
+
+    with pytest.raises(Exception):
+        storage.flush()
+    assert contents(jsonl, "a") == ["message 0", "message 2"]
+    assert contents(storage, "b") == ["message 1"]
+
+    storage.flush()
+    assert contents(jsonl, "a") == ["message 0", "message 2"]
+    assert contents(jsonl, "b") == ["message 1"]
+    storage.close()
+
+def test_sync_append_fails_with_its_flush(jsonl, monkeypatch):
+    storage = WriteBehindChatStorage(jsonl, durability="sync")
+    assert storage.append_message("a", message(0)) == 0
+
+    def broken(chat_id, *args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(jsonl, "_append_chat_batch", broken)
+    with pytest.raises(RuntimeError, match="disk full"):
+        storage.append_message("a", message(1))
+    assert contents(storage, "a") == ["message 0"]
+
+    monkeypatch.undo()
+    assert storage.append_message("a", message(2)) == 1
+    assert contents(jsonl, "a") == ["message 0", "message 2"]
+    storage.close()
+
+def test_sync_append_gives_up_after_the_timeout(jsonl, monkeypatch):
+    storage = WriteBehindChatStorage(jsonl, durability="sync", sync_timeout=0.2)
+    release = threading.Event()
+    append_chat_batch = jsonl._append_chat_batch
+
+    def stuck(*args):
+        release.wait()
+        return append_chat_batch(*args)
+
+    monkeypatch.setattr(jsonl, "_append_chat_batch", stuck)
+    with pytest.raises(TimeoutError):
+        storage.append_message("a", message(0))
+
+    # The message stays queued and is written once the storage recovers
+    release.set()
+    storage.flush()
+    assert contents(jsonl, "a") == ["message 0"]
+    storage.close()
+
+def test_slow_count_does_not_block_other_chats(jsonl, monkeypatch):
+    storage = buffered(jsonl)
+    started, release = threading.Event(), threading.Event()
+    count_messages = jsonl.count_messages
+
+    def slow(chat_id):
+        if chat_id == "a":
+            started.set()
+            release.wait()
+        return count_messages(chat_id)
+
+    monkeypatch.setattr(jsonl, "count_messages", slow)
+    seqs = []
+    worker = threading.Thread(target=lambda: seqs.append(storage.append_message("a", message(0))))
+    worker.start()
+    assert started.wait(5)
+    assert storage.append_message("b", message(1)) == 0
+
+    # An append that numbers the chat while the count is running wins the first seq
+    storage._next_seq["a"] = 0
+    assert storage.append_message("a", message(2)) == 0
+    release.set()
+    worker.join()
+    assert seqs == [1]
+    storage.close()
+
+def test_close_writes_buffered_messages(tmp_path, jsonl):
+    storage = buffered(jsonl)
+    for i in range(3):
+        storage.append_message("a", message(i))
+    storage.close()
+
+    restarted = JsonlChatStorage(str(tmp_path), compact_interval=None)
+    assert contents(restarted, "a") == ["message 0", "message 1", "message 2"]
+    assert restarted.count_messages("a") == 3